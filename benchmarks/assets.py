@@ -0,0 +1,90 @@
+"""
+Compare loading of frames on start: parsing every frame file versus
+the compiled FrameLibrary cache.
+
+The sprite library is grown by copies of the game frames in a temporary
+directory. Parsing grows linearly with the number of animations, while
+opening the warm cache and loading the categories the game uses at start
+should stay almost flat.
+
+Run from the project root:
+    python3 -m benchmarks.assets
+"""
+
+import argparse
+from pathlib import Path
+import shutil
+import tempfile
+import time
+from typing import Callable, NoReturn
+
+from space_game.assets import FrameLibrary
+from space_game.settings import AssetSettings
+from space_game.utils import read_objects
+
+
+# Categories which the game touches on start
+START_CATEGORIES = ('spaceship', 'rubbish', 'other')
+
+
+def make_library(path: Path, n_animations: int) -> NoReturn:
+    """
+    Copy the game frames into the directory and add copies of every
+    category as new animations until there are n_animations categories.
+    """
+
+    categories = sorted(p for p in AssetSettings.FRAMES_PATH.iterdir()
+                        if p.is_dir())
+    for i in range(n_animations):
+        source = categories[i % len(categories)]
+        name = source.name if i < len(categories) else f'{source.name}_{i}'
+        shutil.copytree(source, path / name)
+
+
+def measure(function: Callable, repeat: int) -> float:
+    """:return: the best time of a call in seconds"""
+
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"animations":>10} {"parse, ms":>10} {"compile, ms":>12} '
+          f'{"warm open, ms":>14} {"warm start, ms":>15}')
+    for n_animations in (4, 40, 400, 1600):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'frames'
+            path.mkdir()
+            make_library(path, n_animations)
+            cache_path = Path(directory) / 'frames.cache'
+
+            def compile_cache():
+                cache_path.unlink(missing_ok=True)
+                FrameLibrary(path, cache_path)
+
+            def start():
+                library = FrameLibrary(path, cache_path)
+                for category in START_CATEGORIES:
+                    library[category]
+
+            parse = measure(lambda: read_objects(path), args.repeat)
+            compile_time = measure(compile_cache, args.repeat)
+            warm_open = measure(lambda: FrameLibrary(path, cache_path),
+                                args.repeat)
+            warm_start = measure(start, args.repeat)
+
+        print(f'{n_animations:>10} {parse * 1e3:>10.2f} '
+              f'{compile_time * 1e3:>12.2f} {warm_open * 1e3:>14.2f} '
+              f'{warm_start * 1e3:>15.2f}')
+
+
+if __name__ == '__main__':
+    main()
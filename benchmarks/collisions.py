@@ -0,0 +1,130 @@
+"""
+Compare collision checks of projectiles against rubbish: a full scan of
+MapObject pairs versus queries to EntityPool.
+
+Rubbish density stays the same while the map grows. Both checks look at all
+rubbish, but the pool compares a shot with all of it by a few array
+operations, while the scan runs Python code per pair.
+
+Run from the project root:
+    python3 -m benchmarks.collisions
+"""
+
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from space_game.assets import FrameLibrary
+from space_game.entities import EntityPool, RUBBISH
+from space_game.utils import MapObject, Frame
+
+
+def make_objects(n_rubbish: int,
+                 n_shots: int,
+                 width: int,
+                 height: int) -> Tuple[List[MapObject], List[MapObject]]:
+    rubbish_frames = list(FrameLibrary()['rubbish'].values())
+    rubbish = [
+        MapObject(random.choice(rubbish_frames),
+                  random.randint(0, width), random.randint(0, height))
+        for _ in range(n_rubbish)
+    ]
+    shots = [
+        MapObject(Frame('|'),
+                  random.randint(0, width), random.randint(0, height))
+        for _ in range(n_shots)
+    ]
+    return rubbish, shots
+
+
+def run_scan(rubbish: List[MapObject],
+             shots: List[MapObject],
+             ticks: int) -> Tuple[float, float]:
+    """
+    :return: an average time of a tick and of a single collision query
+    """
+
+    tick_time = query_time = 0
+    for _ in range(ticks):
+        started = time.perf_counter()
+        for obj in rubbish:
+            obj.change_coordinates(obj.x, obj.y + 0.5)
+
+        queries_started = time.perf_counter()
+        for shot in shots:
+            shot.change_coordinates(shot.x, shot.y - 1)
+            for obj in rubbish:
+                if obj & shot:
+                    break
+
+        finished = time.perf_counter()
+        tick_time += finished - started
+        query_time += finished - queries_started
+
+    return tick_time / ticks, query_time / ticks / len(shots)
+
+
+def run_pool(rubbish: List[MapObject],
+             shots: List[MapObject],
+             width: int,
+             height: int,
+             ticks: int) -> Tuple[float, float]:
+    """
+    :return: an average time of a tick and of a single collision query
+    """
+
+    entities = EntityPool()
+    for obj in rubbish:
+        entities.spawn(RUBBISH, obj.frame, obj.x, obj.y, 0, 0.5)
+
+    tick_time = query_time = 0
+    for _ in range(ticks):
+        started = time.perf_counter()
+        # Rubbish doesn't leave such a map during the run
+        entities.step(width, height + ticks)
+
+        queries_started = time.perf_counter()
+        for shot in shots:
+            shot.change_coordinates(shot.x, shot.y - 1)
+            entities.overlapping(shot.x, shot.y, shot.frame.width,
+                                 shot.frame.height, RUBBISH)
+
+        finished = time.perf_counter()
+        tick_time += finished - started
+        query_time += finished - queries_started
+
+    return tick_time / ticks, query_time / ticks / len(shots)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--shots', type=int, default=50)
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f'{"rubbish":>8} {"scan, ms/tick":>14} {"pool, ms/tick":>14} '
+          f'{"scan, us/query":>15} {"pool, us/query":>15}')
+    for n_rubbish in (100, 200, 400, 800, 1600, 3200):
+        random.seed(args.seed)
+        # About one rubbish per 400 cells, that is a crowded 200x50 screen
+        # with 25 objects on it.
+        width = 200
+        height = n_rubbish * 400 // width
+        rubbish, shots = make_objects(n_rubbish, args.shots, width, height)
+        shot_positions = [(shot.x, shot.y) for shot in shots]
+
+        pool_tick, pool_query = run_pool(rubbish, shots, width, height,
+                                          args.ticks)
+        # Shots start from the same positions for both checks
+        for shot, (x, y) in zip(shots, shot_positions):
+            shot.change_coordinates(x, y)
+        scan_tick, scan_query = run_scan(rubbish, shots, args.ticks)
+        print(f'{n_rubbish:>8} {scan_tick * 1e3:>14.3f} '
+              f'{pool_tick * 1e3:>14.3f} '
+              f'{scan_query * 1e6:>15.2f} {pool_query * 1e6:>15.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""
+Measure memory of game objects and of a long late-game session by tracemalloc.
+
+The first table shows bytes per instance of classes which are created in
+bulk: frames of a sprite library, map objects and sprites (like explosions).
+
+The second one compares two ways to run the same late-game load, a rubbish
+every few ticks and a shot every tick: the way the game used to run it,
+with a MapObject and a coroutine per shot and per rubbish and a coroutine
+per explosion, which loops over frames and sleeps between them, and the way
+it runs it now, with shots and rubbish in EntityPool and explosions in
+Animator. It shows the peak of traced memory and the peak number of traced
+memory blocks, i.e. of allocations alive at once.
+
+The third one shows how traced memory changes during a long session with
+continuous fire after a warm-up, it should stay flat since shots, rubbish and
+sprites are recycled.
+
+The exit code is 1 if an instance is larger than its limit, the pooled load
+takes more than a share of the peak memory or blocks of the coroutine one,
+or memory of the session grows faster than the limit.
+
+Run from the project root:
+    python3 -m benchmarks.memory
+"""
+
+import argparse
+import gc
+import random
+import sys
+import tracemalloc
+from typing import Callable, Dict, List, NoReturn
+
+from benchmarks.ticks import InvulnerableGame, patched_settings
+from space_game.animation import Animation, Animator, Sprite
+from space_game.assets import FrameLibrary
+from space_game.canvas import HeadlessCanvas
+from space_game.entities import EntityPool, PROJECTILE, RUBBISH
+from space_game.renderer import Renderer
+from space_game.scheduler import Scheduler
+from space_game.settings import ControlSettings, MapSettings
+from space_game.utils import (
+    draw_frame, get_garbage_delay_tics, sleep, Frame, MapObject
+)
+
+
+# Limits of bytes per instance, they are about 20% above the sizes of
+# slotted classes
+MAX_BYTES_PER_INSTANCE = {
+    'Frame': 400,
+    'MapObject': 105,
+    'Sprite': 120,
+}
+# Max shares of peaks of the coroutine load which the pooled load may take,
+# its memory includes arrays of EntityPool which don't grow with the load
+MAX_POOLED_SHARE = {
+    'peak_kb': 0.75,
+    'peak_blocks': 0.5,
+}
+# A limit of growth of traced memory during the session after the warm-up,
+# what is left grows only till bounded buffers (like latencies) are full
+MAX_GROWTH_BYTES_PER_TICK = 16
+
+
+# A canvas of the late-game load and ticks between samples of its blocks
+LOAD_HEIGHT = 50
+LOAD_WIDTH = 200
+SAMPLE_EVERY_TICKS = 25
+
+
+class CoroutineLoad:
+    """
+    Shots, rubbish and explosions run the way the game used to run them:
+    a shot and a rubbish are a MapObject and a coroutine each, a shot checks
+    all rubbish for a hit every tick, and a hit awaits a coroutine which
+    draws and erases every frame of the explosion.
+    """
+
+    def __init__(self, canvas, explosion_frames: List[Frame]):
+        self._canvas = canvas
+        self._scheduler = Scheduler()
+        self._explosion_frames = explosion_frames
+        self._rubbish: Dict[int, MapObject] = {}
+        self._n_rubbish = 0
+        self.n_hits = 0
+
+    def spawn_rubbish(self, frame: Frame, x: int, y: int) -> NoReturn:
+        self._n_rubbish += 1
+        rubbish = MapObject(frame, x, y)
+        self._rubbish[self._n_rubbish] = rubbish
+        self._scheduler.spawn(self._fly_garbage(self._n_rubbish, rubbish))
+
+    def fire(self, x: int, y: int) -> NoReturn:
+        self._scheduler.spawn(self._fire(x, y))
+
+    def tick(self) -> NoReturn:
+        self._scheduler.run_tick()
+
+    async def _fly_garbage(self, rubbish_id: int, rubbish: MapObject):
+        x, y = rubbish.current_coordinates()
+        while y < LOAD_HEIGHT:
+            if rubbish_id not in self._rubbish:
+                return
+
+            rubbish.change_coordinates(x, y)
+            draw_frame(self._canvas, x, y, rubbish.frame)
+            await sleep(1)
+            draw_frame(self._canvas, x, y, rubbish.frame, negative=True)
+            y += MapSettings.RUBBISH_SPEED
+
+        self._rubbish.pop(rubbish_id)
+
+    async def _fire(self, x: int, y: int):
+        self._canvas.addstr(y, x, '*')
+        await sleep(1)
+        self._canvas.addstr(y, x, 'O')
+        await sleep(1)
+        self._canvas.addstr(y, x, ' ')
+
+        y -= MapSettings.SHOT_SPEED
+        shot = MapObject(Frame('|'), x, y)
+        while 1 < y < LOAD_HEIGHT - 1:
+            self._canvas.addstr(round(y), x, '|')
+            await sleep(1)
+            self._canvas.addstr(round(y), x, ' ')
+            shot.change_coordinates(x, y - MapSettings.SHOT_SPEED)
+            for rubbish_id, rubbish in self._rubbish.items():
+                if rubbish & shot:
+                    draw_frame(self._canvas, rubbish.x, rubbish.y,
+                               rubbish.frame, negative=True)
+                    self._rubbish.pop(rubbish_id)
+                    self.n_hits += 1
+                    await self._explode(rubbish.x, rubbish.y)
+                    return
+            y -= MapSettings.SHOT_SPEED
+
+    async def _explode(self, x: float, y: float):
+        for frame in self._explosion_frames:
+            draw_frame(self._canvas, x, y, frame)
+            await sleep(1)
+            draw_frame(self._canvas, x, y, frame, negative=True)
+            await sleep(1)
+
+
+class PooledLoad:
+    """
+    The same load run the way the game runs it now: shots and rubbish are
+    entities of EntityPool, which are moved and checked for hits by a few
+    array operations per tick, and explosions are sprites of Animator.
+    A coroutine per shot only flashes the muzzle for two ticks.
+    """
+
+    def __init__(self, canvas, explosion_frames: List[Frame]):
+        self._canvas = canvas
+        self._scheduler = Scheduler()
+        self._entities = EntityPool()
+        self._animator = Animator()
+        self._explosion_animation = Animation([
+            frame for frame in explosion_frames for frame in (frame, None)
+        ])
+        self._shot_frame = Frame('|', 'shot')
+        self.n_hits = 0
+
+    def spawn_rubbish(self, frame: Frame, x: int, y: int) -> NoReturn:
+        self._entities.spawn(RUBBISH, frame, x, y, 0,
+                             MapSettings.RUBBISH_SPEED)
+
+    def fire(self, x: int, y: int) -> NoReturn:
+        self._scheduler.spawn(self._fire(x, y))
+
+    def tick(self) -> NoReturn:
+        tick = self._scheduler.tick
+        self._scheduler.run_tick()
+        hits = self._entities.step(LOAD_WIDTH - 1, LOAD_HEIGHT - 1)
+        self._entities.render(self._canvas)
+        self.n_hits += len(hits)
+        for hit in hits:
+            self._animator.play(self._explosion_animation, hit.x, hit.y,
+                                tick + 1)
+        self._animator.update(self._canvas, tick)
+
+    async def _fire(self, x: int, y: int):
+        self._canvas.addstr(y, x, '*')
+        await sleep(1)
+        self._canvas.addstr(y, x, 'O')
+        await sleep(1)
+        self._canvas.addstr(y, x, ' ')
+        self._entities.spawn(PROJECTILE, self._shot_frame, x, y, 0,
+                             -MapSettings.SHOT_SPEED)
+
+
+def bytes_per_instance(factory: Callable[[int], object], n: int) -> float:
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        instances = [factory(i) for i in range(n)]
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    for instance in instances:
+        if hasattr(instance, 'close'):
+            instance.close()
+    # The list of instances itself isn't counted
+    return (after - before) / n - 8
+
+
+def measure_load(load_class: type, ticks: int, seed: int) -> Dict[str, float]:
+    """
+    Run the late-game load: a rubbish every delay of the plasma gun year
+    and a shot from a random column every tick, as the spaceship flies
+    with the fire button held.
+    """
+
+    random.seed(seed)
+    frames = FrameLibrary()
+    rubbish_frames = [frame for name, frame in frames['rubbish'].items()
+                      if not name.startswith('rocket')]
+    explosion_frames = list(frames['explosion'].values())
+    delay = get_garbage_delay_tics(MapSettings.PLASMA_GUN_YEAR)
+    renderer = Renderer(HeadlessCanvas(LOAD_HEIGHT, LOAD_WIDTH))
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        memory_before, _ = tracemalloc.get_traced_memory()
+        blocks_before = len(tracemalloc.take_snapshot().traces)
+        load = load_class(renderer, explosion_frames)
+        peak_memory = peak_blocks = 0
+        for tick in range(ticks):
+            if not tick % delay:
+                frame = random.choice(rubbish_frames)
+                load.spawn_rubbish(frame,
+                                   random.randint(1, LOAD_WIDTH - frame.width),
+                                   -frame.height)
+            load.fire(random.randint(2, LOAD_WIDTH - 3), LOAD_HEIGHT - 2)
+            load.tick()
+            renderer.flush()
+
+            if not tick % SAMPLE_EVERY_TICKS:
+                # The snapshot is traced too, so the peak is read before it
+                # and reset after it
+                peak_memory = max(peak_memory,
+                                  tracemalloc.get_traced_memory()[1])
+                peak_blocks = max(peak_blocks,
+                                  len(tracemalloc.take_snapshot().traces))
+                tracemalloc.reset_peak()
+        peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'hits': load.n_hits,
+        'peak_kb': (peak_memory - memory_before) / 1024,
+        'peak_blocks': peak_blocks - blocks_before,
+    }
+
+
+def measure_session(ticks: int, warmup: int, seed: int) -> Dict[str, float]:
+    random.seed(seed)
+    game = InvulnerableGame()
+    canvas = HeadlessCanvas(50, 200)
+    sizes: List[int] = []
+
+    def on_tick(tick: int, duration: float):
+        canvas.send_keys(ControlSettings.SPACE_KEY_CODE)
+        if tick == warmup or tick == ticks - 1:
+            sizes.append(tracemalloc.get_traced_memory()[0])
+
+    settings = {'START_YEAR': MapSettings.PLASMA_GUN_YEAR + 10,
+                'RUBBISH_COEFF': 0}
+    canvas.send_keys(ControlSettings.SPACE_KEY_CODE)
+    tracemalloc.start()
+    try:
+        with patched_settings(settings):
+            game.run_headless(ticks, canvas=canvas, on_tick=on_tick)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'after_warmup_kb': sizes[0] / 1024,
+        'at_end_kb': sizes[-1] / 1024,
+        'growth_bytes_per_tick': (sizes[-1] - sizes[0]) / (ticks - warmup),
+        'peak_kb': peak / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--instances', type=int, default=10000)
+    parser.add_argument('--load-ticks', type=int, default=3000)
+    parser.add_argument('--ticks', type=int, default=6000)
+    parser.add_argument('--warmup', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    frame = Frame('|')
+    factories = {
+        'Frame': lambda i: Frame('|'),
+        'MapObject': lambda i: MapObject(frame, i, i),
+        'Sprite': lambda i: Sprite(),
+    }
+    print(f'{"class":>20} {"bytes/instance":>15}')
+    sizes = {}
+    for name, factory in factories.items():
+        sizes[name] = size = bytes_per_instance(factory, args.instances)
+        print(f'{name:>20} {size:>15.1f}')
+
+    print()
+    print(f'The late-game load of {args.load_ticks} ticks:')
+    print(f'{"load":>20} {"hits":>8} {"peak, kb":>10} {"peak blocks":>12}')
+    loads = {}
+    for name, load_class in (('coroutines', CoroutineLoad),
+                             ('pooled', PooledLoad)):
+        loads[name] = load = measure_load(load_class, args.load_ticks,
+                                          args.seed)
+        print(f'{name:>20} {load["hits"]:>8} {load["peak_kb"]:>10.1f} '
+              f'{load["peak_blocks"]:>12}')
+
+    print()
+    print(f'A session of {args.ticks} ticks with continuous fire:')
+    session = measure_session(args.ticks, args.warmup, args.seed)
+    for metric, value in session.items():
+        print(f'    {metric:<22} {value:.1f}')
+
+    failures = [
+        f'{name} takes {sizes[name]:.1f} bytes, the limit is {limit}'
+        for name, limit in MAX_BYTES_PER_INSTANCE.items()
+        if sizes[name] > limit
+    ]
+    for metric, max_share in MAX_POOLED_SHARE.items():
+        pooled = loads['pooled'][metric]
+        coroutines = loads['coroutines'][metric]
+        if pooled > max_share * coroutines:
+            failures.append(f'the pooled load takes {pooled:.1f} {metric}, '
+                            f'more than {max_share:.0%} of {coroutines:.1f} '
+                            f'of the coroutine load')
+    growth = session['growth_bytes_per_tick']
+    if growth > MAX_GROWTH_BYTES_PER_TICK:
+        failures.append(f'the session grows by {growth:.1f} bytes per tick, '
+                        f'the limit is {MAX_GROWTH_BYTES_PER_TICK}')
+
+    print()
+    for failure in failures:
+        print(f'REGRESSION {failure}')
+    if failures:
+        sys.exit(1)
+    print('No regressions of memory.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare speed updates of many ships: update_speed called for every ship
+versus a single update_speeds call for all of them.
+
+Ships get random directions every tick. Besides timings, speeds of the batch
+version are compared with the scalar one, they must be exactly the same.
+
+Run from the project root:
+    python3 -m benchmarks.physics
+"""
+
+import argparse
+import time
+from typing import Tuple
+
+import numpy as np
+
+from space_game.physics import update_speed, update_speeds
+
+
+def random_directions(rng: np.random.Generator,
+                      n_ships: int) -> Tuple[np.ndarray, np.ndarray]:
+    return (rng.integers(-1, 2, size=n_ships),
+            rng.integers(-1, 2, size=n_ships))
+
+
+def run_scalar(n_ships: int, ticks: int, seed: int) \
+        -> Tuple[float, np.ndarray]:
+    """
+    :return: an average time of a tick and final x speeds
+    """
+
+    rng = np.random.default_rng(seed)
+    x_speeds, y_speeds = [0.0] * n_ships, [0.0] * n_ships
+    elapsed = 0
+    for _ in range(ticks):
+        x_directions, y_directions = random_directions(rng, n_ships)
+        x_directions = x_directions.tolist()
+        y_directions = y_directions.tolist()
+
+        started = time.perf_counter()
+        for i in range(n_ships):
+            x_speeds[i], y_speeds[i] = update_speed(
+                x_speeds[i], y_speeds[i], x_directions[i], y_directions[i])
+        elapsed += time.perf_counter() - started
+
+    return elapsed / ticks, np.array(x_speeds)
+
+
+def run_batch(n_ships: int, ticks: int, seed: int) \
+        -> Tuple[float, np.ndarray]:
+    """
+    :return: an average time of a tick and final x speeds
+    """
+
+    rng = np.random.default_rng(seed)
+    x_speeds, y_speeds = np.zeros(n_ships), np.zeros(n_ships)
+    elapsed = 0
+    for _ in range(ticks):
+        x_directions, y_directions = random_directions(rng, n_ships)
+
+        started = time.perf_counter()
+        x_speeds, y_speeds = update_speeds(x_speeds, y_speeds, x_directions,
+                                           y_directions)
+        elapsed += time.perf_counter() - started
+
+    return elapsed / ticks, x_speeds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-scalar-ships', type=int, default=10000,
+                        help='skip the scalar version for more ships')
+    args = parser.parse_args()
+
+    print(f'{"ships":>7} {"scalar, ms":>11} {"batch, ms":>10} '
+          f'{"batch, ships/s":>15} {"max diff":>9}')
+    for n_ships in (1, 100, 1000, 10000, 100000):
+        batch_time, batch_speeds = run_batch(n_ships, args.ticks, args.seed)
+        scalar = diff = '-'
+        if n_ships <= args.max_scalar_ships:
+            scalar_time, scalar_speeds = run_scalar(n_ships, args.ticks,
+                                                    args.seed)
+            scalar = f'{scalar_time * 1e3:.3f}'
+            diff = f'{np.abs(batch_speeds - scalar_speeds).max():.1e}'
+
+        print(f'{n_ships:>7} {scalar:>11} {batch_time * 1e3:>10.3f} '
+              f'{n_ships / batch_time:>15.0f} {diff:>9}')
+
+
+if __name__ == '__main__':
+    main()
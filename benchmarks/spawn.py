@@ -0,0 +1,114 @@
+"""
+Compare ways to place new rubbish above the map: random columns checked for
+overlaps till one fits versus a pick from free intervals of SpawnLanes.
+
+The entry band is filled with rubbish till a given share of start columns
+is still free. The retry version needs more attempts as the band fills and
+can't tell that there is no room at all, while the cost of a pick from
+the lanes depends only on the amount of rubbish in the band.
+
+Run from the project root:
+    python3 -m benchmarks.spawn
+"""
+
+import argparse
+import random
+import time
+from typing import List, Optional, Tuple
+
+from space_game.assets import FrameLibrary
+from space_game.entities import EntityPool, RUBBISH
+from space_game.lanes import SpawnLanes
+from space_game.utils import Frame
+
+
+def rubbish_frames() -> List[Frame]:
+    return [frame for name, frame in FrameLibrary()['rubbish'].items()
+            if not name.startswith('rocket')]
+
+
+def fill_band(width: int,
+              free_share: float,
+              average_width: int) -> Tuple[EntityPool, SpawnLanes]:
+    """
+    Put rubbish into the band till the share of free start columns for
+    a frame of the average width drops to free_share.
+    """
+
+    frames = rubbish_frames()
+    entities = EntityPool()
+    lanes = SpawnLanes(entities)
+    n_columns = width + average_width - 3
+    while True:
+        intervals = lanes.free_intervals(average_width,
+                                         -average_width + 2, width - 2)
+        n_free = sum(last - first + 1 for first, last in intervals)
+        if n_free <= free_share * n_columns:
+            return entities, lanes
+
+        frame = random.choice(frames)
+        x = lanes.choose(frame.width, -frame.width + 2, width - 2)
+        if x is not None:
+            lanes.add(entities.spawn(RUBBISH, frame, x, -frame.height))
+
+
+def spawn_by_retries(entities: EntityPool,
+                     frame: Frame,
+                     width: int,
+                     max_attempts: int) -> Tuple[Optional[int], int]:
+    """
+    :return: a column or None and a number of attempts
+    """
+
+    for attempt in range(1, max_attempts + 1):
+        x = random.randint(-frame.width + 2, width - 2)
+        if not entities.overlapping(x, -frame.height, frame.width,
+                                    frame.height, RUBBISH):
+            return x, attempt
+    return None, max_attempts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--width', type=int, default=200)
+    parser.add_argument('--spawns', type=int, default=2000)
+    parser.add_argument('--max-attempts', type=int, default=1000,
+                        help='give up a spawn by retries after this number '
+                             'of attempts')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    # New rubbish is a box of the average size
+    frames = rubbish_frames()
+    frame = Frame('\n'.join(
+        ['#' * (sum(frame.width for frame in frames) // len(frames))]
+        * (sum(frame.height for frame in frames) // len(frames))))
+    print(f'{"free":>5} {"in band":>8} {"retries, us":>12} '
+          f'{"attempts":>9} {"failed":>7} {"lanes, us":>10} {"failed":>7}')
+    for free_share in (1, 0.5, 0.2, 0.05, 0):
+        entities, lanes = fill_band(args.width, free_share, frame.width)
+
+        attempts = retry_failures = 0
+        started = time.perf_counter()
+        for _ in range(args.spawns):
+            x, n_attempts = spawn_by_retries(entities, frame, args.width,
+                                             args.max_attempts)
+            attempts += n_attempts
+            retry_failures += x is None
+        retry_time = (time.perf_counter() - started) / args.spawns
+
+        lane_failures = 0
+        started = time.perf_counter()
+        for _ in range(args.spawns):
+            lane_failures += lanes.choose(frame.width, -frame.width + 2,
+                                          args.width - 2) is None
+        lanes_time = (time.perf_counter() - started) / args.spawns
+
+        print(f'{free_share:>5.0%} {len(lanes):>8} {retry_time * 1e6:>12.1f} '
+              f'{attempts / args.spawns:>9.1f} {retry_failures:>7} '
+              f'{lanes_time * 1e6:>10.1f} {lane_failures:>7}')
+
+
+if __name__ == '__main__':
+    main()
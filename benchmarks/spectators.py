@@ -0,0 +1,224 @@
+"""
+Load test the spectator server with hundreds of local spectators.
+
+The game runs headless with ticks paced at a fixed rate, like the real game
+loop, and streams its screen to spectators connected from another process.
+For every number of spectators it reports ticks per second, p50/p99 tick
+durations, messages and keyframes a spectator got, and diffs dropped for slow
+spectators. A share of spectators is slow: they don't read at all till
+the middle of the game, so their kernel buffers fill up and the server stops
+sending them diffs. The exit code is 1 if no diff was dropped, a slow
+spectator didn't get a keyframe after its pause, or a spectator didn't end
+with the same screen as the game.
+
+Run from the project root:
+    python3 -m benchmarks.spectators
+"""
+
+import argparse
+import asyncio
+from multiprocessing import Event, Process, Queue
+import random
+import socket
+import sys
+import time
+from typing import Dict, List, NoReturn, Tuple
+
+from space_game import SpaceGame
+from space_game.canvas import HeadlessCanvas
+from space_game.settings import ControlSettings, SpectatorSettings
+from space_game.spectator import follow, Screen, SpectatorServer
+
+
+# A receive buffer of a slow spectator, so only a few messages fit into
+# the kernel while it doesn't read
+SLOW_RECEIVE_BUFFER = 4096
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def spectate(address: Tuple[str, int],
+                   n_clients: int,
+                   slow_share: float,
+                   resume: Event) -> Tuple[List[Dict], List[List[str]]]:
+    """
+    Connect spectators and follow the stream till the server disconnects.
+    A share of them is slow, they don't read till the resume event is set.
+    :return: stats of every spectator and distinct last screens of them
+    """
+
+    resumed = asyncio.Event()
+
+    async def wait_resume():
+        await asyncio.get_running_loop().run_in_executor(None, resume.wait)
+        resumed.set()
+
+    async def spectator(index: int) -> Tuple[Dict, Screen]:
+        is_slow = index < slow_share * n_clients
+        sock = socket.socket()
+        if is_slow:
+            # It's set before connecting, so the window is small from
+            # the start
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                            SLOW_RECEIVE_BUFFER)
+        sock.connect(address)
+        if is_slow:
+            # A stream reads a socket as soon as it's open, even if nothing
+            # reads the stream, so it's opened only after the pause
+            await resumed.wait()
+        reader, writer = await asyncio.open_connection(sock=sock,
+                                                       limit=2 ** 20)
+        screen = Screen()
+        stats = {'slow': is_slow, 'messages': 0, 'keyframes': 0,
+                 'last_keyframe': 0}
+        async for message in follow(reader, screen):
+            stats['messages'] += 1
+            if message.get('keyframe'):
+                stats['keyframes'] += 1
+                stats['last_keyframe'] = message['frame']
+        writer.close()
+        return stats, screen
+
+    waiter = asyncio.ensure_future(wait_resume())
+    results = await asyncio.gather(*(spectator(index)
+                                     for index in range(n_clients)))
+    await waiter
+    screens = {tuple(screen.lines()) for _, screen in results}
+    return [stats for stats, _ in results], [list(lines) for lines in screens]
+
+
+def run_spectators(address: Tuple[str, int],
+                   n_clients: int,
+                   slow_share: float,
+                   resume: Event,
+                   results: Queue) -> NoReturn:
+    results.put(asyncio.run(spectate(address, n_clients, slow_share, resume)))
+
+
+def measure(n_clients: int,
+            ticks: int,
+            rate: float,
+            height: int,
+            width: int,
+            slow_share: float,
+            max_buffer: int,
+            seed: int) -> Dict[str, object]:
+    server = SpectatorServer(port=0, max_buffer=max_buffer)
+    server.start()
+
+    results = Queue()
+    resume = Event()
+    spectators = None
+    if n_clients:
+        spectators = Process(target=run_spectators,
+                             args=(server.address, n_clients, slow_share,
+                                   resume, results))
+        spectators.start()
+        while server.n_clients < n_clients:
+            time.sleep(0.01)
+
+    durations = []
+    deadline = time.perf_counter()
+    resumed_frame = None
+
+    def pace(tick: int, duration: float):
+        nonlocal deadline, resumed_frame
+        durations.append(duration)
+        canvas.send_keys(ControlSettings.SPACE_KEY_CODE)
+        if tick == ticks // 2:
+            resumed_frame = server.frame
+            resume.set()
+        deadline += 1 / rate
+        time.sleep(max(deadline - time.perf_counter(), 0))
+
+    random.seed(seed)
+    canvas = HeadlessCanvas(height, width)
+    started = time.perf_counter()
+    SpaceGame(spectator=server).run_headless(ticks, canvas=canvas,
+                                             on_tick=pace)
+    elapsed = time.perf_counter() - started
+    resume.set()
+    server.stop()
+
+    metrics = {
+        'ticks_per_sec': round(len(durations) / elapsed, 1),
+        'p50_tick_ms': round(percentile(durations, 0.5) * 1e3, 3),
+        'p99_tick_ms': round(percentile(durations, 0.99) * 1e3, 3),
+        'diffs': server.n_diffs,
+        'keyframes': server.n_keyframes,
+        'dropped_diffs': server.n_dropped,
+    }
+    if spectators is not None:
+        stats, screens = results.get()
+        spectators.join()
+        slow = [item for item in stats if item['slow']]
+        metrics['messages_per_spectator'] = round(
+            sum(item['messages'] for item in stats) / len(stats), 1)
+        metrics['slow_spectators'] = len(slow)
+        # The game doesn't resize, so only a spectator which was dropped
+        # gets a keyframe after it resumes
+        metrics['slow_with_keyframe'] = sum(
+            item['last_keyframe'] >= resumed_frame for item in slow)
+        metrics['same_screen'] = screens == [canvas.lines()]
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, nargs='+',
+                        default=[0, 100, 300])
+    parser.add_argument('--ticks', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=50,
+                        help='ticks per second of the game')
+    parser.add_argument('--height', type=int, default=50)
+    parser.add_argument('--width', type=int, default=200)
+    parser.add_argument('--slow-share', type=float, default=0.1,
+                        help='a share of spectators which pause reading')
+    parser.add_argument('--max-buffer', type=int, default=8192,
+                        help='bytes waiting to be sent to a spectator, after '
+                             'which it gets no more diffs, the game uses '
+                             f'{SpectatorSettings.MAX_CLIENT_BUFFER}, but '
+                             'the whole benchmark streams less than slow '
+                             'spectators buffer with it')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    failures = []
+    for n_clients in args.clients:
+        metrics = measure(n_clients, args.ticks, args.rate, args.height,
+                          args.width, args.slow_share, args.max_buffer,
+                          args.seed)
+        print(f'{n_clients} spectators:')
+        for metric, value in metrics.items():
+            print(f'    {metric:<22} {value}')
+
+        if not n_clients:
+            continue
+        if not metrics['same_screen']:
+            failures.append(f'spectators of {n_clients} end with another '
+                            f'screen than the game')
+        if not metrics['slow_spectators']:
+            continue
+        if not metrics['dropped_diffs']:
+            failures.append(f'no diff was dropped for '
+                            f'{metrics["slow_spectators"]} slow spectators '
+                            f'of {n_clients}')
+        if metrics['slow_with_keyframe'] < metrics['slow_spectators']:
+            failures.append(f'only {metrics["slow_with_keyframe"]} of '
+                            f'{metrics["slow_spectators"]} slow spectators '
+                            f'of {n_clients} got a keyframe after the pause')
+
+    print()
+    for failure in failures:
+        print(f'FAILURE {failure}')
+    if failures:
+        sys.exit(1)
+    print('Slow spectators were caught up by keyframes.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,473 @@
+"""
+Measure tick throughput of the game loop on scripted load scenarios.
+
+Every scenario runs the headless game with a fixed seed and reports
+the simulation and render rates set, ticks and frames per second reached,
+p50/p99 tick durations, a peak number of coroutines, a peak of allocated
+memory and the amount of terminal output. Results are written to a JSON
+file and compared against the stored baseline, the exit code is 1 if any
+metric regressed.
+
+Timings in seconds depend on the machine and on its load, so only the p50
+tick duration relative to a reference loop, timed in the same process, is
+compared. It's the best of a few repeats, and other timings are reported
+only.
+
+Run from the project root:
+    python3 -m benchmarks.ticks
+    python3 -m benchmarks.ticks --update-baseline
+"""
+
+import argparse
+from contextlib import contextmanager
+import faulthandler
+import gc
+import json
+from pathlib import Path
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, NoReturn, Optional
+
+import numpy as np
+
+from space_game import SpaceGame
+from space_game.canvas import HeadlessCanvas
+from space_game.replay import read_recording
+from space_game.settings import ControlSettings, LoopSettings, MapSettings
+
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+# Ticks of a run before measurements of every scenario
+WARMUP_TICKS = 20
+# Runs of the reference loop, the fastest one is taken
+REFERENCE_RUNS = 5
+
+# Metrics which are compared against the baseline and whether
+# a higher value is better for them.
+COMPARED_METRICS = {
+    'relative_p50_tick': False,
+    'peak_memory_kb': False,
+    'gc_collections_per_1k_ticks': False,
+    'refreshes_per_tick': False,
+    'written_cells_per_tick': False,
+}
+
+
+class Scenario(NamedTuple):
+    name: str
+    description: str
+    height: int
+    width: int
+    ticks: int
+    settings: Dict[str, object] = {}
+    # Key codes sent to the canvas before every tick
+    keys: tuple = ()
+    invulnerable: bool = False
+    # A recorded session to replay instead of sending keys
+    recording: Optional[Path] = None
+    # (a tick, a height, a width) of terminal resizes after the tick
+    resizes: tuple = ()
+
+
+SCENARIOS = [
+    Scenario(
+        name='dense_stars',
+        description='a huge terminal with a dense star field',
+        height=200,
+        width=600,
+        ticks=300,
+        settings={'STAR_COEFF': 0.05},
+    ),
+    Scenario(
+        name='late_game',
+        description='years after the plasma gun with maximum garbage spawn',
+        height=50,
+        width=200,
+        ticks=1500,
+        settings={'START_YEAR': MapSettings.PLASMA_GUN_YEAR + 10,
+                  'RUBBISH_COEFF': 0},
+    ),
+    Scenario(
+        name='continuous_fire',
+        description='the late game with the fire button held all the time',
+        height=50,
+        width=200,
+        ticks=1500,
+        settings={'START_YEAR': MapSettings.PLASMA_GUN_YEAR + 10,
+                  'RUBBISH_COEFF': 0},
+        keys=(ControlSettings.SPACE_KEY_CODE, ),
+        invulnerable=True,
+    ),
+    Scenario(
+        name='huge_world',
+        description='the late game in a world of 100 screens, the camera '
+                    'follows the spaceship flying to the right and firing',
+        height=50,
+        width=200,
+        ticks=1500,
+        settings={'START_YEAR': MapSettings.PLASMA_GUN_YEAR + 10,
+                  'RUBBISH_COEFF': 0,
+                  'WORLD_HEIGHT': 500,
+                  'WORLD_WIDTH': 2000},
+        keys=(ControlSettings.SPACE_KEY_CODE, ControlSettings.RIGHT_KEY_CODE,
+              ControlSettings.DOWN_KEY_CODE),
+        invulnerable=True,
+    ),
+    Scenario(
+        name='smooth_render',
+        description='the late game rendered three times per tick, frames '
+                    'between ticks draw moving objects on their way',
+        height=50,
+        width=200,
+        ticks=1500,
+        settings={'START_YEAR': MapSettings.PLASMA_GUN_YEAR + 10,
+                  'RUBBISH_COEFF': 0,
+                  'RENDER_RATE': 3 * LoopSettings.SIMULATION_RATE},
+        keys=(ControlSettings.SPACE_KEY_CODE, ControlSettings.RIGHT_KEY_CODE),
+        invulnerable=True,
+    ),
+    Scenario(
+        name='fast_objects',
+        description='continuous fire in the late game with shots and rubbish '
+                    'covering several cells per tick, hits are checked '
+                    'along their way',
+        height=50,
+        width=200,
+        ticks=1500,
+        settings={'START_YEAR': MapSettings.PLASMA_GUN_YEAR + 10,
+                  'RUBBISH_COEFF': 0,
+                  'SHOT_SPEED': 6,
+                  'RUBBISH_SPEED': 2},
+        keys=(ControlSettings.SPACE_KEY_CODE, ),
+        invulnerable=True,
+    ),
+    Scenario(
+        name='fine_simulation',
+        description='continuous fire in the late game simulated at five '
+                    'times the base rate and rendered at the base rate',
+        height=50,
+        width=200,
+        ticks=3000,
+        settings={'START_YEAR': MapSettings.PLASMA_GUN_YEAR + 10,
+                  'RUBBISH_COEFF': 0,
+                  'SIMULATION_RATE': 5 * LoopSettings.SIMULATION_RATE,
+                  'RENDER_RATE': LoopSettings.SIMULATION_RATE},
+        keys=(ControlSettings.SPACE_KEY_CODE, ),
+        invulnerable=True,
+    ),
+    Scenario(
+        name='shrinking_terminal',
+        description='the terminal shrinks till no star is left and grows '
+                    'back, the game must go on without stars',
+        height=30,
+        width=100,
+        ticks=600,
+        settings={'START_YEAR': MapSettings.PLASMA_GUN_YEAR + 10},
+        resizes=((20, 5, 30), (300, 30, 100)),
+    ),
+]
+
+
+class InvulnerableGame(SpaceGame):
+    """
+    The game where the spaceship survives all hits, so the spaceship keeps
+    firing till the end of a scenario.
+    """
+
+    async def check_game_over(self, *args, **kwargs) -> NoReturn:
+        pass
+
+
+@contextmanager
+def patched_settings(settings: Dict[str, object]):
+    """Patch settings of the map and of the loop, they have unique names."""
+
+    classes = {name: MapSettings if hasattr(MapSettings, name)
+               else LoopSettings for name in settings}
+    previous = {name: getattr(classes[name], name) for name in settings}
+    for name, value in settings.items():
+        setattr(classes[name], name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(classes[name], name, value)
+
+
+def run_scenario(scenario: Scenario,
+                 seed: int,
+                 on_tick: Optional[Callable[[SpaceGame, int, float], None]]
+                 = None) -> HeadlessCanvas:
+    random.seed(seed)
+    game_class = InvulnerableGame if scenario.invulnerable else SpaceGame
+    game = game_class()
+    canvas = HeadlessCanvas(scenario.height, scenario.width)
+
+    def feed_keys_and_report(tick: int, duration: float):
+        for resize_tick, height, width in scenario.resizes:
+            if tick == resize_tick:
+                canvas.resize(height, width)
+        canvas.send_keys(*scenario.keys)
+        if on_tick is not None:
+            on_tick(game, tick, duration)
+
+    with patched_settings(scenario.settings):
+        if scenario.recording is not None:
+            game.replay(read_recording(scenario.recording), canvas,
+                        on_tick=feed_keys_and_report)
+            return canvas
+
+        canvas.send_keys(*scenario.keys)
+        game.run_headless(scenario.ticks, canvas=canvas,
+                          on_tick=feed_keys_and_report)
+    return canvas
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@contextmanager
+def gc_pauses(pauses: List[float]):
+    """Collect durations of garbage collections in seconds."""
+
+    started = 0
+
+    def callback(phase: str, info: Dict[str, int]):
+        nonlocal started
+        if phase == 'start':
+            started = time.perf_counter()
+        else:
+            pauses.append(time.perf_counter() - started)
+
+    gc.collect()
+    gc.callbacks.append(callback)
+    try:
+        yield
+    finally:
+        gc.callbacks.remove(callback)
+
+
+def reference_ms() -> float:
+    """
+    Time a fixed loop of the kind of work a tick does: calls of Python
+    functions, dict and list operations and NumPy operations on small
+    arrays. Tick durations divided by it hardly depend on the machine or
+    on its clock frequency at the moment.
+    :return: the duration of the fastest run in milliseconds
+    """
+
+    def step(cells: Dict[int, int], xs: np.ndarray, i: int) -> np.ndarray:
+        cells[i % 512] = i
+        return np.rint(xs + 0.5)
+
+    best = float('inf')
+    for _ in range(REFERENCE_RUNS):
+        xs = np.zeros(64)
+        cells = {}
+        rows = []
+        started = time.perf_counter()
+        for i in range(2000):
+            xs = step(cells, xs, i)
+            rows.append(' ' * (i % 80))
+            if len(rows) > 100:
+                rows.clear()
+        best = min(best, time.perf_counter() - started)
+    return best * 1e3
+
+
+def measure(scenario: Scenario,
+            seed: int,
+            repeats: Optional[int] = 3) -> Dict[str, float]:
+    """
+    :param repeats: a number of timed runs, timings are taken from the one
+        with the lowest relative p50 tick duration
+    """
+
+    if repeats <= 0:
+        raise ValueError(
+            f'Wrong repeats value {repeats}. Expects positive int.')
+
+    # A short run first, so one-time initialization (imports, caches) isn't
+    # measured, whichever scenario runs first.
+    run_scenario(scenario._replace(ticks=WARMUP_TICKS), seed)
+
+    best = None
+    for _ in range(repeats):
+        durations = []
+        pauses = []
+        peak_coroutines = 0
+        played = None
+
+        def on_tick(game: SpaceGame, tick: int, duration: float):
+            nonlocal peak_coroutines, played
+            durations.append(duration)
+            peak_coroutines = max(peak_coroutines, game.n_coroutines)
+            played = game
+
+        reference = reference_ms()
+        # Garbage collections are triggered by allocations of objects, so
+        # their number shows the allocation rate.
+        with gc_pauses(pauses):
+            canvas = run_scenario(scenario, seed, on_tick)
+        relative = percentile(durations, 0.5) * 1e3 / reference
+        if best is None or relative < best[0]:
+            best = relative, reference, durations, played.n_frames
+    relative, reference, durations, n_frames = best
+    # Other metrics are left from the last run, which doesn't make one-time
+    # allocations missed by the warm-up (like ones of the first resize)
+
+    # Memory is measured by a separate run with the same seed, because
+    # tracemalloc slows the game down and would spoil timings.
+    tracemalloc.start()
+    try:
+        run_scenario(scenario, seed)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(durations)
+    return {
+        'ticks': len(durations),
+        'simulation_rate': played.simulation_rate,
+        'render_rate': played.render_rate,
+        'ticks_per_sec': round(len(durations) / total, 1),
+        'frames_per_sec': round(n_frames / total, 1),
+        'p50_tick_ms': round(percentile(durations, 0.5) * 1e3, 3),
+        'p99_tick_ms': round(percentile(durations, 0.99) * 1e3, 3),
+        'reference_ms': round(reference, 3),
+        'relative_p50_tick': round(relative, 4),
+        'peak_coroutines': peak_coroutines,
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+        'gc_collections_per_1k_ticks': round(
+            len(pauses) * 1000 / len(durations), 1),
+        'max_gc_pause_ms': round(max(pauses, default=0) * 1e3, 3),
+        # The headless canvas doesn't spend time on terminal I/O, so it's
+        # estimated by the amount of output instead.
+        'refreshes_per_tick': round(canvas.n_refreshes / len(durations), 1),
+        'written_cells_per_tick': round(
+            canvas.n_written_cells / len(durations), 1),
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """
+    Compare results with the baseline.
+    :param tolerance: an allowed relative change of a metric to the worse
+    :return: a list of regressions, it's empty if there are no ones
+    """
+
+    regressions = []
+    for name, metrics in results.items():
+        if name not in baseline:
+            continue
+
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            expected = baseline[name].get(metric)
+            actual = metrics.get(metric)
+            if not expected or actual is None:
+                continue
+
+            change = (actual - expected) / expected
+            if higher_is_better:
+                change = -change
+            if change > tolerance:
+                regressions.append(
+                    f'{name}: {metric} is {actual}, the baseline is '
+                    f'{expected} ({change:+.0%} worse)')
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--output', type=Path,
+                        default=Path('benchmark_results.json'),
+                        help='a JSON file to write results to')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store the results as a new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='an allowed relative regression of a metric')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='timed runs of every scenario, the best one '
+                             'is reported')
+    parser.add_argument('--timeout', type=float, default=600,
+                        help='seconds a scenario may run, after which it is '
+                             'considered hung and the benchmark fails')
+    parser.add_argument('--scenario', action='append',
+                        choices=[scenario.name for scenario in SCENARIOS],
+                        help='run only the given scenarios')
+    parser.add_argument('--replay', type=Path, action='append', default=[],
+                        metavar='FILE',
+                        help='replay a recorded session as a scenario, '
+                             'it is named after the file')
+    args = parser.parse_args()
+
+    if args.scenario:
+        scenarios = [scenario for scenario in SCENARIOS
+                     if scenario.name in args.scenario]
+    elif args.replay:
+        # Only recorded sessions are run if they are given
+        scenarios = []
+    else:
+        scenarios = list(SCENARIOS)
+
+    for path in args.replay:
+        recording = read_recording(path)
+        scenarios.append(Scenario(
+            name=path.stem,
+            description=f'a replay of {path}',
+            height=recording.height,
+            width=recording.width,
+            ticks=recording.ticks,
+            recording=path,
+        ))
+
+    results = {}
+    for scenario in scenarios:
+        # A hung game dumps its traceback and exits with code 1
+        faulthandler.dump_traceback_later(args.timeout, exit=True)
+        try:
+            results[scenario.name] = metrics = measure(scenario, args.seed,
+                                                     args.repeats)
+        finally:
+            faulthandler.cancel_dump_traceback_later()
+        print(f'{scenario.name} ({scenario.description}, '
+              f'{scenario.height}x{scenario.width}):')
+        for metric, value in metrics.items():
+            print(f'    {metric:<16} {value}')
+
+    args.output.write_text(json.dumps(results, indent=4) + '\n')
+
+    if args.update_baseline:
+        baseline = {}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text())
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=4) + '\n')
+        print(f'The baseline is updated: {args.baseline}')
+        return
+
+    if not args.baseline.exists():
+        print(f'There is no baseline {args.baseline} to compare with.')
+        return
+
+    regressions = compare(results, json.loads(args.baseline.read_text()),
+                          args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    if regressions:
+        sys.exit(1)
+    print('No regressions against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,112 @@
+import argparse
+from pathlib import Path
+
 from space_game import SpaceGame
+from space_game.capture import ScreenRecorder
+from space_game.profiler import Profiler
+from space_game.replay import InputRecorder, read_recording
+from space_game.settings import LoopSettings, MapSettings, ProfilerSettings
+from space_game.spectator import SpectatorServer
 
 
 def main():
-    game = SpaceGame()
-    game.run()
+    parser = argparse.ArgumentParser(description='A simple console game.')
+    parser.add_argument('--headless', type=int, metavar='TICKS',
+                        help='run the given number of ticks without curses '
+                             'as fast as possible and print ticks per second')
+    parser.add_argument('--height', type=int, default=24,
+                        help='a height of the headless canvas')
+    parser.add_argument('--width', type=int, default=80,
+                        help='a width of the headless canvas')
+    parser.add_argument('--world-height', type=int, metavar='ROWS',
+                        help='a height of the world, the screen scrolls '
+                             'after the spaceship if it is larger than '
+                             'the terminal')
+    parser.add_argument('--world-width', type=int, metavar='COLUMNS',
+                        help='a width of the world')
+    parser.add_argument('--simulation-rate', type=float, metavar='HZ',
+                        default=LoopSettings.SIMULATION_RATE,
+                        help='ticks per second, the game is faster with '
+                             'a higher rate')
+    parser.add_argument('--render-rate', type=float, metavar='HZ',
+                        help='frames per second, frames between ticks show '
+                             'moving objects on their way; the simulation '
+                             'rate by default')
+    parser.add_argument('--profile', action='store_true',
+                        help='profile the game loop and show the overlay, '
+                             'which is toggled by the "p" key')
+    parser.add_argument('--profile-output', type=Path, metavar='FILE',
+                        help='write profiler reports to the file, CSV if it '
+                             'ends with .csv and JSON lines otherwise; '
+                             'implies --profile')
+    parser.add_argument('--profile-every', type=int, metavar='TICKS',
+                        default=ProfilerSettings.EVERY_TICKS,
+                        help='a number of ticks in a profiler report')
+    parser.add_argument('--seed', type=int,
+                        help='a seed of the random generator')
+    parser.add_argument('--record', type=Path, metavar='FILE',
+                        help='record the seed and input of the session '
+                             'to the file')
+    parser.add_argument('--replay', type=Path, metavar='FILE',
+                        help='replay a recorded session without curses '
+                             'as fast as possible and print ticks per second')
+    parser.add_argument('--capture', type=Path, metavar='FILE',
+                        help='capture the screen of the session to the file, '
+                             'see python3 -m space_game.capture')
+    parser.add_argument('--spectator-port', type=int, metavar='PORT',
+                        help='stream the screen to spectators on the local '
+                             'port, see python3 -m space_game.spectator')
+    parser.add_argument('--spectator-socket', type=Path, metavar='PATH',
+                        help='stream the screen to spectators on the Unix '
+                             'socket')
+    args = parser.parse_args()
+
+    if args.world_height is not None:
+        MapSettings.WORLD_HEIGHT = args.world_height
+    if args.world_width is not None:
+        MapSettings.WORLD_WIDTH = args.world_width
+
+    LoopSettings.SIMULATION_RATE = args.simulation_rate
+    LoopSettings.RENDER_RATE = args.render_rate
+
+    profiler = None
+    if args.profile or args.profile_output is not None:
+        profiler = Profiler(args.profile_output, args.profile_every)
+
+    recorder = None
+    if args.record is not None:
+        recorder = InputRecorder(args.record)
+
+    capture = None
+    if args.capture is not None:
+        capture = ScreenRecorder(args.capture)
+
+    spectator = None
+    if args.spectator_socket is not None:
+        spectator = SpectatorServer(path=args.spectator_socket)
+    elif args.spectator_port is not None:
+        spectator = SpectatorServer(port=args.spectator_port)
+    if spectator is not None:
+        spectator.start()
+
+    game = SpaceGame(profiler, args.seed, recorder, spectator, capture)
+    try:
+        if args.replay is not None:
+            recording = read_recording(args.replay)
+            ticks_per_second = game.replay(recording)
+            print(f'{recording.ticks} ticks, '
+                  f'{ticks_per_second:.1f} ticks/sec')
+        elif args.headless is not None:
+            ticks_per_second = game.run_headless(args.headless,
+                                                 args.height, args.width)
+            print(f'{ticks_per_second:.1f} ticks/sec')
+        else:
+            game.run()
+            if profiler is not None:
+                print(f'Input latency: {game.input_latency}')
+    finally:
+        if spectator is not None:
+            spectator.stop()
 
 
 if __name__ == '__main__':
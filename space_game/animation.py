@@ -0,0 +1,201 @@
+import time
+from typing import List, NoReturn, Optional, Sequence, Union
+
+from space_game.utils import draw_frame, Frame
+
+
+class Animation:
+    """
+    A definition of an animation: a sequence of frames, each shown for
+    the same number of ticks. None in the sequence is a blank frame, i.e.
+    nothing is drawn while it's shown.
+    """
+
+    __slots__ = ('frames', 'ticks_per_frame', 'loop')
+
+    def __init__(self,
+                 frames: Sequence[Optional[Frame]],
+                 ticks_per_frame: Optional[int] = 1,
+                 loop: Optional[bool] = False):
+        """
+        :param frames: frames of the animation
+        :param ticks_per_frame: a number of ticks every frame is shown
+        :param loop: start again after the last frame, otherwise the sprite
+            is erased and removed after it
+        """
+
+        if not frames:
+            raise ValueError('Wrong frames value []. Expects frames.')
+        if ticks_per_frame <= 0:
+            raise ValueError(
+                f'Wrong ticks_per_frame value {ticks_per_frame}. '
+                f'Expects positive int.')
+
+        self.frames = tuple(frames)
+        self.ticks_per_frame = ticks_per_frame
+        self.loop = loop
+
+    @classmethod
+    def still(cls, frame: Frame) -> 'Animation':
+        """Return an animation of a single frame shown till it's stopped."""
+
+        return cls((frame, ), loop=True)
+
+    def frame_index(self, age: int) -> Optional[int]:
+        """
+        Return an index of the frame shown at the age in ticks or None if
+        a one-shot animation is over.
+        """
+
+        index = age // self.ticks_per_frame
+        if index < len(self.frames):
+            return index
+        return index % len(self.frames) if self.loop else None
+
+
+class Sprite:
+    """An instance of an animation on a canvas."""
+
+    __slots__ = ('animation', 'x', 'y', 'start_tick', 'stopped',
+                 'drawn_frame', 'drawn_x', 'drawn_y')
+
+    def __init__(self):
+        self.animation: Optional[Animation] = None
+        self.x = self.y = 0
+        self.start_tick = 0
+        self.stopped = False
+        # A frame and rounded coordinates it's drawn at, the frame is None
+        # if nothing is drawn
+        self.drawn_frame: Optional[Frame] = None
+        self.drawn_x = self.drawn_y = 0
+
+    def frame(self, tick: int) -> Optional[Frame]:
+        """Return the frame shown at the tick."""
+
+        index = self.animation.frame_index(max(tick - self.start_tick, 0))
+        return None if index is None else self.animation.frames[index]
+
+
+class Animator:
+    """
+    All running sprites of a canvas.
+
+    Sprites are advanced by a single update per tick instead of
+    a coroutine per sprite. A sprite is redrawn only if its frame or
+    position changed, or if something else was drawn over it since
+    the last flush, so a still sprite (like "Game Over") costs a check of
+    the renderer per tick. Finished sprites are kept in a free list and
+    reused by new ones, so a long fight doesn't allocate anything.
+    """
+
+    def __init__(self):
+        self._active: List[Sprite] = []
+        self._free: List[Sprite] = []
+        # A Profiler to account drawing to, see profiler.py
+        self.profiler = None
+
+    def __len__(self) -> int:
+        """Return a number of running sprites."""
+
+        return len(self._active)
+
+    def play(self,
+             animation: Animation,
+             x: Union[float, int],
+             y: Union[float, int],
+             start_tick: int) -> Sprite:
+        """
+        Start a sprite, it's drawn by the first update at or after
+        the start tick.
+        """
+
+        sprite = self._free.pop() if self._free else Sprite()
+        sprite.animation = animation
+        sprite.x, sprite.y = x, y
+        sprite.start_tick = start_tick
+        sprite.stopped = False
+        sprite.drawn_frame = None
+        self._active.append(sprite)
+        return sprite
+
+    @staticmethod
+    def move(sprite: Sprite,
+             x: Union[float, int],
+             y: Union[float, int]) -> NoReturn:
+        """Move the sprite, it's redrawn by the next update."""
+
+        sprite.x, sprite.y = x, y
+
+    @staticmethod
+    def stop(sprite: Sprite) -> NoReturn:
+        """Erase and remove the sprite by the next update."""
+
+        sprite.stopped = True
+
+    def invalidate(self) -> NoReturn:
+        """
+        Forget what's drawn, for example, once the canvas has been
+        cleared. All sprites are drawn again by the next update.
+        """
+
+        for sprite in self._active:
+            sprite.drawn_frame = None
+
+    def update(self, canvas, tick: int) -> NoReturn:
+        """
+        Draw sprites which changed since the last update and remove
+        finished ones.
+        :param canvas: a canvas with is_dirty of the renderer
+        """
+
+        if self.profiler is None:
+            self._update(canvas, tick)
+            return
+
+        started = time.perf_counter()
+        try:
+            self._update(canvas, tick)
+        finally:
+            self.profiler.add_section('draw_sprites',
+                                      time.perf_counter() - started)
+
+    def _update(self, canvas, tick: int) -> NoReturn:
+        n_kept = 0
+        active = self._active
+        for sprite in active:
+            age = tick - sprite.start_tick
+            if age < 0:
+                active[n_kept] = sprite
+                n_kept += 1
+                continue
+
+            index = None
+            if not sprite.stopped:
+                index = sprite.animation.frame_index(age)
+            frame = None if index is None else sprite.animation.frames[index]
+            x, y = round(sprite.x), round(sprite.y)
+
+            drawn = sprite.drawn_frame
+            if frame is drawn and x == sprite.drawn_x and y == sprite.drawn_y:
+                # Something else may have been drawn over the sprite
+                if frame is not None and canvas.is_dirty(
+                        y, x, frame.height, frame.width):
+                    draw_frame(canvas, x, y, frame)
+            else:
+                if drawn is not None:
+                    draw_frame(canvas, sprite.drawn_x, sprite.drawn_y, drawn,
+                               negative=True)
+                if frame is not None:
+                    draw_frame(canvas, x, y, frame)
+                sprite.drawn_frame = frame
+                sprite.drawn_x, sprite.drawn_y = x, y
+
+            if index is None:
+                sprite.animation = None
+                self._free.append(sprite)
+            else:
+                # Running sprites are compacted to the head of the list
+                active[n_kept] = sprite
+                n_kept += 1
+
+        del active[n_kept:]
@@ -0,0 +1,157 @@
+from collections import defaultdict
+import hashlib
+import os
+from pathlib import Path
+import pickle
+from typing import Dict, Iterator, Mapping, NoReturn, Optional, Tuple
+
+from space_game.settings import AssetSettings
+from space_game.utils import Frame
+
+
+# It's bumped whenever the layout of the cache or of Frame changes
+CACHE_VERSION = 2
+
+
+class FrameLibrary(Mapping):
+    """
+    Frames of all objects by categories, compiled into a single cache file.
+
+    The cache starts with a header (a format version, a signature of
+    the frames directory and offsets of categories), which is followed by
+    pickled categories of ready frames, so there is no parsing of frames
+    on start. A category is read from the cache when it's accessed for
+    the first time.
+
+    The signature is a hash of paths, sizes and modification times of all
+    frame files, so the cache is recompiled if any of them is added, removed
+    or changed. If the cache can't be written (for example, the game is
+    installed into a read-only directory), frames are kept in memory only.
+    """
+
+    def __init__(self,
+                 path: Optional[Path] = AssetSettings.FRAMES_PATH,
+                 cache_path: Optional[Path] = AssetSettings.FRAMES_CACHE_PATH):
+        """
+        :param path: a directory with categories of frames, where every
+            category is a directory of text files
+        :param cache_path: a file of the compiled cache
+        """
+
+        self._path = path
+        self._cache_path = cache_path
+
+        self._categories: Dict[str, Dict[str, Frame]] = {}
+        # A category to (offset, size) of its data in the cache
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._data_offset = 0
+
+        signature = self._get_signature()
+        if not self._read_header(signature):
+            self._compile(signature)
+
+    def __getitem__(self, category: str) -> Dict[str, Frame]:
+        frames = self._categories.get(category)
+        if frames is None:
+            if category not in self._index:
+                raise KeyError(category)
+            frames = self._categories[category] = self._load(category)
+        return frames
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index or self._categories)
+
+    def __len__(self) -> int:
+        return len(self._index or self._categories)
+
+    @property
+    def n_loaded(self) -> int:
+        """Return a number of categories which are loaded into memory."""
+
+        return len(self._categories)
+
+    def _get_signature(self) -> str:
+        # os.scandir is used instead of Path.glob, it's several times faster
+        # on big directories, and it's the most of the start time.
+        entries = []
+        with os.scandir(self._path) as categories:
+            for category in categories:
+                if not category.is_dir():
+                    continue
+                with os.scandir(category.path) as files:
+                    for file in files:
+                        stat = file.stat()
+                        entries.append(f'{category.name}/{file.name}:'
+                                       f'{stat.st_size}:{stat.st_mtime_ns}')
+
+        entries.sort()
+        entries.append(str(CACHE_VERSION))
+        return hashlib.sha1('\n'.join(entries).encode()).hexdigest()
+
+    def _read_header(self, signature: str) -> bool:
+        """
+        Read the index of the cache.
+        :return: False if there is no valid cache for the signature
+        """
+
+        try:
+            with open(self._cache_path, 'rb') as file:
+                header = pickle.load(file)
+                data_offset = file.tell()
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False
+
+        if (not isinstance(header, dict)
+                or header.get('version') != CACHE_VERSION
+                or header.get('signature') != signature):
+            return False
+
+        self._index = header['index']
+        self._data_offset = data_offset
+        return True
+
+    def _load(self, category: str) -> Dict[str, Frame]:
+        offset, size = self._index[category]
+        with open(self._cache_path, 'rb') as file:
+            file.seek(self._data_offset + offset)
+            return pickle.loads(file.read(size))
+
+    def _compile(self, signature: str) -> NoReturn:
+        categories = defaultdict(dict)
+        for file_path in sorted(self._path.glob('*/*')):
+            with open(file_path, 'r') as file:
+                categories[file_path.parent.stem][file_path.stem] = \
+                    Frame(''.join(file), file_path.stem)
+
+        # Every frame is parsed now anyway, so all categories stay loaded
+        self._categories = dict(categories)
+
+        blobs = {
+            category: pickle.dumps(frames, pickle.HIGHEST_PROTOCOL)
+            for category, frames in self._categories.items()
+        }
+        index, offset = {}, 0
+        for category, blob in blobs.items():
+            index[category] = (offset, len(blob))
+            offset += len(blob)
+        header = {
+            'version': CACHE_VERSION,
+            'signature': signature,
+            'index': index,
+        }
+
+        # The cache is replaced atomically, so a game started at the same
+        # time never reads a half-written file.
+        temp_path = self._cache_path.with_name(
+            f'{self._cache_path.name}.{os.getpid()}.tmp')
+        try:
+            with open(temp_path, 'wb') as file:
+                pickle.dump(header, file, pickle.HIGHEST_PROTOCOL)
+                for blob in blobs.values():
+                    file.write(blob)
+            os.replace(temp_path, self._cache_path)
+        except OSError:
+            try:
+                temp_path.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,282 @@
+"""
+Run many headless games with different seeds and settings in parallel.
+
+Every run is a game flown by a scripted pilot with a seed and a set of
+overridden settings, till the spaceship crashes or the tick limit is reached.
+Runs are spread over a pool of processes, every finished run is written to
+a CSV file at once, and only aggregates per set of settings are kept in
+memory. They are printed at the end.
+
+Settings are names of attributes of MapSettings and ShipSettings, their
+values are JSON:
+    python3 -m space_game.batch --seeds 100 --ticks 3000 \\
+        --param RUBBISH_COEFF=0,2,5 --param X_SPEED_LIMIT=1,2,3
+"""
+
+import argparse
+from contextlib import contextmanager
+import csv
+import itertools
+import json
+from multiprocessing import Pool
+import os
+from pathlib import Path
+import random
+import sys
+from typing import (
+    Dict, Iterable, Iterator, List, NamedTuple, NoReturn, Optional, Tuple
+)
+
+from space_game.canvas import HeadlessCanvas
+from space_game.settings import ControlSettings, MapSettings, ShipSettings
+from space_game.space_game import SpaceGame
+
+
+# Classes of settings which can be overridden by runs
+SETTINGS_CLASSES = (MapSettings, ShipSettings)
+
+DIRECTION_KEYS = (
+    ControlSettings.UP_KEY_CODE,
+    ControlSettings.DOWN_KEY_CODE,
+    ControlSettings.LEFT_KEY_CODE,
+    ControlSettings.RIGHT_KEY_CODE,
+)
+
+# Metrics of a run, which are aggregated
+METRICS = ('survival_ticks', 'shots', 'destroyed', 'ticks_per_sec')
+
+
+class Run(NamedTuple):
+    seed: int
+    # Overridden settings by names
+    settings: Dict[str, object]
+    ticks: int
+    height: int
+    width: int
+    pilot: str
+
+
+class Pilot:
+    """
+    A scripted player. It's random, but seeded, so a run is reproducible.
+
+    'idle' never touches the keys, 'gunner' stays still and holds fire,
+    'random' holds a random direction for a few ticks and fires from time
+    to time.
+    """
+
+    KINDS = ('idle', 'gunner', 'random')
+
+    def __init__(self, kind: str, seed: int):
+        if kind not in self.KINDS:
+            raise ValueError(
+                f'Wrong pilot value {kind}. Expects one of {self.KINDS}.')
+
+        self._kind = kind
+        self._rng = random.Random(seed)
+        self._direction = None
+        self._direction_ticks = 0
+
+    def keys(self) -> List[int]:
+        """Return keys pressed in the next tick."""
+
+        if self._kind == 'idle':
+            return []
+        if self._kind == 'gunner':
+            return [ControlSettings.SPACE_KEY_CODE]
+
+        if not self._direction_ticks:
+            self._direction = self._rng.choice(DIRECTION_KEYS + (None, ))
+            self._direction_ticks = self._rng.randint(1, 10)
+        self._direction_ticks -= 1
+
+        keys = [] if self._direction is None else [self._direction]
+        if self._rng.random() < 0.3:
+            keys.append(ControlSettings.SPACE_KEY_CODE)
+        return keys
+
+
+@contextmanager
+def overridden_settings(settings: Dict[str, object]):
+    previous = []
+    try:
+        for name, value in settings.items():
+            settings_class = find_settings_class(name)
+            previous.append((settings_class, name,
+                             getattr(settings_class, name)))
+            setattr(settings_class, name, value)
+        yield
+    finally:
+        for settings_class, name, value in reversed(previous):
+            setattr(settings_class, name, value)
+
+
+def find_settings_class(name: str) -> type:
+    for settings_class in SETTINGS_CLASSES:
+        if name.isupper() and hasattr(settings_class, name):
+            return settings_class
+
+    raise ValueError(
+        f'Wrong setting name {name}. Expects an attribute of '
+        f'{", ".join(cls.__name__ for cls in SETTINGS_CLASSES)}.')
+
+
+def simulate(run: Run) -> Dict[str, object]:
+    """Play a single game. It's called in worker processes."""
+
+    random.seed(run.seed)
+    game = SpaceGame()
+    canvas = HeadlessCanvas(run.height, run.width)
+    pilot = Pilot(run.pilot, run.seed)
+
+    def press_keys(tick: int, duration: float):
+        canvas.send_keys(*pilot.keys())
+
+    canvas.send_keys(*pilot.keys())
+    with overridden_settings(run.settings):
+        ticks_per_sec = game.run_headless(run.ticks, canvas=canvas,
+                                          on_tick=press_keys,
+                                          stop_on_game_over=True)
+
+    return {
+        'seed': run.seed,
+        **run.settings,
+        'survival_ticks': (run.ticks if game.game_over_tick is None
+                           else game.game_over_tick),
+        'crashed': game.game_over_tick is not None,
+        'shots': game.n_shots,
+        'destroyed': game.n_destroyed,
+        'ticks_per_sec': round(ticks_per_sec, 1),
+    }
+
+
+def make_runs(grid: Dict[str, List[object]],
+              seeds: Iterable[int],
+              ticks: int,
+              height: int,
+              width: int,
+              pilot: str) -> Iterator[Run]:
+    """Generate runs of every seed for every combination of settings."""
+
+    names = list(grid)
+    for values in itertools.product(*grid.values()):
+        settings = dict(zip(names, values))
+        for seed in seeds:
+            yield Run(seed, settings, ticks, height, width, pilot)
+
+
+class Aggregate:
+    """Running sums of metrics of runs with the same settings."""
+
+    def __init__(self):
+        self.n_runs = 0
+        self.n_crashed = 0
+        self.sums = dict.fromkeys(METRICS, 0)
+        self.mins = dict.fromkeys(METRICS, float('inf'))
+
+    def add(self, result: Dict[str, object]) -> NoReturn:
+        self.n_runs += 1
+        self.n_crashed += result['crashed']
+        for metric in METRICS:
+            self.sums[metric] += result[metric]
+            self.mins[metric] = min(self.mins[metric], result[metric])
+
+    def row(self) -> Dict[str, float]:
+        row = {'runs': self.n_runs,
+               'crashed': round(self.n_crashed / self.n_runs, 3)}
+        for metric in METRICS:
+            row[f'mean_{metric}'] = round(self.sums[metric] / self.n_runs, 1)
+        row['min_survival_ticks'] = self.mins['survival_ticks']
+        return row
+
+
+def run_batch(runs: Iterable[Run],
+              output: Path,
+              settings_names: List[str],
+              workers: Optional[int] = None,
+              chunk_size: Optional[int] = 4) \
+        -> Dict[Tuple[str, ...], Aggregate]:
+    """
+    Run games in a pool of processes and write a row per run to a CSV file
+    as soon as it's finished. Rows go in order of finishing.
+    :param settings_names: names of overridden settings, they are columns
+    :param workers: a number of processes, all cores by default
+    :return: aggregates by JSON values of settings
+    """
+
+    aggregates: Dict[Tuple[str, ...], Aggregate] = {}
+    columns = ['seed', *settings_names, 'survival_ticks', 'crashed',
+               'shots', 'destroyed', 'ticks_per_sec']
+    with open(output, 'w', newline='') as file, Pool(workers) as pool:
+        writer = csv.DictWriter(file, columns)
+        writer.writeheader()
+        for result in pool.imap_unordered(simulate, runs, chunk_size):
+            key = tuple(json.dumps(result[name]) for name in settings_names)
+            aggregates.setdefault(key, Aggregate()).add(result)
+            writer.writerow({
+                column: (json.dumps(value) if column in settings_names
+                         else value)
+                for column, value in result.items()
+            })
+            file.flush()
+
+    return aggregates
+
+
+def parse_param(param: str) -> Tuple[str, List[object]]:
+    """Parse NAME=VALUE,VALUE,... where values are JSON."""
+
+    name, _, values = param.partition('=')
+    find_settings_class(name)
+    try:
+        return name, json.loads(f'[{values}]')
+    except json.JSONDecodeError:
+        raise ValueError(
+            f'Wrong values of {name}: {values}. Expects JSON values '
+            f'separated by commas.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--param', action='append', default=[],
+                        metavar='NAME=VALUES',
+                        help='values of a setting to sweep, JSON separated '
+                             'by commas')
+    parser.add_argument('--seeds', type=int, default=10,
+                        help='a number of seeds per set of settings')
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--ticks', type=int, default=3000,
+                        help='a max number of ticks of a run')
+    parser.add_argument('--height', type=int, default=24)
+    parser.add_argument('--width', type=int, default=80)
+    parser.add_argument('--pilot', choices=Pilot.KINDS, default='random')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='a number of processes')
+    parser.add_argument('--output', type=Path,
+                        default=Path('batch_results.csv'),
+                        help='a CSV file to write a row per run to')
+    args = parser.parse_args()
+
+    try:
+        grid = dict(parse_param(param) for param in args.param)
+    except ValueError as error:
+        parser.error(str(error))
+
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    runs = make_runs(grid, seeds, args.ticks, args.height, args.width,
+                     args.pilot)
+    aggregates = run_batch(runs, args.output, list(grid), args.workers)
+
+    rows = []
+    for key, aggregate in aggregates.items():
+        rows.append({**dict(zip(grid, key)), **aggregate.row()})
+    rows.sort(key=lambda row: -row['mean_survival_ticks'])
+    if rows:
+        writer = csv.DictWriter(sys.stdout, list(rows[0]), delimiter='\t')
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f'Runs are written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+from typing import NoReturn, Optional, Tuple
+
+from space_game.geometry import Geometry
+
+
+class Camera:
+    """
+    A window-like view of a world which may be larger than the screen.
+
+    Game objects draw in world coordinates, the camera shifts them to
+    the screen and drops everything outside of the play area, i.e. inside
+    of the screen border. The world has a border too, so with the world of
+    the screen size the camera never moves and draws exactly as the screen.
+    """
+
+    def __init__(self,
+                 window,
+                 geometry: Geometry,
+                 x_margin: Optional[int] = 0,
+                 y_margin: Optional[int] = 0):
+        """
+        :param window: a window of the screen to draw into
+        :param geometry: sizes of the screen and of the world
+        :param x_margin: a number of columns between a followed object and
+            a side of the view before the camera starts to move
+        :param y_margin: a number of rows between a followed object and
+            the top or bottom of the view before the camera starts to move
+        """
+
+        self._window = window
+        self._geometry = geometry
+        self._screen_height = self._screen_width = 0
+        self._height = self._width = 0
+        self._x_margin = x_margin
+        self._y_margin = y_margin
+
+        # World coordinates of the upper left corner of the screen
+        self._top = 0
+        self._left = 0
+        self.resize()
+
+    @property
+    def is_scrolling(self) -> bool:
+        """Return True if the world doesn't fit into the screen."""
+
+        return (self._height > self._screen_height
+                or self._width > self._screen_width)
+
+    @property
+    def visible_area(self) -> Tuple[int, int, int, int]:
+        """
+        Return world coordinates of cells drawn on the screen as
+        (top, left, bottom, right), bottom and right are excluded.
+        """
+
+        return (self._top + 1, self._left + 1,
+                self._top + self._screen_height - 1,
+                self._left + self._screen_width - 1)
+
+    def resize(self) -> bool:
+        """
+        Take sizes from the geometry after it has changed, the view is kept
+        inside of the world.
+        :return: True if the view has moved
+        """
+
+        geometry = self._geometry
+        self._screen_height = geometry.screen_height
+        self._screen_width = geometry.screen_width
+        self._height, self._width = geometry.world_size()
+        return self._move_to(self._left, self._top)
+
+    def getmaxyx(self) -> Tuple[int, int]:
+        return self._height, self._width
+
+    def addch(self, y: int, x: int, ch, attr: int = 0) -> NoReturn:
+        y -= self._top
+        x -= self._left
+        if (0 < y < self._screen_height - 1
+                and 0 < x < self._screen_width - 1):
+            self._window.addch(y, x, ch, attr)
+
+    def addstr(self, y: int, x: int, string: str, attr: int = 0) -> NoReturn:
+        y -= self._top
+        if not 0 < y < self._screen_height - 1:
+            return
+
+        x -= self._left
+        last_x = self._screen_width - 1
+        if x >= last_x:
+            return
+        if x <= 0:
+            string = string[1 - x:]
+            x = 1
+        if x + len(string) > last_x:
+            string = string[:last_x - x]
+        if string:
+            self._window.addstr(y, x, string, attr)
+
+    def is_dirty(self, y: int, x: int, height: int, width: int) -> bool:
+        """
+        Check if any cell of the rectangle of the world was written since
+        the last flush, its part out of the play area is ignored.
+        """
+
+        y -= self._top
+        x -= self._left
+        top, left = max(y, 1), max(x, 1)
+        bottom = min(y + height, self._screen_height - 1)
+        right = min(x + width, self._screen_width - 1)
+        if top >= bottom or left >= right:
+            return False
+        return self._window.is_dirty(top, left, bottom - top, right - left)
+
+    def clear(self) -> NoReturn:
+        """Blank the play area of the screen, the border is kept."""
+
+        blank = ' ' * (self._screen_width - 2)
+        for y in range(1, self._screen_height - 1):
+            self._window.addstr(y, 1, blank)
+
+    def follow(self, x: int, y: int, width: int, height: int) -> bool:
+        """
+        Move the view, if an object is closer to its side than the margin.
+        :return: True if the view has moved, then the screen must be redrawn
+        """
+
+        top, left, bottom, right = self.visible_area
+        # Margins can't be more than a half of the view
+        x_margin = min(self._x_margin, (right - left - width) // 2)
+        y_margin = min(self._y_margin, (bottom - top - height) // 2)
+
+        new_left, new_top = self._left, self._top
+        if x - x_margin < left:
+            new_left += x - x_margin - left
+        elif x + width + x_margin > right:
+            new_left += x + width + x_margin - right
+        if y - y_margin < top:
+            new_top += y - y_margin - top
+        elif y + height + y_margin > bottom:
+            new_top += y + height + y_margin - bottom
+
+        return self._move_to(new_left, new_top)
+
+    def _move_to(self, left: int, top: int) -> bool:
+        left = min(max(left, 0), self._width - self._screen_width)
+        top = min(max(top, 0), self._height - self._screen_height)
+        if (left, top) == (self._left, self._top):
+            return False
+
+        self._left, self._top = left, top
+        return True
@@ -0,0 +1,154 @@
+import curses
+from collections import deque
+from typing import Iterable, List, NoReturn, Optional, Tuple, Union
+
+
+class HeadlessCanvas:
+    """
+    An in-memory character grid which implements the part of the curses
+    window API used by the game. It lets the game loop run without
+    a terminal, for example, to profile or load test the simulation.
+
+    Like a real curses window, it raises curses.error if something is written
+    outside of the window or into its lower right corner.
+    """
+
+    def __init__(self,
+                 height: Optional[int] = 24,
+                 width: Optional[int] = 80,
+                 keys: Optional[Iterable[int]] = ()
+                 ):
+        if height <= 0 or width <= 0:
+            raise ValueError(
+                f'Wrong canvas size {height}x{width}. '
+                f'Expects positive height and width.')
+
+        self._height = height
+        self._width = width
+        self._chars = [[' '] * width for _ in range(height)]
+        self._attrs = [[0] * width for _ in range(height)]
+        self._keys = deque(keys)
+
+        # A sub-window shares cells with its parent, so it only keeps
+        # an offset of its top left corner inside the root canvas.
+        self._root = self
+        self._begin_y = 0
+        self._begin_x = 0
+
+        # Counters of "terminal" I/O
+        self.n_refreshes = 0
+        self.n_written_cells = 0
+
+    def getmaxyx(self) -> Tuple[int, int]:
+        return self._height, self._width
+
+    def addch(self, y: int, x: int, ch: Union[str, int],
+              attr: Optional[int] = 0) -> NoReturn:
+        if isinstance(ch, int):
+            ch = chr(ch & curses.A_CHARTEXT)
+        self.addstr(y, x, ch, attr)
+
+    def addstr(self, y: int, x: int, string: str, attr: Optional[int] = 0) \
+            -> NoReturn:
+        """
+        Write a string starting from (y, x). As curses does, a string which
+        does not fit into a row is wrapped to the next one.
+        """
+
+        if not (0 <= y < self._height and 0 <= x < self._width):
+            raise curses.error('addstr() returned ERR')
+
+        root = self._root
+        root.n_written_cells += len(string)
+        for symbol in string:
+            root._chars[self._begin_y + y][self._begin_x + x] = symbol
+            root._attrs[self._begin_y + y][self._begin_x + x] = attr
+            x += 1
+            if x == self._width:
+                x = 0
+                y += 1
+                if y == self._height:
+                    # The cursor cannot be moved after the lower right
+                    # corner, so curses reports an error here.
+                    raise curses.error('addstr() returned ERR')
+
+    def border(self) -> NoReturn:
+        last_y, last_x = self._height - 1, self._width - 1
+        root = self._root
+        for x in range(1, last_x):
+            root._put(self._begin_y, self._begin_x + x, '-')
+            root._put(self._begin_y + last_y, self._begin_x + x, '-')
+        for y in range(1, last_y):
+            root._put(self._begin_y + y, self._begin_x, '|')
+            root._put(self._begin_y + y, self._begin_x + last_x, '|')
+        for y, x in ((0, 0), (0, last_x), (last_y, 0), (last_y, last_x)):
+            root._put(self._begin_y + y, self._begin_x + x, '+')
+        root.n_written_cells += 2 * (last_y + last_x)
+
+    def derwin(self, nlines: int, ncols: int, begin_y: int, begin_x: int) \
+            -> 'HeadlessCanvas':
+        if (nlines <= 0 or ncols <= 0 or begin_y < 0 or begin_x < 0
+                or begin_y + nlines > self._height
+                or begin_x + ncols > self._width):
+            raise curses.error('derwin() returned ERR')
+
+        window = HeadlessCanvas.__new__(HeadlessCanvas)
+        window._height = nlines
+        window._width = ncols
+        window._root = self._root
+        window._begin_y = self._begin_y + begin_y
+        window._begin_x = self._begin_x + begin_x
+        return window
+
+    def getch(self) -> int:
+        if self._root._keys:
+            return self._root._keys.popleft()
+        return -1
+
+    def send_keys(self, *key_codes: int) -> NoReturn:
+        """Put key codes into the input queue read by getch."""
+
+        self._root._keys.extend(key_codes)
+
+    def nodelay(self, flag: bool) -> NoReturn:
+        pass
+
+    def resize(self, height: int, width: int) -> NoReturn:
+        """
+        Change the size of the canvas like a terminal resized by a user.
+        Overlapping cells are kept, as resizeterm does, and KEY_RESIZE is
+        put into the input queue. Sub-windows must be created again.
+        """
+
+        if height <= 0 or width <= 0:
+            raise ValueError(
+                f'Wrong canvas size {height}x{width}. '
+                f'Expects positive height and width.')
+
+        for rows in (self._chars, self._attrs):
+            blank = ' ' if rows is self._chars else 0
+            del rows[height:]
+            for row in rows:
+                del row[width:]
+                row.extend([blank] * (width - len(row)))
+            rows.extend([blank] * width
+                        for _ in range(height - len(rows)))
+
+        self._height, self._width = height, width
+        self._keys.append(curses.KEY_RESIZE)
+
+    def refresh(self) -> NoReturn:
+        self._root.n_refreshes += 1
+
+    def lines(self) -> List[str]:
+        """Return the window's content as a list of rows."""
+
+        root = self._root
+        return [
+            ''.join(root._chars[y][self._begin_x:self._begin_x + self._width])
+            for y in range(self._begin_y, self._begin_y + self._height)
+        ]
+
+    def _put(self, y: int, x: int, symbol: str) -> NoReturn:
+        self._chars[y][x] = symbol
+        self._attrs[y][x] = 0
@@ -0,0 +1,383 @@
+"""
+Capture the screen of a session to a compact binary file and play it back.
+
+Unlike a recording of input (see replay), a capture doesn't need the game
+to be played back, it's what the terminal showed: cells changed by every
+frame with their symbols and attributes (like A_DIM and A_BOLD of stars).
+
+The file starts with a header, which is followed by records:
+    a record header: a kind (K for a keyframe, D for a delta), a tick and
+        a size of the record body in bytes;
+    a keyframe body: a height and a width of the screen and runs of all
+        non-blank cells, compressed by zlib;
+    a delta body: runs of cells changed by a frame;
+    a run: a row, a column, an attribute without its lower 8 bits, which
+        are always 0, and a size of the text in bytes as varints, and
+        the text in UTF-8.
+A keyframe is written every KEYFRAME_EVERY_TICKS ticks and after a resize.
+The file ends with an index of keyframes, (a tick, an offset) each, and
+a footer with the offset of the index, so a player seeks to a tick from
+the nearest keyframe. If the session was killed before the footer was
+written, the index is rebuilt by skipping record bodies.
+
+Show the screen at a tick or play a capture from a tick:
+    python3 main.py --capture session.cap
+    python3 -m space_game.capture session.cap --tick 600
+    python3 -m space_game.capture session.cap --tick 600 --play
+"""
+
+import argparse
+from bisect import bisect_right
+import curses
+from pathlib import Path
+import struct
+import time
+from typing import (
+    BinaryIO, Callable, Iterator, List, NoReturn, Optional, Tuple
+)
+import zlib
+
+from space_game.renderer import Run, run_text
+from space_game.settings import CaptureSettings, LoopSettings
+from space_game.spectator import Screen, TextRun
+
+
+MAGIC = b'SGSC'
+INDEX_MAGIC = b'SGIX'
+# It's bumped whenever the format of captures changes
+CAPTURE_VERSION = 1
+
+HEADER = struct.Struct('<4sB')
+# A kind, a tick and a size of the body
+RECORD = struct.Struct('<cII')
+SIZE = struct.Struct('<HH')
+# A tick and an offset of a keyframe
+INDEX_ENTRY = struct.Struct('<IQ')
+# An offset of the index, a number of its entries and the last tick
+FOOTER = struct.Struct('<QII4s')
+
+KEYFRAME = b'K'
+DELTA = b'D'
+
+
+def _encode_runs(runs: List[TextRun]) -> bytes:
+    data = bytearray()
+    for y, x, text, attr in runs:
+        encoded = text.encode()
+        for value in (y, x, attr >> 8, len(encoded)):
+            # A varint: 7 bits per byte, the high bit is set if more
+            # bytes follow
+            while value >= 0x80:
+                data.append(value & 0x7f | 0x80)
+                value >>= 7
+            data.append(value)
+        data += encoded
+    return bytes(data)
+
+
+def _decode_runs(body: bytes, offset: int = 0) -> List[TextRun]:
+    runs = []
+    while offset < len(body):
+        values = []
+        for _ in range(4):
+            value = shift = 0
+            while True:
+                byte = body[offset]
+                offset += 1
+                value |= (byte & 0x7f) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            values.append(value)
+
+        y, x, attr, size = values
+        runs.append((y, x, body[offset:offset + size].decode(), attr << 8))
+        offset += size
+    return runs
+
+
+class ScreenRecorder:
+    """
+    Write frames of the renderer to a capture file, it's a listener of
+    the renderer.
+
+    Only a copy of the screen (for keyframes) and the keyframe index, which
+    grows by an entry every KEYFRAME_EVERY_TICKS ticks, are kept in memory.
+    Records go to the file through a buffer of a fixed size.
+    """
+
+    def __init__(self,
+                 path: Path,
+                 keyframe_every: Optional[int]
+                 = CaptureSettings.KEYFRAME_EVERY_TICKS,
+                 buffer_size: Optional[int] = CaptureSettings.BUFFER_SIZE):
+        """
+        :param path: a file to write the capture to
+        :param keyframe_every: a number of ticks between keyframes
+        :param buffer_size: a size of the write buffer in bytes
+        """
+
+        if keyframe_every <= 0:
+            raise ValueError(
+                f'Wrong keyframe_every value {keyframe_every}. '
+                f'Expects positive int.')
+
+        self._path = path
+        self._keyframe_every = keyframe_every
+        self._buffer_size = buffer_size
+        self._file: Optional[BinaryIO] = None
+        self._get_tick: Optional[Callable[[], int]] = None
+
+        self._screen = Screen()
+        self._index: List[Tuple[int, int]] = []
+        self._last_tick = 0
+
+        self.n_bytes = 0
+
+    def start(self, get_tick: Callable[[], int]) -> NoReturn:
+        """
+        :param get_tick: a function returning the current tick
+        """
+
+        self._get_tick = get_tick
+        self._file = open(self._path, 'wb', buffering=self._buffer_size)
+        self._write(HEADER.pack(MAGIC, CAPTURE_VERSION))
+
+    def frame_flushed(self,
+                      height: int,
+                      width: int,
+                      runs: List[Run]) -> NoReturn:
+        if self._file is None:
+            return
+
+        tick = self._get_tick()
+        self._last_tick = tick
+        text_runs = [(y, x, run_text(symbols), attr)
+                     for y, x, symbols, attr in runs]
+        screen = self._screen
+        resized = (height, width) != (screen.height, screen.width)
+        if resized:
+            screen.resize(height, width)
+        screen.apply(text_runs)
+
+        if (resized or not self._index
+                or tick >= self._index[-1][0] + self._keyframe_every):
+            self._index.append((tick, self.n_bytes))
+            self._write_record(KEYFRAME, tick, zlib.compress(
+                SIZE.pack(height, width) + _encode_runs(screen.runs())))
+        elif text_runs:
+            self._write_record(DELTA, tick, _encode_runs(text_runs))
+
+    def close(self) -> NoReturn:
+        """Write the keyframe index and close the file."""
+
+        if self._file is None:
+            return
+
+        index_offset = self.n_bytes
+        for tick, offset in self._index:
+            self._write(INDEX_ENTRY.pack(tick, offset))
+        self._write(FOOTER.pack(index_offset, len(self._index),
+                                self._last_tick, INDEX_MAGIC))
+        self._file.close()
+        self._file = None
+
+    def _write_record(self, kind: bytes, tick: int, body: bytes) -> NoReturn:
+        self._write(RECORD.pack(kind, tick, len(body)))
+        self._write(body)
+
+    def _write(self, data: bytes) -> NoReturn:
+        self._file.write(data)
+        self.n_bytes += len(data)
+
+
+class ScreenPlayer:
+    """
+    Read screens of a capture at any tick. A screen is restored from
+    the nearest keyframe before the tick, so seeking costs the same
+    wherever the tick is.
+
+    The screen at a tick is the last frame rendered in it.
+    """
+
+    def __init__(self, path: Path):
+        self._file = open(path, 'rb')
+        magic, version = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(
+                f'Wrong capture version {version}. '
+                f'Expects {CAPTURE_VERSION}.')
+
+        # Ticks and offsets of keyframes
+        self._ticks: List[int] = []
+        self._offsets: List[int] = []
+        self.last_tick = 0
+        if not self._read_index():
+            self._scan()
+
+    def __enter__(self) -> 'ScreenPlayer':
+        return self
+
+    def __exit__(self, *args) -> NoReturn:
+        self.close()
+
+    def close(self) -> NoReturn:
+        self._file.close()
+
+    @property
+    def keyframe_ticks(self) -> List[int]:
+        return list(self._ticks)
+
+    def seek(self, tick: int) -> Screen:
+        """Return the screen at the tick."""
+
+        screen = Screen()
+        position = bisect_right(self._ticks, tick) - 1
+        if position < 0:
+            return screen
+
+        self._file.seek(self._offsets[position])
+        for kind, record_tick, body in self._records():
+            if record_tick > tick:
+                break
+            self._apply(screen, kind, body)
+        return screen
+
+    def frames(self, start_tick: Optional[int] = 0) \
+            -> Iterator[Tuple[int, Screen]]:
+        """
+        Yield (a tick, the screen) for every tick with frames from
+        start_tick till the end. The screen is the same object updated
+        in place.
+        """
+
+        if not self._ticks:
+            return
+
+        position = max(bisect_right(self._ticks, start_tick) - 1, 0)
+        screen = Screen()
+        self._file.seek(self._offsets[position])
+        tick = None
+        for kind, record_tick, body in self._records():
+            if tick is not None and record_tick != tick and tick >= start_tick:
+                yield tick, screen
+            tick = record_tick
+            self._apply(screen, kind, body)
+
+        if tick is not None and tick >= start_tick:
+            yield tick, screen
+
+    @staticmethod
+    def _apply(screen: Screen, kind: bytes, body: bytes) -> NoReturn:
+        if kind == KEYFRAME:
+            body = zlib.decompress(body)
+            height, width = SIZE.unpack_from(body)
+            screen.resize(height, width)
+            screen.clear()
+            screen.apply(_decode_runs(body, SIZE.size))
+        else:
+            screen.apply(_decode_runs(body))
+
+    def _records(self) -> Iterator[Tuple[bytes, int, bytes]]:
+        while True:
+            header = self._file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            kind, tick, size = RECORD.unpack(header)
+            if kind not in (KEYFRAME, DELTA):
+                # The keyframe index
+                return
+            body = self._file.read(size)
+            if len(body) < size:
+                # The session was killed while the record was written
+                return
+            yield kind, tick, body
+
+    def _read_index(self) -> bool:
+        file = self._file
+        end = file.seek(0, 2)
+        if end < HEADER.size + FOOTER.size:
+            return False
+        file.seek(end - FOOTER.size)
+        index_offset, n_entries, last_tick, magic = FOOTER.unpack(
+            file.read(FOOTER.size))
+        if magic != INDEX_MAGIC:
+            return False
+
+        file.seek(index_offset)
+        data = file.read(n_entries * INDEX_ENTRY.size)
+        for tick, offset in INDEX_ENTRY.iter_unpack(data):
+            self._ticks.append(tick)
+            self._offsets.append(offset)
+        self.last_tick = last_tick
+        return True
+
+    def _scan(self) -> NoReturn:
+        file = self._file
+        offset = file.seek(HEADER.size)
+        while True:
+            header = file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                break
+            kind, tick, size = RECORD.unpack(header)
+            if kind == KEYFRAME:
+                self._ticks.append(tick)
+                self._offsets.append(offset)
+            self.last_tick = tick
+            offset = file.seek(size, 1)
+
+
+def play(window,
+         player: ScreenPlayer,
+         start_tick: int,
+         rate: float) -> NoReturn:
+    """Draw frames in the window in their pace till the end or "q" key."""
+
+    curses.curs_set(False)
+    window.nodelay(True)
+    started = time.monotonic()
+    for tick, screen in player.frames(start_tick):
+        delay = started + (tick - start_tick) / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if window.getch() == ord('q'):
+            return
+
+        height, width = window.getmaxyx()
+        window.erase()
+        for y, x, text, attr in screen.runs():
+            text = text[:width - x]
+            if y >= height or not text:
+                continue
+            try:
+                window.addstr(y, x, text, attr)
+            except curses.error:
+                # The lower right corner of the window
+                pass
+        window.refresh()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('capture', type=Path)
+    parser.add_argument('--tick', type=int, default=0,
+                        help='a tick to show or to play from')
+    parser.add_argument('--play', action='store_true',
+                        help='play the capture in the terminal')
+    parser.add_argument('--rate', type=float,
+                        default=LoopSettings.SIMULATION_RATE,
+                        help='ticks per second of the playback')
+    args = parser.parse_args()
+
+    with ScreenPlayer(args.capture) as player:
+        if args.play:
+            curses.wrapper(play, player, args.tick, args.rate)
+            return
+
+        print('\n'.join(player.seek(args.tick).lines()))
+        print(f'{player.last_tick + 1} ticks, '
+              f'{len(player.keyframe_ticks)} keyframes')
+
+
+if __name__ == '__main__':
+    main()
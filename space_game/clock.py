@@ -0,0 +1,182 @@
+import asyncio
+import time
+from typing import Callable, List, NoReturn, Optional
+
+
+class FrameSkipPolicy:
+    # Render every tick even if the game falls behind the schedule
+    NEVER = 'never'
+    # Skip rendering of a tick which ends behind the schedule, so the next
+    # ticks have more time to catch up
+    WHEN_BEHIND = 'when_behind'
+
+
+class FixedStepClock:
+    """
+    A fixed timestep clock for the game loop.
+
+    Tick deadlines are counted from the start by a monotonic clock, and the
+    loop sleeps only for the time left till the next deadline. So the tick
+    rate doesn't depend on how long a tick takes, until a tick overruns its
+    budget. Then the next ticks are run without a delay to catch up, and
+    rendering may be skipped (but never simulation) according to the policy.
+    """
+
+    def __init__(self,
+                 tick_duration: float,
+                 frame_skip: Optional[str] = FrameSkipPolicy.WHEN_BEHIND,
+                 max_skipped_frames: Optional[int] = 5,
+                 max_lag_ticks: Optional[int] = 10,
+                 clock: Optional[Callable[[], float]] = time.monotonic):
+        """
+        :param tick_duration: a duration of a tick in seconds
+        :param frame_skip: one of FrameSkipPolicy values
+        :param max_skipped_frames: a max number of frames skipped in a row
+        :param max_lag_ticks: if the loop falls behind by more ticks than
+            this, it stops catching up and continues from the current time,
+            i.e. the game slows down instead of running ticks back to back
+        :param clock: a monotonic clock returning seconds
+        """
+
+        if tick_duration <= 0:
+            raise ValueError(
+                f'Wrong tick_duration value {tick_duration}. '
+                f'Expects positive float.')
+
+        if frame_skip not in (FrameSkipPolicy.NEVER,
+                              FrameSkipPolicy.WHEN_BEHIND):
+            raise ValueError(
+                f'Wrong frame_skip value {frame_skip}. '
+                f'Expects one of FrameSkipPolicy values.')
+
+        self.tick_duration = tick_duration
+        self._frame_skip = frame_skip
+        self._max_skipped_frames = max_skipped_frames
+        self._max_lag = max_lag_ticks * tick_duration
+        self._clock = clock
+
+        self._deadline = None
+        self._skipped_in_row = 0
+
+        self.n_ticks = 0
+        self.n_overruns = 0
+        self.n_skipped_frames = 0
+        self.n_resyncs = 0
+
+    def start(self) -> NoReturn:
+        self._deadline = self._clock() + self.tick_duration
+
+    def time_till(self, phase: float) -> float:
+        """
+        Return seconds left till the phase of the current tick, it's
+        negative if the phase has passed.
+        :param phase: 0 is the start of the tick and 1 is its end
+        """
+
+        return (self._deadline - (1 - phase) * self.tick_duration
+                - self._clock())
+
+    def should_render(self) -> bool:
+        """
+        Decide whether the tick, which has just been simulated, is rendered.
+        """
+
+        behind = self._clock() > self._deadline
+        if (behind
+                and self._frame_skip == FrameSkipPolicy.WHEN_BEHIND
+                and self._skipped_in_row < self._max_skipped_frames):
+            self._skipped_in_row += 1
+            self.n_skipped_frames += 1
+            return False
+
+        self._skipped_in_row = 0
+        return True
+
+    async def wait_async(self) -> NoReturn:
+        """
+        Sleep till the end of the current tick and start the next one.
+        The time is given to an asyncio event loop, so it can handle I/O,
+        like input, while the game waits.
+        """
+
+        delay = self._finish_tick()
+        # The loop runs ready callbacks even if there is no time left
+        await asyncio.sleep(max(delay, 0))
+
+    def _finish_tick(self) -> float:
+        """
+        Account the end of the current tick and set the deadline of
+        the next one.
+        :return: seconds left till the end of the current tick
+        """
+
+        self.n_ticks += 1
+        now = self._clock()
+        delay = self._deadline - now
+        if delay <= 0:
+            self.n_overruns += 1
+            if -delay > self._max_lag:
+                # The game can't keep up, so the lag is dropped
+                self._deadline = now
+                self.n_resyncs += 1
+
+        self._deadline += self.tick_duration
+        return delay
+
+
+class RenderSchedule:
+    """
+    Frames of the render rate on the timeline of ticks of the simulation
+    rate.
+
+    Time of frames is counted in ticks, so the same schedule drives both
+    the real time loop and the headless one. A frame at the phase 0 of
+    a tick shows the state right after the tick. A frame at a phase between
+    0 and 1 shows objects on their way to the next tick, so a render rate
+    above the simulation rate gives smooth movement. A render rate below it
+    draws only some ticks, and the renderer sends all changes since the last
+    frame at once.
+    """
+
+    def __init__(self,
+                 simulation_rate: float,
+                 render_rate: Optional[float] = None):
+        """
+        :param simulation_rate: ticks per second
+        :param render_rate: frames per second, it's the simulation rate
+            by default
+        """
+
+        if render_rate is None:
+            render_rate = simulation_rate
+        for name, rate in (('simulation_rate', simulation_rate),
+                           ('render_rate', render_rate)):
+            if rate <= 0:
+                raise ValueError(
+                    f'Wrong {name} value {rate}. Expects positive float.')
+
+        self.simulation_rate = simulation_rate
+        self.render_rate = render_rate
+        self._ticks_per_frame = simulation_rate / render_rate
+        self._n_frames = 0
+
+    @property
+    def interpolates(self) -> bool:
+        """Return True if there are frames between ticks."""
+
+        return self._ticks_per_frame < 1
+
+    def frames_in_tick(self, tick: int) -> List[float]:
+        """
+        Return phases of frames which fall on the tick, a frame due while
+        an earlier tick was simulated is drawn at the start of this one.
+        :param tick: a number of the tick, they go one by one from 0
+        """
+
+        phases = []
+        while True:
+            frame_time = self._n_frames * self._ticks_per_frame
+            if frame_time >= tick + 1:
+                return phases
+            phases.append(max(frame_time - tick, 0.0))
+            self._n_frames += 1
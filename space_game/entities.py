@@ -0,0 +1,511 @@
+import time
+from typing import Dict, List, NamedTuple, NoReturn, Optional, Tuple, Union
+
+import numpy as np
+
+from space_game.utils import draw_frame, sweep_frames, Frame
+
+
+# Kinds of entities kept in EntityPool
+RUBBISH = 0
+PROJECTILE = 1
+KINDS = (RUBBISH, PROJECTILE)
+
+# A handle of an entity keeps its slot in the lower bits and a generation of
+# the slot in the upper ones
+SLOT_BITS = 32
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+class Hit(NamedTuple):
+    """
+    A projectile which hit a rubbish, both are handles, x and y are
+    the rubbish position after the step.
+    """
+
+    projectile: int
+    rubbish: int
+    x: float
+    y: float
+
+
+class EntityPool:
+    """
+    A struct of arrays for rubbish and projectiles.
+
+    Positions, speeds, sizes, frame ids, kinds and alive flags of all
+    entities are kept in contiguous NumPy arrays, where an entity is just
+    an index (a slot). So all entities are moved, checked against the map
+    bounds and checked for projectile-vs-rubbish hits by a handful of array
+    operations per tick. Python code runs only for entities which have to be
+    redrawn.
+
+    Entities are referred by integer handles, which are a slot and
+    a generation of the slot. The generation changes when an entity dies, so
+    a handle of a dead entity never refers to a new entity in the same slot.
+    Slots of dead entities are reused by new ones, but only after they are
+    erased by render, so it's safe to kill entities at any moment, even while
+    iterating over results of a query.
+
+    Alive slots are also kept per kind, so queries for a kind touch only
+    entities of this kind.
+    """
+
+    def __init__(self, capacity: Optional[int] = 64):
+        if capacity <= 0:
+            raise ValueError(
+                f'Wrong capacity value {capacity}. Expects positive int.')
+
+        self._size = 0
+        self._n_alive = 0
+        # A Profiler to account drawing to, see profiler.py
+        self.profiler = None
+        self._free: List[int] = []
+        # Slots of entities killed during the tick. They are erased from
+        # the canvas by render and can't be reused before that.
+        self._dead: List[int] = []
+        # Alive slots of every kind in order of spawning, dicts are used as
+        # ordered sets. Their arrays are cached till the next change.
+        self._kind_slots: Dict[int, Dict[int, None]] = {
+            kind: {} for kind in KINDS
+        }
+        self._kind_arrays: Dict[int, Optional[np.ndarray]] = {
+            kind: None for kind in KINDS
+        }
+
+        self._frames: List[Frame] = []
+        self._frame_ids: Dict[Frame, int] = {}
+
+        self._xs = np.zeros(capacity, dtype=np.float64)
+        self._ys = np.zeros(capacity, dtype=np.float64)
+        self._x_speeds = np.zeros(capacity, dtype=np.float64)
+        self._y_speeds = np.zeros(capacity, dtype=np.float64)
+        self._widths = np.zeros(capacity, dtype=np.int64)
+        self._heights = np.zeros(capacity, dtype=np.int64)
+        self._frame_indices = np.zeros(capacity, dtype=np.int64)
+        self._kinds = np.zeros(capacity, dtype=np.int8)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._generations = np.zeros(capacity, dtype=np.int64)
+
+        # Where an entity is drawn now, to erase it when it moves
+        self._drawn = np.zeros(capacity, dtype=bool)
+        self._drawn_xs = np.zeros(capacity, dtype=np.int64)
+        self._drawn_ys = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self) -> int:
+        """Return a number of alive entities."""
+
+        return self._n_alive
+
+    def count(self, kind: int) -> int:
+        return len(self._kind_slots[kind])
+
+    def is_alive(self, handle: int) -> bool:
+        slot = handle & SLOT_MASK
+        return (slot < self._size and bool(self._alive[slot])
+                and self._generations[slot] == handle >> SLOT_BITS)
+
+    def position(self, handle: int) -> Tuple[float, float]:
+        slot = self._slot(handle)
+        return float(self._xs[slot]), float(self._ys[slot])
+
+    def frame(self, handle: int) -> Frame:
+        return self._frames[self._frame_indices[self._slot(handle)]]
+
+    def handles(self, kind: int) -> List[int]:
+        """Return handles of alive entities of the kind."""
+
+        return self._handles(self._slots_of(kind))
+
+    def spawn(self,
+              kind: int,
+              frame: Frame,
+              x: Union[float, int],
+              y: Union[float, int],
+              x_speed: Optional[Union[float, int]] = 0,
+              y_speed: Optional[Union[float, int]] = 0) -> int:
+        """
+        Add an entity. It's drawn for the first time by render after
+        the next step, i.e. at (x + x_speed, y + y_speed).
+        :return: a handle of the entity
+        """
+
+        if kind not in KINDS:
+            raise ValueError(
+                f'Wrong kind value {kind}. Expects one of {KINDS}.')
+
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self._xs):
+                self._grow()
+            slot = self._size
+            self._size += 1
+
+        frame_index = self._frame_ids.get(frame)
+        if frame_index is None:
+            frame_index = self._frame_ids[frame] = len(self._frames)
+            self._frames.append(frame)
+
+        self._xs[slot] = x
+        self._ys[slot] = y
+        self._x_speeds[slot] = x_speed
+        self._y_speeds[slot] = y_speed
+        self._widths[slot] = frame.width
+        self._heights[slot] = frame.height
+        self._frame_indices[slot] = frame_index
+        self._kinds[slot] = kind
+        self._alive[slot] = True
+        self._drawn[slot] = False
+        self._n_alive += 1
+        self._kind_slots[kind][slot] = None
+        self._kind_arrays[kind] = None
+        return self._handles([slot])[0]
+
+    def kill(self, handle: int) -> NoReturn:
+        """Kill an entity, a handle of a dead entity is ignored."""
+
+        if self.is_alive(handle):
+            self._kill_slot(handle & SLOT_MASK)
+
+    def overlapping(self,
+                    x: Union[float, int],
+                    y: Union[float, int],
+                    width: int,
+                    height: int,
+                    kind: int) -> List[int]:
+        """
+        Return handles of alive entities of the kind whose framing
+        rectangles intersect the rectangle. As in MapObject.intersect, edges
+        are included.
+        """
+
+        slots = self._slots_of(kind)
+        if not slots.size:
+            return []
+
+        xs, ys = self._xs[slots], self._ys[slots]
+        mask = ((xs <= x + width) & (x <= xs + self._widths[slots])
+                & (ys <= y + height) & (y <= ys + self._heights[slots]))
+        return self._handles(slots[mask])
+
+    def step(self,
+             max_x: int,
+             max_y: int,
+             exact: Optional[bool] = False) -> List[Hit]:
+        """
+        Move all entities by their speeds, resolve projectile-vs-rubbish
+        hits and kill ones which left the map. Both the projectile and
+        the rubbish are killed on a hit.
+
+        Hits are checked along the whole way of entities during the step,
+        not only at their new positions, so a fast projectile doesn't fly
+        through a small rubbish. If a projectile meets several rubbish or
+        a rubbish is met by several projectiles, the first contact wins.
+
+        Rubbish flies till it passes the bottom of the map, a projectile
+        lives while it's strictly inside of the map borders. They hit each
+        other only while both are on the map.
+        :param exact: check hits by frame masks after framing rectangles
+        :return: hits in order of contacts
+        """
+
+        n = self._size
+        if not n:
+            return []
+
+        # Speeds of dead entities are zero, so all slots are moved at once
+        xs, ys = self._xs[:n], self._ys[:n]
+        xs += self._x_speeds[:n]
+        ys += self._y_speeds[:n]
+
+        hits = self._resolve_hits(max_x, max_y, exact)
+
+        rubbish = self._slots_of(RUBBISH)
+        gone = rubbish[ys[rubbish] >= max_y]
+        projectiles = self._slots_of(PROJECTILE)
+        p_xs, p_ys = xs[projectiles], ys[projectiles]
+        gone_projectiles = projectiles[~((1 < p_xs) & (p_xs < max_x)
+                                         & (1 < p_ys) & (p_ys < max_y))]
+        for slot in gone.tolist() + gone_projectiles.tolist():
+            self._kill_slot(slot)
+
+        return hits
+
+    def render(self,
+               canvas,
+               area: Optional[Tuple[int, int, int, int]] = None,
+               phase: Optional[float] = 0) -> NoReturn:
+        """
+        Erase entities which moved or died and draw ones which moved or
+        were born. Entities which stay at the same cell aren't touched.
+        :param area: (top, left, bottom, right) of the visible part of
+            the map, bottom and right are excluded. Entities out of it are
+            culled as a whole and drawn once they come into view. All
+            entities are visible if it's None.
+        :param phase: a share of the next step which entities are drawn
+            at, speeds don't change between steps, so it's exactly where
+            they will be
+        """
+
+        if self.profiler is None:
+            self._render(canvas, area, phase)
+            return
+
+        started = time.perf_counter()
+        try:
+            self._render(canvas, area, phase)
+        finally:
+            self.profiler.add_section('draw_entities',
+                                      time.perf_counter() - started)
+
+    def _render(self,
+                canvas,
+                area: Optional[Tuple[int, int, int, int]],
+                phase: float) -> NoReturn:
+        n = self._size
+        if not n:
+            return
+
+        alive, drawn = self._alive[:n], self._drawn[:n]
+        xs, ys = self._xs[:n], self._ys[:n]
+        if phase:
+            xs = xs + phase * self._x_speeds[:n]
+            ys = ys + phase * self._y_speeds[:n]
+        new_xs = np.rint(xs).astype(np.int64)
+        new_ys = np.rint(ys).astype(np.int64)
+        drawn_xs, drawn_ys = self._drawn_xs[:n], self._drawn_ys[:n]
+        frames, frame_indices = self._frames, self._frame_indices[:n]
+
+        # All erasing goes before drawing, so an entity doesn't erase
+        # another one drawn in the same tick.
+        moved = drawn & (~alive | (new_xs != drawn_xs) | (new_ys != drawn_ys))
+        slots = np.flatnonzero(moved)
+        for x, y, frame_index in zip(drawn_xs[slots].tolist(),
+                                     drawn_ys[slots].tolist(),
+                                     frame_indices[slots].tolist()):
+            draw_frame(canvas, x, y, frames[frame_index], negative=True)
+        drawn[slots] = False
+
+        to_draw = alive & ~drawn
+        if area is not None:
+            top, left, bottom, right = area
+            to_draw &= ((new_xs + self._widths[:n] > left)
+                        & (new_xs < right)
+                        & (new_ys + self._heights[:n] > top)
+                        & (new_ys < bottom))
+        slots = np.flatnonzero(to_draw)
+        for x, y, frame_index in zip(new_xs[slots].tolist(),
+                                     new_ys[slots].tolist(),
+                                     frame_indices[slots].tolist()):
+            draw_frame(canvas, x, y, frames[frame_index])
+        drawn[slots] = True
+        drawn_xs[slots] = new_xs[slots]
+        drawn_ys[slots] = new_ys[slots]
+
+        # Dead entities are erased now, so their slots are free
+        self._free.extend(self._dead)
+        self._dead.clear()
+
+    def clamp(self, max_x: int) -> int:
+        """
+        Move rubbish which is out of the map after it has become narrower
+        back to its right side, where new rubbish may start too.
+        :return: a number of moved entities
+        """
+
+        rubbish = self._slots_of(RUBBISH)
+        moved = rubbish[self._xs[rubbish] > max_x - 2]
+        self._xs[moved] = max_x - 2
+        return moved.size
+
+    def invalidate(self) -> NoReturn:
+        """
+        Forget what is drawn, for example, when the screen is cleared.
+        Visible entities are drawn again by the next render.
+        """
+
+        self._drawn[:self._size] = False
+
+    def _slot(self, handle: int) -> int:
+        if not self.is_alive(handle):
+            raise KeyError(f'Entity {handle} is dead.')
+        return handle & SLOT_MASK
+
+    def _handles(self, slots) -> List[int]:
+        slots = np.asarray(slots, dtype=np.int64)
+        return ((self._generations[slots] << SLOT_BITS) | slots).tolist()
+
+    def _slots_of(self, kind: int) -> np.ndarray:
+        slots = self._kind_arrays[kind]
+        if slots is None:
+            slots = self._kind_arrays[kind] = np.fromiter(
+                self._kind_slots[kind], dtype=np.int64,
+                count=len(self._kind_slots[kind]))
+        return slots
+
+    def _kill_slot(self, slot: int) -> NoReturn:
+        kind = int(self._kinds[slot])
+        self._alive[slot] = False
+        self._generations[slot] += 1
+        self._x_speeds[slot] = self._y_speeds[slot] = 0
+        self._n_alive -= 1
+        del self._kind_slots[kind][slot]
+        self._kind_arrays[kind] = None
+        self._dead.append(slot)
+
+    def _resolve_hits(self,
+                      max_x: int,
+                      max_y: int,
+                      exact: bool) -> List[Hit]:
+        projectiles = self._slots_of(PROJECTILE)
+        rubbish = self._slots_of(RUBBISH)
+        if not projectiles.size or not rubbish.size:
+            return []
+
+        # Entities are already moved, so they started the step at their
+        # positions less their speeds
+        x_speeds, y_speeds = self._x_speeds, self._y_speeds
+        p_dxs, p_dys = x_speeds[projectiles], y_speeds[projectiles]
+        r_dxs, r_dys = x_speeds[rubbish], y_speeds[rubbish]
+        p_xs = self._xs[projectiles] - p_dxs
+        p_ys = self._ys[projectiles] - p_dys
+        r_xs = self._xs[rubbish] - r_dxs
+        r_ys = self._ys[rubbish] - r_dys
+        widths, heights = self._widths, self._heights
+
+        # Boxes which entities sweep during the step are compared first, so
+        # only pairs which may meet are checked further
+        p_widths, p_heights = widths[projectiles], heights[projectiles]
+        r_widths, r_heights = widths[rubbish], heights[rubbish]
+        p_lefts = np.minimum(p_xs, p_xs + p_dxs)
+        p_tops = np.minimum(p_ys, p_ys + p_dys)
+        r_lefts = np.minimum(r_xs, r_xs + r_dxs)
+        r_tops = np.minimum(r_ys, r_ys + r_dys)
+        p_rights = p_lefts + np.abs(p_dxs) + p_widths
+        p_bottoms = p_tops + np.abs(p_dys) + p_heights
+        r_rights = r_lefts + np.abs(r_dxs) + r_widths
+        r_bottoms = r_tops + np.abs(r_dys) + r_heights
+        pairs = np.argwhere((p_lefts[:, None] <= r_rights[None, :])
+                            & (r_lefts[None, :] <= p_rights[:, None])
+                            & (p_tops[:, None] <= r_bottoms[None, :])
+                            & (r_tops[None, :] <= p_bottoms[:, None]))
+        if not pairs.size:
+            return []
+        p_indices, r_indices = pairs[:, 0], pairs[:, 1]
+
+        # A projectile moves along a segment relative to a rubbish, so every
+        # pair is checked by a segment-vs-rectangle test. As in
+        # MapObject.intersect, edges are included.
+        enter, leave = _sweep_axis(
+            p_xs[p_indices] - r_xs[r_indices],
+            p_dxs[p_indices] - r_dxs[r_indices],
+            -p_widths[p_indices], r_widths[r_indices])
+        axis_enter, axis_leave = _sweep_axis(
+            p_ys[p_indices] - r_ys[r_indices],
+            p_dys[p_indices] - r_dys[r_indices],
+            -p_heights[p_indices], r_heights[r_indices])
+        enter = np.maximum(np.maximum(enter, axis_enter), 0)
+        leave = np.minimum(np.minimum(leave, axis_leave), 1)
+
+        # Besides, both have to be on the map by the same bounds as step
+        # kills them by: a projectile strictly inside of its borders and
+        # a rubbish strictly above its bottom. So these bounds are excluded.
+        map_enter, map_leave = -np.inf, np.inf
+        for starts, moves, low, high in (
+                (p_xs[p_indices], p_dxs[p_indices], 1, max_x),
+                (p_ys[p_indices], p_dys[p_indices], 1, max_y),
+                (r_ys[r_indices], r_dys[r_indices], -np.inf, max_y)):
+            axis_enter, axis_leave = _sweep_axis(starts, moves, low, high,
+                                                 closed=False)
+            map_enter = np.maximum(map_enter, axis_enter)
+            map_leave = np.minimum(map_leave, axis_leave)
+
+        met = ((enter <= leave) & (map_enter < map_leave)
+               & (enter < map_leave) & (map_enter < leave))
+        pairs = pairs[met].tolist()
+        # Objects meet right after entering the map if they overlap then
+        times = np.maximum(enter, map_enter)[met].tolist()
+        leave = np.minimum(leave, map_leave)[met].tolist()
+
+        frames, frame_indices = self._frames, self._frame_indices
+        projectiles, rubbish = projectiles.tolist(), rubbish.tolist()
+        if exact:
+            contacts = []
+            for (p_index, r_index), time, last in zip(pairs, times, leave):
+                projectile, hit_rubbish = (projectiles[p_index],
+                                           rubbish[r_index])
+                time = sweep_frames(
+                    frames[frame_indices[projectile]],
+                    p_xs[p_index], p_ys[p_index],
+                    p_dxs[p_index], p_dys[p_index],
+                    frames[frame_indices[hit_rubbish]],
+                    r_xs[r_index], r_ys[r_index],
+                    r_dxs[r_index], r_dys[r_index],
+                    time, last)
+                if time is not None:
+                    contacts.append((time, p_index, r_index))
+        else:
+            contacts = [(time, p_index, r_index)
+                        for (p_index, r_index), time in zip(pairs, times)]
+
+        hits = []
+        xs, ys = self._xs, self._ys
+        # Contacts go in order of time and then of projectiles, so
+        # a projectile hits the first rubbish it meets, and a rubbish is
+        # destroyed only once.
+        for _, p_index, r_index in sorted(contacts):
+            projectile, hit_rubbish = projectiles[p_index], rubbish[r_index]
+            if not (self._alive[projectile] and self._alive[hit_rubbish]):
+                continue
+
+            projectile_handle, rubbish_handle = self._handles(
+                [projectile, hit_rubbish])
+            hits.append(Hit(projectile_handle, rubbish_handle,
+                            float(xs[hit_rubbish]), float(ys[hit_rubbish])))
+            self._kill_slot(projectile)
+            self._kill_slot(hit_rubbish)
+
+        return hits
+
+    def _grow(self) -> NoReturn:
+        capacity = len(self._xs) * 2
+        for name in ('_xs', '_ys', '_x_speeds', '_y_speeds', '_widths',
+                     '_heights', '_frame_indices', '_kinds', '_alive',
+                     '_generations', '_drawn', '_drawn_xs', '_drawn_ys'):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+
+def _sweep_axis(starts: np.ndarray,
+                moves: np.ndarray,
+                lows,
+                highs,
+                closed: Optional[bool] = True) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return shares of a move while coordinates moving from starts by moves
+    are between lows and highs. Shares aren't clipped by the move, and
+    the first one is bigger than the second one if a coordinate is never
+    between them.
+    :param closed: whether lows and highs are included, otherwise
+        the coordinate is between them strictly between the shares
+    """
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        low_times = (lows - starts) / moves
+        high_times = (highs - starts) / moves
+    enter = np.minimum(low_times, high_times)
+    leave = np.maximum(low_times, high_times)
+
+    # Still coordinates are between bounds during the whole move or never
+    still = moves == 0
+    if closed:
+        inside = (lows <= starts) & (starts <= highs)
+    else:
+        inside = (lows < starts) & (starts < highs)
+    enter = np.where(still, np.where(inside, -np.inf, np.inf), enter)
+    leave = np.where(still, np.where(inside, np.inf, -np.inf), leave)
+    return enter, leave
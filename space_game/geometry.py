@@ -0,0 +1,82 @@
+from typing import Optional, Tuple
+
+
+class Geometry:
+    """
+    Cached sizes of the screen and of the world.
+
+    Coroutines read bounds from here every time they need them instead of
+    asking a window, and refresh is called only when the terminal is
+    resized. version is bumped by every change, so objects which depend on
+    the layout (like sub-windows) know when to rebuild themselves.
+    """
+
+    def __init__(self,
+                 window,
+                 world_height: Optional[int] = None,
+                 world_width: Optional[int] = None):
+        """
+        :param window: a window of the screen
+        :param world_height: a height of the world, it's at least the height
+            of the screen, which is also the default
+        :param world_width: a width of the world, it's at least the width of
+            the screen, which is also the default
+        """
+
+        self._window = window
+        self._world_height = world_height
+        self._world_width = world_width
+
+        self.screen_height = self.screen_width = 0
+        self.world_height = self.world_width = 0
+        self.version = 0
+        self.refresh()
+
+    @property
+    def max_y(self) -> int:
+        """Return the last row of the world, like get_canvas_size."""
+
+        return self.world_height - 1
+
+    @property
+    def max_x(self) -> int:
+        """Return the last column of the world, like get_canvas_size."""
+
+        return self.world_width - 1
+
+    @property
+    def screen_max_y(self) -> int:
+        return self.screen_height - 1
+
+    @property
+    def screen_max_x(self) -> int:
+        return self.screen_width - 1
+
+    @property
+    def is_scrolling(self) -> bool:
+        """Return True if the world doesn't fit into the screen."""
+
+        return (self.world_height > self.screen_height
+                or self.world_width > self.screen_width)
+
+    def world_size(self) -> Tuple[int, int]:
+        return self.world_height, self.world_width
+
+    def refresh(self) -> bool:
+        """
+        Read the size of the screen again, for example, after KEY_RESIZE.
+        :return: True if the screen or the world has changed its size
+        """
+
+        screen_height, screen_width = self._window.getmaxyx()
+        world_height = max(self._world_height or 0, screen_height)
+        world_width = max(self._world_width or 0, screen_width)
+        sizes = (screen_height, screen_width, world_height, world_width)
+        if sizes == (self.screen_height, self.screen_width,
+                     self.world_height, self.world_width):
+            return False
+
+        (self.screen_height, self.screen_width,
+         self.world_height, self.world_width) = sizes
+        self.version += 1
+        return True
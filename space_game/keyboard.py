@@ -0,0 +1,126 @@
+from collections import deque
+import curses
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class KeyboardQueue:
+    """
+    A queue of keys pressed, stamped with the time they arrived at.
+
+    The queue is filled by poll, which is called by the event loop as soon
+    as stdin becomes readable and before every tick, and it's drained by
+    the game through the window-like getch. A key read in a tick takes
+    effect in this tick, so the time from arrival of a key to the end of
+    the first render which shows the tick is its input latency.
+
+    KEY_RESIZE, which curses returns after SIGWINCH, isn't a key pressed,
+    so it doesn't get into the queue and is reported by on_resize instead.
+    """
+
+    def __init__(self,
+                 window,
+                 max_keys: Optional[int] = 256,
+                 max_latencies: Optional[int] = 1000,
+                 clock: Optional[Callable[[], float]] = time.monotonic,
+                 on_resize: Optional[Callable[[], Any]] = None,
+                 get_tick: Optional[Callable[[], int]] = None):
+        """
+        :param window: a window to read keys from
+        :param max_keys: a max number of keys waiting in the queue, older
+            keys are dropped if nobody reads them
+        :param max_latencies: a number of the last latencies kept for stats
+        :param clock: a monotonic clock returning seconds
+        :param on_resize: a function which is called when the terminal
+            is resized
+        :param get_tick: a function returning the current tick, without it
+            every render is considered to show all keys read before it
+        """
+
+        self._window = window
+        self._clock = clock
+        self._on_resize = on_resize
+        self._get_tick = get_tick
+        self._keys: Deque[Tuple[float, int]] = deque(maxlen=max_keys)
+        # Ticks keys were read in and their arrival times, for keys which
+        # no render has shown yet
+        self._read: List[Tuple[int, float]] = []
+        self._latencies: Deque[float] = deque(maxlen=max_latencies)
+
+        self.n_keys = 0
+
+    def __len__(self) -> int:
+        """Return a number of keys waiting in the queue."""
+
+        return len(self._keys)
+
+    def poll(self) -> int:
+        """
+        Move all keys pressed from the window to the queue.
+        :return: a number of new keys
+        """
+
+        now = self._clock()
+        n_keys = 0
+        while True:
+            key = self._window.getch()
+            if key == -1:
+                break
+            if key == curses.KEY_RESIZE:
+                if self._on_resize is not None:
+                    self._on_resize()
+                continue
+            self._keys.append((now, key))
+            n_keys += 1
+
+        self.n_keys += n_keys
+        return n_keys
+
+    def getch(self) -> int:
+        """Return the next key or -1 if there are no keys, as curses does."""
+
+        if not self._keys:
+            return -1
+
+        arrived, key = self._keys.popleft()
+        tick = self._get_tick() if self._get_tick is not None else 0
+        self._read.append((tick, arrived))
+        return key
+
+    def frame_rendered(self, tick: Optional[int] = None) -> List[float]:
+        """
+        Account the latency of keys shown by a render.
+        :param tick: the last tick the render shows, keys read in it and
+            before it are shown, all keys are if it's None
+        :return: latencies of these keys in seconds
+        """
+
+        if not self._read:
+            return []
+
+        now = self._clock()
+        latencies = [now - arrived for read_tick, arrived in self._read
+                     if tick is None or read_tick <= tick]
+        if len(latencies) == len(self._read):
+            self._read.clear()
+        else:
+            self._read = [(read_tick, arrived)
+                          for read_tick, arrived in self._read
+                          if read_tick > tick]
+        self._latencies.extend(latencies)
+        return latencies
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Return stats of the last latencies in milliseconds."""
+
+        if not self._latencies:
+            return {'keys': 0}
+
+        ordered = sorted(self._latencies)
+        last = len(ordered) - 1
+        return {
+            'keys': len(ordered),
+            'p50_ms': round(ordered[last // 2] * 1e3, 3),
+            'p99_ms': round(ordered[round(last * 0.99)] * 1e3, 3),
+            'max_ms': round(ordered[-1] * 1e3, 3),
+        }
@@ -0,0 +1,105 @@
+import random
+from typing import List, NoReturn, Optional, Tuple
+
+
+class SpawnLanes:
+    """
+    An index of columns of the entry band, i.e. rows above the map where
+    new rubbish appears.
+
+    Rubbish starts right above the map and stays in the band till its top
+    row gets into the map. While it's there, a new rubbish may not start
+    over it, so the index keeps handles of such rubbish and drops them
+    as they fly down. A start column is picked right from free intervals
+    which fit a frame, instead of trying random columns till one fits.
+
+    Rubbish flies straight down, so columns it takes are stored when it
+    starts and only refreshed by update.
+    """
+
+    def __init__(self, entities):
+        """
+        :param entities: an EntityPool with rubbish
+        """
+
+        self._entities = entities
+        # (a handle, the first column, the last column) of rubbish
+        self._taken: List[Tuple[int, int, int]] = []
+
+    def __len__(self) -> int:
+        """Return a number of rubbish in the band."""
+
+        return len(self._taken)
+
+    def add(self, handle: int) -> NoReturn:
+        """Put rubbish which has just started into the band."""
+
+        self._taken.append(self._columns(handle))
+
+    def update(self) -> NoReturn:
+        """
+        Drop rubbish which is dead or has entered the map and take columns
+        of the rest again, in case it was moved (like after a resize).
+        """
+
+        entities = self._entities
+        self._taken = [
+            self._columns(handle) for handle, _, _ in self._taken
+            if entities.is_alive(handle) and entities.position(handle)[1] <= 0
+        ]
+
+    def free_intervals(self,
+                       width: int,
+                       min_x: int,
+                       max_x: int) -> List[Tuple[int, int]]:
+        """
+        Return intervals of start columns where a frame of the width
+        doesn't touch rubbish in the band. As in MapObject.intersect,
+        touching edges are a collision.
+        :param min_x: the first allowed start column
+        :param max_x: the last allowed start column
+        :return: (first, last) columns, both are included
+        """
+
+        blocked = sorted((first - width, last)
+                         for _, first, last in self._taken)
+
+        intervals = []
+        start = min_x
+        for first, last in blocked:
+            if first > start:
+                intervals.append((start, min(first - 1, max_x)))
+            start = max(start, last + 1)
+            if start > max_x:
+                break
+        else:
+            intervals.append((start, max_x))
+
+        return [(first, last) for first, last in intervals if first <= last]
+
+    def choose(self,
+               width: int,
+               min_x: int,
+               max_x: int,
+               rng: Optional[random.Random] = None) -> Optional[int]:
+        """
+        Pick a random start column from free intervals, every free column
+        has the same chance.
+        :param rng: a random generator, the random module by default
+        :return: a column or None if the band has no room for the width
+        """
+
+        intervals = self.free_intervals(width, min_x, max_x)
+        n_free = sum(last - first + 1 for first, last in intervals)
+        if not n_free:
+            return None
+
+        offset = (rng or random).randrange(n_free)
+        for first, last in intervals:
+            if offset <= last - first:
+                return first + offset
+            offset -= last - first + 1
+
+    def _columns(self, handle: int) -> Tuple[int, int, int]:
+        x = int(self._entities.position(handle)[0])
+        return handle, x, x + self._entities.frame(handle).width
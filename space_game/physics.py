@@ -1,5 +1,15 @@
 import math
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+
+# A max change of speed per tick, it's reached when a ship stands still
+ACCELERATION = 0.75
+# A ship which flies slower than this is stopped
+STOP_SPEED = 0.1
+
+ArrayLike = Union[np.ndarray, float, int]
 
 
 def _limit(value, min_value, max_value):
@@ -21,7 +31,7 @@ def _apply_acceleration(speed, speed_limit, forward=True):
 
     # если корабль стоит на месте, дергаем резко
     # если корабль уже летит быстро, прибавляем медленно
-    delta = math.cos(speed_fraction) * 0.75
+    delta = math.cos(speed_fraction) * ACCELERATION
 
     if forward:
         result_speed = speed + delta
@@ -31,7 +41,7 @@ def _apply_acceleration(speed, speed_limit, forward=True):
     result_speed = _limit(result_speed, -speed_limit, speed_limit)
 
     # если скорость близка к нулю, то останавливаем корабль
-    if abs(result_speed) < 0.1:
+    if abs(result_speed) < STOP_SPEED:
         result_speed = 0
 
     return result_speed
@@ -88,3 +98,64 @@ def update_speed(x_speed: float,
                                       x_direction > 0)
 
     return x_speed, y_speed
+
+
+def _apply_accelerations(speeds: np.ndarray,
+                         speed_limits: np.ndarray,
+                         directions: np.ndarray) -> np.ndarray:
+    """A batch version of _apply_acceleration for all directions at once."""
+
+    # np.cos gives exactly the same values as math.cos, and in a single
+    # pass over the array it's as cheap as a lookup table, which would be
+    # approximate.
+    deltas = np.cos(speeds / speed_limits) * ACCELERATION
+
+    # Adding a negated delta is exactly the same as subtracting it
+    result_speeds = speeds + np.where(directions > 0, deltas, -deltas)
+    np.clip(result_speeds, -speed_limits, speed_limits, out=result_speeds)
+    result_speeds[np.abs(result_speeds) < STOP_SPEED] = 0
+
+    return np.where(directions != 0, result_speeds, speeds)
+
+
+def update_speeds(x_speeds: np.ndarray,
+                  y_speeds: np.ndarray,
+                  x_directions: np.ndarray,
+                  y_directions: np.ndarray,
+                  x_speed_limits: Optional[ArrayLike] = 2,
+                  y_speed_limits: Optional[ArrayLike] = 2,
+                  fading: Optional[ArrayLike] = 0.8) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Update speeds of many ships at once, it's a batch version of
+    update_speed. Arguments are arrays with a value per ship, limits and
+    fading may be scalars common for all ships. Input arrays aren't changed.
+
+    Results are exactly the same as update_speed gives for every ship.
+    :return: new x and y speeds
+    """
+
+    x_directions = np.asarray(x_directions)
+    y_directions = np.asarray(y_directions)
+    for name, directions in (('rows_directions', y_directions),
+                             ('columns_directions', x_directions)):
+        if np.any((directions < -1) | (directions > 1)):
+            raise ValueError(
+                f'Wrong {name} values. Expects -1, 0 or 1.')
+
+    fading = np.asarray(fading, dtype=np.float64)
+    if np.any((fading < 0) | (fading > 1)):
+        raise ValueError(
+            'Wrong fading values. Expects floats between 0 and 1.')
+
+    x_speed_limits = np.abs(np.asarray(x_speed_limits, dtype=np.float64))
+    y_speed_limits = np.abs(np.asarray(y_speed_limits, dtype=np.float64))
+    if not (np.all(x_speed_limits) and np.all(y_speed_limits)):
+        raise ValueError('Wrong speed limits. Expects non-zero values.')
+
+    x_speeds = np.asarray(x_speeds, dtype=np.float64) * fading
+    y_speeds = np.asarray(y_speeds, dtype=np.float64) * fading
+
+    x_speeds = _apply_accelerations(x_speeds, x_speed_limits, x_directions)
+    y_speeds = _apply_accelerations(y_speeds, y_speed_limits, y_directions)
+    return x_speeds, y_speeds
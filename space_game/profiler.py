@@ -0,0 +1,213 @@
+import csv
+import json
+from pathlib import Path
+import time
+from typing import Dict, List, NoReturn, Optional, TextIO
+
+from space_game.settings import ProfilerSettings
+
+
+class KindStats:
+    __slots__ = ('resumes', 'seconds')
+
+    def __init__(self):
+        self.resumes = 0
+        self.seconds = 0.0
+
+
+class Profiler:
+    """
+    Hot path instrumentation of the game loop.
+
+    It collects wall time and resume counts per coroutine kind (a name of
+    the coroutine function) and time spent in sections like drawing of
+    entities and sprites and flush of the renderer, and input latency of
+    keys, and the simulation and render rates set and reached. Stats are
+    accumulated over a window of ticks, then reported to the overlay and,
+    optionally, to a JSON lines or CSV stream, and reset.
+
+    Nothing is measured if the game has no profiler: the scheduler,
+    the entity pool, animators and the game loop are given the profiler
+    explicitly and check for it once per tick or draw call.
+    """
+
+    def __init__(self,
+                 output: Optional[Path] = None,
+                 every_ticks: Optional[int] = ProfilerSettings.EVERY_TICKS):
+        """
+        :param output: a file to stream reports to, its format is chosen by
+            the suffix: .csv for CSV and JSON lines otherwise
+        :param every_ticks: a number of ticks in a report window
+        """
+
+        if every_ticks <= 0:
+            raise ValueError(
+                f'Wrong every_ticks value {every_ticks}. '
+                f'Expects positive int.')
+
+        self.every_ticks = every_ticks
+        self.last_report: Optional[Dict] = None
+
+        self._kinds: Dict[str, KindStats] = {}
+        self._sections: Dict[str, KindStats] = {}
+        self._n_ticks = 0
+        self._n_frames = 0
+        self._tick_seconds = 0.0
+        self._latencies: List[float] = []
+        # Set rates and the time the window started at, the window is
+        # timed by the wall clock, so sleeps between ticks count
+        self._simulation_rate: Optional[float] = None
+        self._render_rate: Optional[float] = None
+        self._window_started: Optional[float] = None
+
+        self._output = output
+        self._file: Optional[TextIO] = None
+        self._csv_writer = None
+
+    def set_rates(self,
+                  simulation_rate: float,
+                  render_rate: float) -> NoReturn:
+        """
+        :param simulation_rate: ticks per second the game loop aims at
+        :param render_rate: frames per second the game loop aims at
+        """
+
+        self._simulation_rate = simulation_rate
+        self._render_rate = render_rate
+
+    def add(self, kind: str, seconds: float) -> NoReturn:
+        """Account a resume of a coroutine of the kind."""
+
+        stats = self._kinds.get(kind)
+        if stats is None:
+            stats = self._kinds[kind] = KindStats()
+        stats.resumes += 1
+        stats.seconds += seconds
+
+    def add_section(self, section: str, seconds: float) -> NoReturn:
+        stats = self._sections.get(section)
+        if stats is None:
+            stats = self._sections[section] = KindStats()
+        stats.resumes += 1
+        stats.seconds += seconds
+
+    def add_frame(self) -> NoReturn:
+        """Account a frame sent to the terminal."""
+
+        self._n_frames += 1
+
+    def add_latency(self, seconds: float) -> NoReturn:
+        """Account the input latency of a key."""
+
+        self._latencies.append(seconds)
+
+    def tick_finished(self, tick: int, seconds: float) -> Optional[Dict]:
+        """
+        Account a whole tick. Once a window is over, make a report.
+        :return: a report if it's made in this tick and None otherwise
+        """
+
+        now = time.perf_counter()
+        if self._window_started is None:
+            # The first window starts with its first tick
+            self._window_started = now - seconds
+        self._n_ticks += 1
+        self._tick_seconds += seconds
+        if self._n_ticks < self.every_ticks:
+            return None
+
+        report = self._make_report(tick, now - self._window_started)
+        self._window_started = now
+        self._write(report)
+        self.last_report = report
+
+        self._kinds.clear()
+        self._sections.clear()
+        self._latencies.clear()
+        self._n_ticks = 0
+        self._n_frames = 0
+        self._tick_seconds = 0.0
+        return report
+
+    def install(self) -> NoReturn:
+        """Open the output stream."""
+
+        self._window_started = None
+        if self._output is not None and self._file is None:
+            self._file = open(self._output, 'w', newline='')
+            if self._output.suffix == '.csv':
+                self._csv_writer = csv.writer(self._file)
+                self._csv_writer.writerow(
+                    ['tick', 'kind', 'resumes_per_tick', 'ms_per_tick',
+                     'set_per_sec', 'per_sec'])
+
+    def uninstall(self) -> NoReturn:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._csv_writer = None
+
+    def _make_report(self, tick: int, seconds: float) -> Dict:
+        """
+        :param seconds: wall time of the window
+        """
+
+        n_ticks = self._n_ticks
+
+        def per_tick(stats: Dict[str, KindStats]) -> Dict[str, Dict]:
+            return {
+                name: {
+                    'resumes_per_tick': round(value.resumes / n_ticks, 2),
+                    'ms_per_tick': round(value.seconds / n_ticks * 1e3, 3),
+                }
+                for name, value in sorted(stats.items(),
+                                          key=lambda item: -item[1].seconds)
+            }
+
+        return {
+            'tick': tick,
+            'ticks': n_ticks,
+            'tick_ms': round(self._tick_seconds / n_ticks * 1e3, 3),
+            'frames_per_tick': round(self._n_frames / n_ticks, 2),
+            'simulation_rate': self._simulation_rate,
+            'render_rate': self._render_rate,
+            'ticks_per_sec': round(n_ticks / seconds, 1),
+            'frames_per_sec': round(self._n_frames / seconds, 1),
+            'coroutines': per_tick(self._kinds),
+            'sections': per_tick(self._sections),
+            'input_latency': {
+                'keys': len(self._latencies),
+                'mean_ms': round(sum(self._latencies)
+                                 / max(len(self._latencies), 1) * 1e3, 3),
+                'max_ms': round(max(self._latencies, default=0) * 1e3, 3),
+            },
+        }
+
+    def _write(self, report: Dict) -> NoReturn:
+        if self._file is None:
+            return
+
+        if self._csv_writer is None:
+            self._file.write(json.dumps(report) + '\n')
+            self._file.flush()
+            return
+
+        self._csv_writer.writerow([report['tick'], 'tick', 1,
+                                   report['tick_ms'],
+                                   report['simulation_rate'],
+                                   report['ticks_per_sec']])
+        self._csv_writer.writerow([report['tick'], 'frames',
+                                   report['frames_per_tick'], '',
+                                   report['render_rate'],
+                                   report['frames_per_sec']])
+        for group in ('coroutines', 'sections'):
+            for name, stats in report[group].items():
+                self._csv_writer.writerow([report['tick'], name,
+                                           stats['resumes_per_tick'],
+                                           stats['ms_per_tick']])
+        # Latency isn't per tick: it's keys per tick and a mean per key
+        latency = report['input_latency']
+        self._csv_writer.writerow([report['tick'], 'input_latency',
+                                   round(latency['keys'] / report['ticks'], 2),
+                                   latency['mean_ms']])
+        self._file.flush()
@@ -0,0 +1,351 @@
+import curses
+from typing import Any, Callable, Dict, List, NoReturn, Set, Tuple, Union
+
+
+# Changed cells separated by fewer unchanged cells than this are sent to
+# the terminal as a single run: re-sending a couple of symbols is cheaper
+# than an escape sequence which moves the cursor.
+MAX_RUN_GAP = 3
+
+
+Symbol = Union[str, int]
+# (y, x, symbols, attr) of changed cells sent to the terminal in a row
+Run = Tuple[int, int, List[Symbol], int]
+
+
+# Symbols of a window border when curses line drawing characters
+# aren't available
+ASCII_BORDER = {
+    'left': '|', 'right': '|', 'top': '-', 'bottom': '-',
+    'top_left': '+', 'top_right': '+',
+    'bottom_left': '+', 'bottom_right': '+',
+}
+
+
+def _border_symbols() -> Dict[str, Symbol]:
+    """
+    Return symbols of a window border. Curses line drawing characters
+    exist only after curses is initialized, so ASCII is used otherwise.
+    """
+
+    if hasattr(curses, 'ACS_VLINE'):
+        return {
+            'left': curses.ACS_VLINE, 'right': curses.ACS_VLINE,
+            'top': curses.ACS_HLINE, 'bottom': curses.ACS_HLINE,
+            'top_left': curses.ACS_ULCORNER, 'top_right': curses.ACS_URCORNER,
+            'bottom_left': curses.ACS_LLCORNER,
+            'bottom_right': curses.ACS_LRCORNER,
+        }
+
+    return dict(ASCII_BORDER)
+
+
+def to_text(symbol: Symbol) -> str:
+    """
+    Return a one-character string for a symbol, curses line drawing
+    characters of the border are replaced by their ASCII versions.
+    """
+
+    if isinstance(symbol, str):
+        return symbol
+
+    for name, border_symbol in _border_symbols().items():
+        if border_symbol == symbol:
+            return ASCII_BORDER[name]
+    return chr(symbol & curses.A_CHARTEXT)
+
+
+def run_text(symbols: List[Symbol]) -> str:
+    """Return a string of symbols of a run."""
+
+    try:
+        return ''.join(symbols)
+    except TypeError:
+        # Curses characters go alone, so it's a rare case
+        return ''.join(map(to_text, symbols))
+
+
+class BufferedWindow:
+    """
+    A window which writes into a back buffer of Renderer instead of
+    a terminal. It implements the same part of the curses window API as
+    HeadlessCanvas, so coroutines don't care where they draw.
+    """
+
+    def __init__(self,
+                 renderer: 'Renderer',
+                 top: int,
+                 left: int,
+                 height: int,
+                 width: int):
+        self._renderer = renderer
+        self._top = top
+        self._left = left
+        self._height = height
+        self._width = width
+
+    def getmaxyx(self) -> Tuple[int, int]:
+        return self._height, self._width
+
+    def addch(self, y: int, x: int, ch: Symbol, attr: int = 0) -> NoReturn:
+        # It's the hottest drawing call, so a single cell goes straight
+        # to the buffer.
+        if not (0 <= y < self._height and 0 <= x < self._width):
+            raise curses.error('addch() returned ERR')
+        self._renderer.put(self._top + y, self._left + x, ch, attr)
+
+    def addstr(self, y: int, x: int, string: str, attr: int = 0) -> NoReturn:
+        """
+        Write a string starting from (y, x). As curses does, a string which
+        does not fit into a row is wrapped to the next one, and an error is
+        raised if the string reaches the lower right corner.
+        """
+
+        if not (0 <= y < self._height and 0 <= x < self._width):
+            raise curses.error('addstr() returned ERR')
+
+        if len(string) == 1 and x + 1 < self._width:
+            self._renderer.put(self._top + y, self._left + x, string, attr)
+            return
+
+        while string:
+            part = string[:self._width - x]
+            self._renderer.write(self._top + y, self._left + x, part, attr)
+            string = string[len(part):]
+            if x + len(part) == self._width:
+                x = 0
+                y += 1
+                if y == self._height:
+                    raise curses.error('addstr() returned ERR')
+
+    def border(self) -> NoReturn:
+        symbols = _border_symbols()
+        last_y, last_x = self._height - 1, self._width - 1
+        for x in range(1, last_x):
+            self._put(0, x, symbols['top'])
+            self._put(last_y, x, symbols['bottom'])
+        for y in range(1, last_y):
+            self._put(y, 0, symbols['left'])
+            self._put(y, last_x, symbols['right'])
+        self._put(0, 0, symbols['top_left'])
+        self._put(0, last_x, symbols['top_right'])
+        self._put(last_y, 0, symbols['bottom_left'])
+        self._put(last_y, last_x, symbols['bottom_right'])
+
+    def derwin(self, nlines: int, ncols: int, begin_y: int, begin_x: int) \
+            -> 'BufferedWindow':
+        if (nlines <= 0 or ncols <= 0 or begin_y < 0 or begin_x < 0
+                or begin_y + nlines > self._height
+                or begin_x + ncols > self._width):
+            raise curses.error('derwin() returned ERR')
+
+        return BufferedWindow(self._renderer, self._top + begin_y,
+                              self._left + begin_x, nlines, ncols)
+
+    def refresh(self) -> NoReturn:
+        # The terminal is refreshed once per tick by Renderer.flush
+        pass
+
+    def is_dirty(self, y: int, x: int, height: int, width: int) -> bool:
+        """
+        Check if any cell of the rectangle was written since the last flush,
+        its part out of the window is ignored.
+        """
+
+        top, bottom = self._top + max(y, 0), self._top + min(y + height,
+                                                             self._height)
+        columns = range(self._left + max(x, 0),
+                        self._left + min(x + width, self._width))
+        dirty_rows = self._renderer._dirty_rows
+        for row in range(top, bottom):
+            dirty = dirty_rows.get(row)
+            if dirty and not dirty.isdisjoint(columns):
+                return True
+        return False
+
+    def _put(self, y: int, x: int, symbol: Symbol, attr: int = 0) \
+            -> NoReturn:
+        self._renderer.put(self._top + y, self._left + x, symbol, attr)
+
+
+class Renderer(BufferedWindow):
+    """
+    A double buffered renderer on top of a curses window (or HeadlessCanvas).
+
+    Coroutines draw into the back buffer. Once per tick, flush compares it
+    with the front buffer, which holds what the terminal already shows,
+    sends only the changed cells as coalesced per-row runs and refreshes
+    the window once. So an object which is erased and drawn again at the same
+    place costs nothing for the terminal.
+    """
+
+    def __init__(self, window):
+        height, width = window.getmaxyx()
+        super().__init__(self, 0, 0, height, width)
+
+        self._window = window
+        self._chars: List[List[Symbol]] = [[' '] * width
+                                           for _ in range(height)]
+        self._attrs = [[0] * width for _ in range(height)]
+        self._front_chars: List[List[Symbol]] = [[' '] * width
+                                                 for _ in range(height)]
+        self._front_attrs = [[0] * width for _ in range(height)]
+
+        # A row number -> columns written in the row since the last flush
+        self._dirty_rows: Dict[int, Set[int]] = {}
+        self._listeners: List[Callable[[int, int, List[Run]], Any]] = []
+
+        # Counters of terminal I/O, they may be used to profile rendering
+        self.n_flushes = 0
+        self.n_runs = 0
+        self.n_cells = 0
+
+    def getch(self) -> int:
+        return self._window.getch()
+
+    def resize(self) -> NoReturn:
+        """
+        Take the new size of the window, for example, after KEY_RESIZE.
+        The back buffer is blank then, and the whole screen is sent by
+        the next flush, because the terminal may have lost or moved
+        anything it showed.
+        """
+
+        height, width = self._window.getmaxyx()
+        self._height, self._width = height, width
+        self._chars = [[' '] * width for _ in range(height)]
+        self._attrs = [[0] * width for _ in range(height)]
+        # Nothing is equal to these cells, so all of them are sent
+        self._front_chars = [[None] * width for _ in range(height)]
+        self._front_attrs = [[None] * width for _ in range(height)]
+        self._dirty_rows = {y: set(range(width)) for y in range(height)}
+
+    def nodelay(self, flag: bool) -> NoReturn:
+        self._window.nodelay(flag)
+
+    def add_listener(self,
+                     listener: Callable[[int, int, List[Run]], Any]) \
+            -> NoReturn:
+        """
+        Call the listener after every flush with the height and the width
+        of the window and runs of cells sent to the terminal. So it sees
+        the same screen as the terminal, for example, to stream it.
+        """
+
+        self._listeners.append(listener)
+
+    def put(self, y: int, x: int, symbol: Symbol, attr: int = 0) \
+            -> NoReturn:
+        """
+        Put a single symbol into the back buffer. There are no boundary
+        checks here, windows do it before the call.
+        :param symbol: a one-character string or a curses character code
+        """
+
+        self._chars[y][x] = symbol
+        self._attrs[y][x] = attr
+
+        dirty = self._dirty_rows.get(y)
+        if dirty is None:
+            self._dirty_rows[y] = {x}
+        else:
+            dirty.add(x)
+
+    def write(self, y: int, x: int, string: str, attr: int = 0) -> NoReturn:
+        """
+        Put a string into a row of the back buffer. There is no wrapping or
+        boundary checks here, windows do it before the call.
+        """
+
+        end = x + len(string)
+        self._chars[y][x:end] = string
+        self._attrs[y][x:end] = [attr] * len(string)
+
+        dirty = self._dirty_rows.get(y)
+        if dirty is None:
+            self._dirty_rows[y] = set(range(x, end))
+        else:
+            dirty.update(range(x, end))
+
+    def flush(self) -> NoReturn:
+        """
+        Send changed cells to the terminal and refresh it.
+        """
+
+        runs = [] if self._listeners else None
+        for y, columns in self._dirty_rows.items():
+            for x, run, attr in self._changed_runs(y, sorted(columns)):
+                self._emit(y, x, run, attr)
+                if runs is not None:
+                    runs.append((y, x, run, attr))
+        self._dirty_rows.clear()
+
+        self._window.refresh()
+        self.n_flushes += 1
+        for listener in self._listeners:
+            listener(self._height, self._width, runs)
+
+    def _changed_runs(self, y: int, columns: List[int]):
+        """
+        Find changed cells among written columns of the row, update the front
+        buffer and yield runs (x, symbols, attr) to send to the terminal.
+        """
+
+        chars, attrs = self._chars[y], self._attrs[y]
+        front_chars, front_attrs = self._front_chars[y], self._front_attrs[y]
+
+        run_start = run_end = None
+        run_attr = 0
+        for x in columns:
+            char, attr = chars[x], attrs[x]
+            if char == front_chars[x] and attr == front_attrs[x]:
+                continue
+            front_chars[x], front_attrs[x] = char, attr
+
+            # Close gaps of unchanged cells if it's cheap. Curses characters
+            # (like border lines) can't be a part of a string, so they
+            # always go alone.
+            if (run_start is not None and attr == run_attr
+                    and x - run_end < MAX_RUN_GAP
+                    and self._can_merge(chars, attrs, run_end - 1, x, attr)):
+                run_end = x + 1
+                continue
+
+            if run_start is not None:
+                yield run_start, chars[run_start:run_end], run_attr
+            run_start, run_end, run_attr = x, x + 1, attr
+
+        if run_start is not None:
+            yield run_start, chars[run_start:run_end], run_attr
+
+    @staticmethod
+    def _can_merge(chars: List[Symbol],
+                   attrs: List[int],
+                   start: int,
+                   end: int,
+                   attr: int) -> bool:
+        """
+        Check that cells from start to end (inclusive) may be sent as a part
+        of a single string with the attribute.
+        """
+
+        for x in range(start, end + 1):
+            if attrs[x] != attr or not isinstance(chars[x], str):
+                return False
+        return True
+
+    def _emit(self, y: int, x: int, run: List[Symbol], attr: int) \
+            -> NoReturn:
+        self.n_runs += 1
+        self.n_cells += len(run)
+        try:
+            if isinstance(run[0], int):
+                self._window.addch(y, x, run[0], attr)
+            else:
+                self._window.addstr(y, x, ''.join(run), attr)
+        except curses.error:
+            # Curses writes a symbol into the lower right corner of
+            # the window, but reports an error because it can't move
+            # the cursor further.
+            if (y, x + len(run)) != (self._height - 1, self._width):
+                raise
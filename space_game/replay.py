@@ -0,0 +1,230 @@
+import json
+from pathlib import Path
+from typing import (
+    Callable, Dict, List, NamedTuple, NoReturn, Optional, TextIO, Tuple
+)
+
+from space_game.settings import TIC_TIMEOUT
+
+
+# It's bumped whenever the format of recordings changes, older recordings
+# from MIN_RECORDING_VERSION on are still read
+RECORDING_VERSION = 3
+MIN_RECORDING_VERSION = 1
+
+# A mark of a line with a terminal resize instead of keys
+RESIZE_MARK = 'R'
+
+
+class Recording(NamedTuple):
+    """
+    A recorded session: everything the game state depends on.
+    """
+
+    seed: int
+    height: int
+    width: int
+    # A number of ticks the session lasted
+    ticks: int
+    # Key codes read in a tick by the tick number, ticks without input
+    # are omitted
+    keys: Dict[int, List[int]]
+    # A configured size of the world, it's None if the world is the size of
+    # the terminal, like in recordings made before the world could be
+    # larger than the screen
+    world_height: Optional[int] = None
+    world_width: Optional[int] = None
+    # A new canvas size (a height, a width) by the tick the terminal was
+    # resized in, ticks without resizes are omitted
+    resizes: Dict[int, Tuple[int, int]] = {}
+    # Ticks per second, the game is stepped as finely on replay. Recordings
+    # made before the rate changed the game are replayed at the base rate.
+    simulation_rate: float = 1 / TIC_TIMEOUT
+
+
+class InputRecorder:
+    """
+    Log input of a session to a file, so it can be replayed by InputReplay.
+
+    The file starts with a JSON header (the RNG seed, the canvas size,
+    the world size and the simulation rate), which is followed by a line
+    per tick with input: a number of ticks since the previous such line and
+    the key codes read in the tick, separated by spaces. A resize of
+    the terminal gets its own line: a number of ticks since the previous
+    line, R, the new height and width. The last line is a JSON footer with
+    the length of the session.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._file: Optional[TextIO] = None
+
+        self._source = None
+        self._get_tick: Optional[Callable[[], int]] = None
+        self._last_tick = 0
+        self._tick: Optional[int] = None
+        self._tick_keys: List[int] = []
+
+    def start(self,
+              seed: int,
+              height: int,
+              width: int,
+              source,
+              get_tick: Callable[[], int],
+              world_height: Optional[int] = None,
+              world_width: Optional[int] = None,
+              simulation_rate: float = 1 / TIC_TIMEOUT) -> NoReturn:
+        """
+        :param seed: a seed of the random module the session starts with
+        :param height: a height of the canvas
+        :param width: a width of the canvas
+        :param source: a window to read keys from
+        :param get_tick: a function returning the current tick
+        :param world_height: a height of the world
+        :param world_width: a width of the world
+        :param simulation_rate: ticks per second
+        """
+
+        self._source = source
+        self._get_tick = get_tick
+        self._file = open(self._path, 'w')
+        self._file.write(json.dumps({
+            'version': RECORDING_VERSION,
+            'seed': seed,
+            'height': height,
+            'width': width,
+            'world_height': world_height,
+            'world_width': world_width,
+            'simulation_rate': simulation_rate,
+        }) + '\n')
+
+    def getch(self) -> int:
+        """Read a key from the source window and log it."""
+
+        key = self._source.getch()
+        if key == -1:
+            return key
+
+        tick = self._get_tick()
+        if tick != self._tick:
+            self._write_tick()
+            self._tick = tick
+        self._tick_keys.append(key)
+        return key
+
+    def resized(self, height: int, width: int) -> NoReturn:
+        """Log a resize of the terminal in the current tick."""
+
+        if self._file is None:
+            return
+
+        # The resize goes after keys read before it in the same tick
+        self._write_tick()
+        tick = self._get_tick()
+        self._tick = tick
+        self._file.write(f'{tick - self._last_tick} {RESIZE_MARK} '
+                         f'{height} {width}\n')
+        self._last_tick = tick
+
+    def close(self, ticks: int) -> NoReturn:
+        """
+        :param ticks: a number of ticks the session lasted
+        """
+
+        if self._file is None:
+            return
+
+        self._write_tick()
+        self._file.write(json.dumps({'ticks': ticks}) + '\n')
+        self._file.close()
+        self._file = None
+
+    def _write_tick(self) -> NoReturn:
+        if not self._tick_keys:
+            return
+
+        delta = self._tick - self._last_tick
+        self._file.write(' '.join(map(str, [delta, *self._tick_keys])) + '\n')
+        self._last_tick = self._tick
+        self._tick_keys.clear()
+
+
+class InputReplay:
+    """
+    A window-like source of keys which returns keys of a recording in
+    the ticks they were read in. Resizes of the terminal are repeated on
+    the canvas in the ticks they happened in.
+    """
+
+    def __init__(self,
+                 recording: Recording,
+                 get_tick: Callable[[], int],
+                 canvas=None):
+        """
+        :param canvas: a HeadlessCanvas to resize, resizes are ignored if
+            it's None
+        """
+
+        self._keys = recording.keys
+        self._resizes = recording.resizes
+        self._get_tick = get_tick
+        self._canvas = canvas
+        self._tick: Optional[int] = None
+        self._pending: List[int] = []
+
+    def resize(self) -> NoReturn:
+        """
+        Resize the canvas if the terminal was resized in the current tick.
+        It's called before the game reads input of the tick, so the game
+        gets KEY_RESIZE at the same moment as in the recorded session.
+        """
+
+        size = self._resizes.get(self._get_tick())
+        if size is not None and self._canvas is not None:
+            self._canvas.resize(*size)
+
+    def getch(self) -> int:
+        tick = self._get_tick()
+        if tick != self._tick:
+            self._tick = tick
+            # Keys are popped from the end
+            self._pending = list(reversed(self._keys.get(tick, ())))
+
+        return self._pending.pop() if self._pending else -1
+
+
+def read_recording(path: Path) -> Recording:
+    with open(path, 'r') as file:
+        header = json.loads(file.readline())
+        version = header.get('version')
+        if (not isinstance(version, int)
+                or not MIN_RECORDING_VERSION <= version <= RECORDING_VERSION):
+            raise ValueError(
+                f'Wrong recording version {version}. Expects '
+                f'{MIN_RECORDING_VERSION} to {RECORDING_VERSION}.')
+
+        keys = {}
+        resizes = {}
+        tick = 0
+        ticks = None
+        for line in file:
+            if line.startswith('{'):
+                ticks = json.loads(line)['ticks']
+                break
+
+            delta, *values = line.split()
+            tick += int(delta)
+            if values[:1] == [RESIZE_MARK]:
+                resizes[tick] = (int(values[1]), int(values[2]))
+            else:
+                keys.setdefault(tick, []).extend(map(int, values))
+
+    if ticks is None:
+        # The session was killed before the recorder was closed,
+        # so it's replayed till the last input.
+        ticks = max([*keys, *resizes], default=0) + 1
+
+    return Recording(header['seed'], header['height'], header['width'],
+                     ticks, keys, header.get('world_height'),
+                     header.get('world_width'), resizes,
+                     header.get('simulation_rate', 1 / TIC_TIMEOUT))
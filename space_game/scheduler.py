@@ -0,0 +1,134 @@
+import time
+from typing import Coroutine, List, NoReturn, Optional, Tuple
+
+
+class Sleep:
+    """
+    An awaitable which parks a coroutine in Scheduler for a number of ticks.
+    A sleep for less than a tick lasts till the next tick, so a coroutine
+    always gives the control back to the scheduler.
+    """
+
+    __slots__ = ('ticks', )
+
+    def __init__(self, ticks: int):
+        self.ticks = max(ticks, 1)
+
+    def __await__(self):
+        yield self
+
+
+class Scheduler:
+    """
+    A tick scheduler based on a hashed timer wheel.
+
+    A sleeping coroutine is put into a slot of the wheel which corresponds
+    to its wake tick, and it isn't touched until the wheel turns to the slot.
+    So work per tick depends on a number of coroutines which are due in this
+    tick, not on a number of all alive coroutines.
+
+    A coroutine may yield Sleep to wait for some ticks, or anything else
+    (like asyncio.sleep(0) does) to be resumed in the next tick.
+    """
+
+    def __init__(self, wheel_size: Optional[int] = 64):
+        if wheel_size <= 0:
+            raise ValueError(
+                f'Wrong wheel_size value {wheel_size}. Expects positive int.')
+
+        # A number of the current tick if a tick is running, or of the next
+        # one otherwise.
+        self.tick = 0
+        self._running = False
+        self._n_coroutines = 0
+        # A Profiler to account resumes to, see profiler.py
+        self.profiler = None
+
+        # Every slot keeps (wake tick, coroutine) pairs in order of parking.
+        # Sleeps longer than the wheel stay in their slot for several turns.
+        self._wheel: List[List[Tuple[int, Coroutine]]] = [
+            [] for _ in range(wheel_size)
+        ]
+
+    def __len__(self) -> int:
+        """Return a number of alive coroutines."""
+
+        return self._n_coroutines
+
+    def spawn(self, coroutine: Coroutine) -> NoReturn:
+        """
+        Schedule a new coroutine. It's resumed for the first time in
+        the next tick, or in the current one if no tick is running.
+        """
+
+        self._n_coroutines += 1
+        self._park(coroutine, self.tick + 1 if self._running else self.tick)
+
+    def run_tick(self) -> int:
+        """
+        Resume all coroutines which are due in the current tick.
+        :return: a number of resumed coroutines
+        """
+
+        slot_index = self.tick % len(self._wheel)
+        slot = self._wheel[slot_index]
+        if not slot:
+            self.tick += 1
+            return 0
+
+        tick = self.tick
+        due = [coroutine for wake_tick, coroutine in slot if wake_tick == tick]
+        if len(due) == len(slot):
+            self._wheel[slot_index] = []
+        else:
+            self._wheel[slot_index] = [
+                entry for entry in slot if entry[0] != tick
+            ]
+
+        # The profiler is checked once per tick, so it costs nothing if
+        # it's off
+        resume = (self._resume if self.profiler is None
+                  else self._resume_profiled)
+        self._running = True
+        try:
+            for coroutine in due:
+                resume(coroutine)
+        finally:
+            self._running = False
+            self.tick += 1
+
+        return len(due)
+
+    def close(self) -> NoReturn:
+        """Close all coroutines left in the wheel."""
+
+        for slot in self._wheel:
+            for _, coroutine in slot:
+                coroutine.close()
+            slot.clear()
+        self._n_coroutines = 0
+
+    def _resume(self, coroutine: Coroutine) -> NoReturn:
+        try:
+            command = coroutine.send(None)
+        except StopIteration:
+            self._n_coroutines -= 1
+            return
+
+        if isinstance(command, Sleep):
+            self._park(coroutine, self.tick + command.ticks)
+        else:
+            self._park(coroutine, self.tick + 1)
+
+    def _resume_profiled(self, coroutine: Coroutine) -> NoReturn:
+        kind = coroutine.cr_code.co_name
+        started = time.perf_counter()
+        try:
+            self._resume(coroutine)
+        finally:
+            self.profiler.add(kind, time.perf_counter() - started)
+
+    def _park(self, coroutine: Coroutine, wake_tick: int) -> NoReturn:
+        self._wheel[wake_tick % len(self._wheel)].append(
+            (wake_tick, coroutine))
+
@@ -1,6 +1,39 @@
+from pathlib import Path
+
+
+# A duration of a tick of the base rate in seconds. Speeds and delays of
+# the game are counted in such ticks and scaled to the simulation rate.
 TIC_TIMEOUT = 0.1
 
 
+class AssetSettings:
+    # Frames are looked up next to the package, not in the current directory
+    FRAMES_PATH = Path(__file__).resolve().parent.parent / 'frames'
+    # A compiled cache of all frames, it's rebuilt when any frame changes
+    FRAMES_CACHE_PATH = FRAMES_PATH / '.frames.cache'
+
+
+class LoopSettings:
+    # Ticks of the simulation per second. The game goes as fast at any
+    # rate, a higher one steps it more finely: objects move by shorter
+    # steps and input is read more often.
+    SIMULATION_RATE = 1 / TIC_TIMEOUT
+    # Frames per second, None is the simulation rate. Frames drawn between
+    # ticks show moving objects on their way to the next tick, frames
+    # rarer than ticks save terminal bandwidth.
+    RENDER_RATE = None
+
+    # What to do if a tick overruns its time: 'when_behind' skips
+    # rendering (but never simulation) of ticks which end behind
+    # the schedule, 'never' renders every tick.
+    FRAME_SKIP_POLICY = 'when_behind'
+    MAX_SKIPPED_FRAMES = 5
+
+    # If the game falls behind by more ticks, it stops catching up and
+    # slows down instead
+    MAX_LAG_TICKS = 10
+
+
 class MapSettings:
     STAR_SET = ['+', '*', '.', ':']
 
@@ -11,9 +44,43 @@ class MapSettings:
     # The higher the coefficient, the more stars on the sky.
     # Should be more or equal to 0
     RUBBISH_COEFF = 0
+
+    # If it's True, objects collide only if their non-space symbols
+    # overlap. Otherwise, framing rectangles of objects are compared, which
+    # is cheaper, but hollow frames (like Hubble) are hit by their holes.
+    EXACT_COLLISIONS = False
+
+    # Speeds of shots and rubbish in cells per tick of the base rate. Hits
+    # are checked along the whole way of objects during a tick, so fast
+    # objects don't fly through each other at any simulation rate.
+    SHOT_SPEED = 1
+    RUBBISH_SPEED = 0.5
+
+    # A size of the world in rows and columns. The screen shows a part of
+    # it around the spaceship. None is the size of the terminal, and
+    # the world is never smaller than it.
+    WORLD_HEIGHT = None
+    WORLD_WIDTH = None
+    # Distances from the spaceship to sides of the screen, after which
+    # the camera follows the spaceship
+    CAMERA_X_MARGIN = 20
+    CAMERA_Y_MARGIN = 5
+
     START_YEAR = 1950
     PLASMA_GUN_YEAR = 2020
 
+    # Delays between rubbish spawns in ticks of the base rate: (a year
+    # since which it's used, a delay) in order of years. There is no
+    # rubbish before the first year.
+    GARBAGE_DELAY_TICS = (
+        (1961, 20),
+        (1969, 14),
+        (1981, 10),
+        (1995, 8),
+        (2010, 6),
+        (2020, 2),
+    )
+
     PHRASES = {
         1957:               'First Sputnik',
         1961:               'Gagarin flew!',
@@ -26,9 +93,42 @@ class MapSettings:
     }
 
 
+class ShipSettings:
+    # Max speeds of the spaceship in cells per tick of the base rate
+    X_SPEED_LIMIT = 2
+    Y_SPEED_LIMIT = 2
+    # A part of the speed kept every tick of the base rate, between 0 and 1
+    FADING = 0.8
+
+
+class ProfilerSettings:
+    # A number of ticks in a report window of the profiler
+    EVERY_TICKS = 10
+    # A number of the slowest coroutine kinds shown by the overlay
+    OVERLAY_KINDS = 4
+
+
+class SpectatorSettings:
+    HOST = '127.0.0.1'
+    PORT = 8765
+    # Bytes waiting to be sent to a spectator, after which it gets no more
+    # diffs and is sent a keyframe once it catches up
+    MAX_CLIENT_BUFFER = 64 * 1024
+
+
+class CaptureSettings:
+    # A number of ticks between keyframes of a screen capture, a player
+    # decodes at most this number of ticks to seek to any of them
+    KEYFRAME_EVERY_TICKS = 100
+    # A size of the write buffer of a capture in bytes
+    BUFFER_SIZE = 64 * 1024
+
+
 class ControlSettings:
     SPACE_KEY_CODE = 32
     LEFT_KEY_CODE = 260
     RIGHT_KEY_CODE = 261
     UP_KEY_CODE = 259
     DOWN_KEY_CODE = 258
+    # Shows and hides the profiler overlay if the game is profiled
+    PROFILER_KEY_CODE = ord('p')
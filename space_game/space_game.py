@@ -1,43 +1,399 @@
 import asyncio
 import curses
-import itertools
-from pathlib import Path
+import math
 import random
+import sys
 import time
-from typing import NoReturn, Optional, Union
+from typing import (
+    Any, Callable, Dict, NoReturn, Optional, Tuple, TYPE_CHECKING, Union
+)
 
+from space_game.animation import Animation, Animator, Sprite
+from space_game.assets import FrameLibrary
+from space_game.camera import Camera
+from space_game.canvas import HeadlessCanvas
+from space_game.clock import FixedStepClock, RenderSchedule
+from space_game.entities import EntityPool, PROJECTILE, RUBBISH
+from space_game.geometry import Geometry
+from space_game.keyboard import KeyboardQueue
+from space_game.lanes import SpawnLanes
 from space_game.physics import update_speed
-from space_game.settings import MapSettings, TIC_TIMEOUT
+from space_game.profiler import Profiler
+from space_game.renderer import Renderer
+from space_game.replay import InputRecorder, InputReplay, Recording
+from space_game.scheduler import Scheduler
+from space_game.settings import (
+    ControlSettings, LoopSettings, MapSettings, ProfilerSettings, ShipSettings,
+    TIC_TIMEOUT
+)
+from space_game.starfield import Starfield
 from space_game.utils import (
-    draw_frame, get_canvas_size, get_garbage_delay_tics, read_objects,
-    read_controls, sleep, Frame, MapObject
+    frames_collide, get_garbage_delay_tics, read_controls, sleep, Frame,
+    MapObject
 )
 
+if TYPE_CHECKING:
+    # Modules with command line tools, they are run by python -m and
+    # aren't imported by the game itself
+    from space_game.capture import ScreenRecorder
+    from space_game.spectator import SpectatorServer
+
 
 class SpaceGame:
-    def __init__(self):
-        self._coroutines = []
-        self._all_frames = read_objects(Path.cwd() / 'frames')
-        self._dynamic_objects = {}
+    def __init__(self,
+                 profiler: Optional[Profiler] = None,
+                 seed: Optional[int] = None,
+                 recorder: Optional[InputRecorder] = None,
+                 spectator: Optional['SpectatorServer'] = None,
+                 capture: Optional['ScreenRecorder'] = None):
+        """
+        :param profiler: a profiler of the game loop, the game isn't
+            profiled if it's None
+        :param seed: a seed of the random module, the game isn't seeded
+            if it's None
+        :param recorder: a recorder of the seed and of input of the session,
+            a random seed is chosen if it's recorded without a seed
+        :param spectator: a started server which streams the screen to
+            spectators
+        :param capture: a recorder of the screen of the session
+        """
 
+        if recorder is not None and seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        self._seed = seed
+        self._recorder = recorder
+        self._spectator = spectator
+        self._capture = capture
+        self._replay: Optional[Recording] = None
+        self._keyboard: Optional[KeyboardQueue] = None
+        # A window-like source of keys: the keyboard, the recorder or a replay
+        self._input = None
+
+        self._scheduler = Scheduler()
+        self._scheduler.profiler = profiler
+        self._profiler = profiler
+        self._show_profile = profiler is not None
+        self._key_handlers = {}
+        if profiler is not None:
+            self._key_handlers[ControlSettings.PROFILER_KEY_CODE] = \
+                self._toggle_profile
+        self._all_frames = FrameLibrary()
+        # Rubbish and shots
+        self._entities = EntityPool()
+        # Columns above the map taken by rubbish which is entering it
+        self._spawn_lanes = SpawnLanes(self._entities)
+        self._shot_frames = {symbol: Frame(symbol, 'shot')
+                             for symbol in ('-', '|')}
+        # Sprites of the world and ones drawn right on the screen
+        self._animator = Animator()
+        self._overlays = Animator()
+        # Drawing is timed by the objects which draw, like resumes by
+        # the scheduler
+        for drawer in (self._entities, self._animator, self._overlays):
+            drawer.profiler = profiler
+        # Animations are made by _start, their frames last as long at any
+        # simulation rate
+        self._explosion_animation: Optional[Animation] = None
+        self._spaceship_animation: Optional[Animation] = None
+        self._game_over_sprite: Optional[Sprite] = None
+
+        # The world is drawn on the canvas, which is the camera if
+        # the world is larger than the screen. The timer and the overlays
+        # are drawn right on the screen.
         self._canvas = None
+        self._camera: Optional[Camera] = None
+        self._renderer: Optional[Renderer] = None
+        self._geometry: Optional[Geometry] = None
+        # The terminal has been resized, the layout is updated by
+        # the next tick
+        self._resize_pending = False
+        self._starfield: Optional[Starfield] = None
+        self._spaceship: Optional[MapObject] = None
+        self._spaceship_sprite: Optional[Sprite] = None
+        # A speed of the spaceship in the next tick if no key changes it,
+        # frames between ticks move it on the way
+        self._spaceship_speed = (0, 0)
+        self._clock: Optional[FixedStepClock] = None
+        self._schedule: Optional[RenderSchedule] = None
+        # Ticks of the simulation rate per tick of the base rate
+        # 1 / TIC_TIMEOUT, which speeds and delays of settings are set in
+        self._time_scale = 1
+        self._sound = True
         self._current_year = MapSettings.START_YEAR
 
+        # Stats of the session
+        self.n_frames = 0
+        self.n_shots = 0
+        self.n_destroyed = 0
+        # A tick when the spaceship crashed, or None if it's still flying
+        self.game_over_tick: Optional[int] = None
+
+    @property
+    def n_coroutines(self) -> int:
+        return len(self._scheduler)
+
+    @property
+    def simulation_rate(self) -> Optional[float]:
+        """Return ticks per second, it's None till the game starts."""
+
+        if self._schedule is None:
+            return None
+        return self._schedule.simulation_rate
+
+    @property
+    def render_rate(self) -> Optional[float]:
+        """Return frames per second, it's None till the game starts."""
+
+        if self._schedule is None:
+            return None
+        return self._schedule.render_rate
+
+    @property
+    def clock(self) -> Optional[FixedStepClock]:
+        """
+        Return the clock of the game loop with counters of overruns and
+        skipped frames. There is no clock in the headless mode.
+        """
+
+        return self._clock
+
+    @property
+    def input_latency(self) -> Dict[str, float]:
+        """
+        Return stats of time from arrival of a key to the end of the first
+        render after the game read it.
+        """
+
+        if self._keyboard is None:
+            return {'keys': 0}
+        return self._keyboard.latency_stats()
+
     def run(self) -> NoReturn:
         assert MapSettings.STAR_COEFF > 0
         assert MapSettings.RUBBISH_COEFF >= 0
 
         curses.update_lines_cols()
-        curses.wrapper(self._run_event_loop)
+        if self._profiler is not None:
+            self._profiler.install()
+        try:
+            curses.wrapper(self._run_event_loop)
+        finally:
+            if self._recorder is not None:
+                self._recorder.close(self._scheduler.tick)
+            if self._capture is not None:
+                self._capture.close()
+            if self._profiler is not None:
+                self._profiler.uninstall()
+
+    def run_headless(self,
+                     ticks: int,
+                     height: Optional[int] = 24,
+                     width: Optional[int] = 80,
+                     canvas: Optional[HeadlessCanvas] = None,
+                     on_tick: Optional[Callable[[int, float], Any]] = None,
+                     stop_on_game_over: Optional[bool] = False) -> float:
+        """
+        Run the game on an in-memory canvas as fast as possible, i.e.
+        without curses and without any delay between ticks.
+        :param ticks: a number of ticks to run
+        :param height: a height of the canvas in rows
+        :param width: a width of the canvas in columns
+        :param canvas: a prepared canvas (for example, with keys sent to it),
+            height and width are ignored if it's passed
+        :param on_tick: a callback which is called after every tick with
+            the tick number and its duration in seconds
+        :param stop_on_game_over: stop once the spaceship crashes
+        :return: a number of ticks per second
+        """
+
+        assert MapSettings.STAR_COEFF > 0
+        assert MapSettings.RUBBISH_COEFF >= 0
+
+        if canvas is None:
+            canvas = HeadlessCanvas(height, width)
+
+        self._sound = False
+        if self._profiler is not None:
+            self._profiler.install()
+        self._start(canvas)
+
+        elapsed = 0
+        n_ticks = 0
+        try:
+            for tick in range(ticks):
+                started = time.perf_counter()
+                running = self._simulate()
+                for phase in self._schedule.frames_in_tick(tick):
+                    self._render(phase)
+                duration = time.perf_counter() - started
+                elapsed += duration
+                n_ticks += 1
+
+                if self._profiler is not None:
+                    self._profiler.tick_finished(tick, duration)
+                if on_tick is not None:
+                    on_tick(tick, duration)
+                if not running:
+                    break
+                if stop_on_game_over and self.game_over_tick is not None:
+                    break
+        finally:
+            if self._recorder is not None:
+                self._recorder.close(self._scheduler.tick)
+            if self._capture is not None:
+                self._capture.close()
+            self._scheduler.close()
+            if self._profiler is not None:
+                self._profiler.uninstall()
+
+        return n_ticks / elapsed if elapsed else float('inf')
+
+    def replay(self,
+               recording: Recording,
+               canvas: Optional[HeadlessCanvas] = None,
+               on_tick: Optional[Callable[[int, float], Any]] = None) \
+            -> float:
+        """
+        Replay a recorded session headless as fast as possible. The game
+        gets the recorded seed and canvas size, and keys are read from
+        the recording in the ticks they were pressed in.
+        :param canvas: a prepared canvas of the recorded size
+        :param on_tick: a callback which is called after every tick with
+            the tick number and its duration in seconds
+        :return: a number of ticks per second
+        """
+
+        self._seed = recording.seed
+        self._replay = recording
+        return self.run_headless(recording.ticks, recording.height,
+                                 recording.width, canvas, on_tick)
 
     def _run_event_loop(self, canvas) -> NoReturn:
         curses.curs_set(False)
 
-        self._canvas = canvas
-        self._canvas.border()
-        self._canvas.nodelay(True)
+        self._start(canvas)
+
+        self._clock = FixedStepClock(
+            1 / self._schedule.simulation_rate,
+            frame_skip=LoopSettings.FRAME_SKIP_POLICY,
+            max_skipped_frames=LoopSettings.MAX_SKIPPED_FRAMES,
+            max_lag_ticks=LoopSettings.MAX_LAG_TICKS
+        )
+        asyncio.run(self._run_ticks())
+
+    async def _run_ticks(self) -> NoReturn:
+        """
+        Run ticks on an asyncio event loop. Keys are moved to the keyboard
+        queue as soon as stdin becomes readable, so they are stamped with
+        their arrival time even while the game sleeps between ticks.
+        """
+
+        loop = asyncio.get_running_loop()
+        stdin = sys.stdin.fileno()
+        try:
+            loop.add_reader(stdin, self._keyboard.poll)
+            reading = True
+        except (NotImplementedError, OSError, ValueError):
+            # The loop can't watch stdin (like the proactor loop on
+            # Windows), then keys are polled only before ticks.
+            reading = False
+
+        try:
+            self._clock.start()
+            while True:
+                started = time.perf_counter()
+                if not self._simulate():
+                    break
+                tick = self._clock.n_ticks
+                phases = self._schedule.frames_in_tick(tick)
+                if phases and not phases[0] and self._clock.should_render():
+                    self._render()
+                if self._profiler is not None:
+                    self._profiler.tick_finished(
+                        tick, time.perf_counter() - started)
+
+                for phase in phases:
+                    if not phase:
+                        continue
+                    delay = self._clock.time_till(phase)
+                    if delay < 0:
+                        # The loop is behind, so the frame is dropped
+                        continue
+                    await asyncio.sleep(delay)
+                    self._render(phase)
+                await self._clock.wait_async()
+        finally:
+            if reading:
+                loop.remove_reader(stdin)
+
+    def _start(self, canvas) -> NoReturn:
+        """
+        Prepare the canvas and create coroutines of all game objects.
+        """
 
-        max_y, max_x = get_canvas_size(self._canvas)
+        simulation_rate = LoopSettings.SIMULATION_RATE
+        if self._replay is not None:
+            simulation_rate = self._replay.simulation_rate
+        self._schedule = RenderSchedule(simulation_rate,
+                                        LoopSettings.RENDER_RATE)
+        if self._profiler is not None:
+            self._profiler.set_rates(self._schedule.simulation_rate,
+                                     self._schedule.render_rate)
+        # Speeds and delays are scaled to the simulation rate, so the game
+        # goes as fast at any rate, and a higher one steps it more finely
+        self._time_scale = simulation_rate / (1 / TIC_TIMEOUT)
+        # A frame of an explosion is shown for a tick and erased for a tick
+        self._explosion_animation = Animation([
+            frame for frame in self._all_frames['explosion'].values()
+            for frame in (frame, None)
+        ], ticks_per_frame=self._ticks(1))
+        spaceship_frames = self._all_frames['spaceship']
+        self._spaceship_animation = Animation(
+            [spaceship_frames['rocket_frame_1'],
+             spaceship_frames['rocket_frame_2']],
+            ticks_per_frame=self._ticks(2), loop=True)
+
+        self._renderer = Renderer(canvas)
+        if self._spectator is not None:
+            self._renderer.add_listener(self._spectator.frame_flushed)
+        if self._capture is not None:
+            # Frames are flushed after the tick, which they show
+            self._capture.start(lambda: self._scheduler.tick - 1)
+            self._renderer.add_listener(self._capture.frame_flushed)
+        self._renderer.border()
+        self._renderer.nodelay(True)
+
+        world_height, world_width = (MapSettings.WORLD_HEIGHT,
+                                     MapSettings.WORLD_WIDTH)
+        if self._replay is not None:
+            world_height, world_width = (self._replay.world_height,
+                                         self._replay.world_width)
+        self._geometry = Geometry(self._renderer, world_height, world_width)
+        self._camera = Camera(self._renderer, self._geometry,
+                              MapSettings.CAMERA_X_MARGIN,
+                              MapSettings.CAMERA_Y_MARGIN)
+        self._choose_canvas()
+
+        if self._seed is not None:
+            random.seed(self._seed)
+
+        self._keyboard = KeyboardQueue(self._renderer,
+                                       on_resize=self._request_resize,
+                                       get_tick=lambda: self._scheduler.tick)
+        self._input = self._keyboard
+        if self._replay is not None:
+            self._input = InputReplay(self._replay,
+                                      lambda: self._scheduler.tick, canvas)
+        elif self._recorder is not None:
+            height, width = self._renderer.getmaxyx()
+            # The configured size is recorded, since a world of the terminal
+            # size follows resizes of the terminal
+            self._recorder.start(self._seed, height, width, self._keyboard,
+                                 lambda: self._scheduler.tick,
+                                 world_height, world_width, simulation_rate)
+            self._input = self._recorder
+
+        max_y, max_x = self._geometry.max_y, self._geometry.max_x
         # If we try to change a cell with coordinates (max_y, max_x),
         # curses will raise an exception (don't know why). So, to prevent
         # putting an object (for example, a star) into this cell,
@@ -48,72 +404,259 @@ class SpaceGame:
         n_stars = int((max_y*max_x) * MapSettings.STAR_COEFF)
         coordinates = {(random.randint(1, max_x), random.randint(1, max_y))
                        for _ in range(0, n_stars)}
-        self._coroutines = [
-            self.blink(MapObject(
-                frame=Frame(random.choice(MapSettings.STAR_SET)),
-                start_x=x,
-                start_y=y)
-            )
-            for x, y in coordinates
-        ]
-        self._coroutines.append(self.animate_spaceship(start_y=10, start_x=10))
-        self._coroutines.append(self.fill_orbit_with_garbage())
-        self._coroutines.append(self.draw_timer())
-        self._coroutines.append(self.increase_year())
+        coordinates = sorted(coordinates)
+        self._starfield = Starfield(
+            coordinates,
+            [random.choice(MapSettings.STAR_SET) for _ in coordinates],
+            start_tick=self._scheduler.tick,
+            time_scale=self._time_scale
+        )
+        self._scheduler.spawn(self.blink(self._starfield))
+        self._scheduler.spawn(self.animate_spaceship(start_y=10, start_x=10))
+        self._scheduler.spawn(self.fill_orbit_with_garbage())
+        self._scheduler.spawn(self.move_entities())
+        self._scheduler.spawn(self.draw_timer())
+        self._scheduler.spawn(self.increase_year())
+        if self._profiler is not None:
+            self._scheduler.spawn(self.draw_profile())
+
+    def _simulate(self) -> bool:
+        """
+        Resume coroutines which are due in this tick.
+        :return: False if there are no coroutines left and True otherwise
+        """
 
-        while True:
-            for coroutine in self._coroutines.copy():
-                try:
-                    coroutine.send(None)
-                    self._canvas.refresh()
-                except StopIteration:
-                    self._coroutines.remove(coroutine)
-            if not self._coroutines:
-                break
+        if self._replay is not None:
+            self._input.resize()
+        # curses may have keys read from stdin into its own buffer, so
+        # the queue is polled even if stdin hasn't become readable
+        self._keyboard.poll()
+        if self._resize_pending:
+            self._resize()
+        self._follow_spaceship()
+        tick = self._scheduler.tick
+        self._scheduler.run_tick()
+        # Sprites are drawn after all coroutines have moved them
+        self._animator.update(self._canvas, tick)
+        return bool(self._scheduler)
+
+    def _choose_canvas(self) -> NoReturn:
+        # A world of the screen size never scrolls, so it's drawn right
+        # on the screen without translating every call
+        self._canvas = (self._camera if self._geometry.is_scrolling
+                        else self._renderer)
+
+    def _request_resize(self) -> NoReturn:
+        self._resize_pending = True
+
+    def _resize(self) -> NoReturn:
+        """
+        Lay the game out again after the terminal has been resized. Stars
+        are generated only for newly exposed parts of the world and removed
+        from parts which are gone, rubbish out of the world is moved inside.
+        Everything else is only redrawn: the spaceship keeps itself inside
+        of the world, and the timer and the overlays rebuild their windows
+        once the geometry changes.
+        """
+
+        self._resize_pending = False
+        geometry = self._geometry
+        old_max_y, old_max_x = geometry.max_y, geometry.max_x
+
+        self._renderer.resize()
+        if self._recorder is not None:
+            self._recorder.resized(*self._renderer.getmaxyx())
+        geometry.refresh()
+        self._camera.resize()
+        self._choose_canvas()
+        self._renderer.border()
+
+        # Stars lie inside of the world border, i.e. from 1 to max - 1
+        max_y, max_x = geometry.max_y, geometry.max_x
+        self._starfield.crop(max_x - 1, max_y - 1)
+        exposed_areas = []
+        if max_x > old_max_x:
+            exposed_areas.append((1, old_max_x, min(old_max_y, max_y),
+                                  max_x))
+        if max_y > old_max_y:
+            exposed_areas.append((old_max_y, 1, max_y, max_x))
+        for area in exposed_areas:
+            self._starfield.populate(area, MapSettings.STAR_COEFF,
+                                     MapSettings.STAR_SET,
+                                     self._scheduler.tick)
+        self._starfield.draw(self._canvas, self._camera.visible_area)
+
+        self._entities.clamp(max_x)
+        self._spawn_lanes.update()
+        self._entities.invalidate()
+        self._animator.invalidate()
+        self._overlays.invalidate()
+        if self._game_over_sprite is not None:
+            self._overlays.move(self._game_over_sprite,
+                                geometry.screen_max_x // 4,
+                                geometry.screen_max_y // 2)
+
+    def _follow_spaceship(self) -> NoReturn:
+        """
+        Move the camera after the spaceship. Everything on the screen
+        shifts then, so the play area is cleared, and stars, entities and
+        sprites which are in view now are drawn again. Objects animated by
+        coroutines redraw themselves in the tick.
+        """
+
+        spaceship = self._spaceship
+        if spaceship is None or not self._camera.is_scrolling:
+            return
+
+        if not self._camera.follow(round(spaceship.x), round(spaceship.y),
+                                   spaceship.frame.width,
+                                   spaceship.frame.height):
+            return
+
+        self._camera.clear()
+        self._starfield.draw(self._camera, self._camera.visible_area)
+        self._entities.invalidate()
+        self._animator.invalidate()
+
+    def _render(self, phase: Optional[float] = 0) -> NoReturn:
+        """
+        Send a frame to the terminal.
+        :param phase: a share of the next tick, which moving objects are
+            drawn at, it's 0 right after a tick
+        """
+
+        # Coroutines draw into the back buffer, and only cells changed
+        # since the last render go to the terminal. So a skipped render
+        # loses nothing, its changes go out with the next one.
+        self.n_frames += 1
+        tick = self._scheduler.tick - 1
+        if phase:
+            self._entities.render(self._canvas, self._camera.visible_area,
+                                  phase)
+            self._move_spaceship_between_ticks(phase)
+            self._animator.update(self._canvas, tick)
+        # Overlays go on top of everything drawn in the frame
+        self._overlays.update(self._renderer, tick)
+
+        if self._profiler is None:
+            self._renderer.flush()
+            self._keyboard.frame_rendered(tick)
+            return
+
+        started = time.perf_counter()
+        self._renderer.flush()
+        self._profiler.add_section('flush', time.perf_counter() - started)
+        self._profiler.add_frame()
+        for latency in self._keyboard.frame_rendered(tick):
+            self._profiler.add_latency(latency)
+
+    def _move_spaceship_between_ticks(self, phase: float) -> NoReturn:
+        """
+        Move the spaceship a share of the way to its position in the next
+        tick. The speed for the next tick is predicted as if no key is
+        pressed, so it's exactly on the way unless a key changes the speed.
+        """
+
+        sprite = self._spaceship_sprite
+        if sprite is None or self.game_over_tick is not None:
+            return
+
+        x, y = self._spaceship.current_coordinates()
+        next_x, next_y = self._move_spaceship(x, y, *self._spaceship_speed,
+                                              self._spaceship.frame)
+        self._animator.move(sprite, x + phase * (next_x - x),
+                            y + phase * (next_y - y))
+
+    def _move_spaceship(self,
+                        x: Union[float, int],
+                        y: Union[float, int],
+                        x_speed: Union[float, int],
+                        y_speed: Union[float, int],
+                        frame: Frame) -> Tuple[Union[float, int],
+                                               Union[float, int]]:
+        """
+        Return the position of the spaceship after a tick, it stays inside
+        of the world.
+        """
+
+        # The bounds are read every time, so the spaceship stays inside of
+        # the world after the terminal is resized
+        max_y, max_x = self._geometry.max_y, self._geometry.max_x
+        if y + y_speed <= 1:
+            y = 1
+        elif y + y_speed + frame.height > max_y:
+            y = max_y - frame.height
+        else:
+            y += y_speed
+
+        if x + x_speed <= 1:
+            x = 1
+        elif x + x_speed + frame.width >= max_x:
+            x = max_x - frame.width
+        else:
+            x += x_speed
+
+        return x, y
+
+    def _ticks(self, base_ticks: Union[float, int]) -> int:
+        """
+        Convert a duration in ticks of the base rate into ticks of
+        the simulation rate, it lasts at least a tick.
+        """
+
+        return max(round(base_ticks * self._time_scale), 1)
+
+    def _base_tick(self, tick: int) -> int:
+        """Return a number of the tick of the base rate the tick falls on."""
+
+        return math.floor(tick / self._time_scale)
 
-            time.sleep(TIC_TIMEOUT)
+    def _beep(self) -> NoReturn:
+        if self._sound:
+            curses.beep()
+
+    def _toggle_profile(self) -> NoReturn:
+        self._show_profile = not self._show_profile
 
     async def fire(self,
                    start_x: int,
                    start_y: int,
                    x_speed: Optional[Union[float, int]] = 0,
-                   y_speed: Optional[Union[float, int]] = -1) -> NoReturn:
+                   y_speed: Optional[Union[float, int]] = None) -> NoReturn:
         """
-        Display animation of gun shot, direction and speed
-        can be specified.
+        Display animation of gun shot, direction and speed (in cells per
+        tick of the base rate) can be specified. By default, the shot flies
+        up with SHOT_SPEED.
         """
 
+        if y_speed is None:
+            y_speed = -MapSettings.SHOT_SPEED
+        x_speed /= self._time_scale
+        y_speed /= self._time_scale
+
         x, y = start_x, start_y
-        self._canvas.addstr(round(y), round(x), '*')
-        await sleep(0)
+        geometry = self._geometry
 
-        self._canvas.addstr(round(y), round(x), 'O')
-        await sleep(0)
-        self._canvas.addstr(round(y), round(x), ' ')
+        def flash(symbol: str) -> NoReturn:
+            # The terminal may have been resized since the shot started
+            if 0 < y < geometry.max_y and 0 < x < geometry.max_x:
+                self._canvas.addstr(round(y), round(x), symbol)
 
-        x += x_speed
-        y += y_speed
+        flash('*')
+        await sleep(self._ticks(1))
 
-        symbol = '-' if x_speed else '|'
+        flash('O')
+        await sleep(self._ticks(1))
+        flash(' ')
 
-        max_y, max_x = get_canvas_size(self._canvas)
-        curses.beep()
-        fire_shot_object = MapObject(Frame(symbol), x, y)
-        while 1 < y < max_y and 1 < x < max_x:
-            self._canvas.addstr(round(y), round(x), symbol)
-            await sleep(0)
-            self._canvas.addstr(round(y), round(x), ' ')
-            fire_shot_object.change_coordinates(x + x_speed, y + y_speed)
-            for obj_id, obj in self._dynamic_objects.items():
-                if obj_id.startswith('rubbish') and obj & fire_shot_object:
-                    draw_frame(self._canvas, obj.x, obj.y, obj.frame,
-                               negative=True)
-                    self._dynamic_objects.pop(obj_id)
-                    await self.explode(obj.x, obj.y)
-                    return
+        symbol = '-' if x_speed else '|'
 
-            y += y_speed
-            x += x_speed
+        # From now on, the shot is moved and checked for hits together with
+        # all other shots by move_entities.
+        self._beep()
+        self.n_shots += 1
+        self._entities.spawn(PROJECTILE, self._shot_frames[symbol], x, y,
+                             x_speed, y_speed)
 
     async def animate_spaceship(self,
                                 start_x: int,
@@ -125,120 +668,158 @@ class SpaceGame:
         :return:
         """
 
+        # Speeds are in cells per tick of the base rate. They fade once per
+        # base tick, and keys accelerate the spaceship once per base tick
+        # along an axis, as all keys of a tick do at the base rate. So
+        # the spaceship flies the same at any simulation rate.
         x_speed, y_speed = 0, 0
-        max_y, max_x = get_canvas_size(self._canvas)
+        base_tick = self._base_tick(self._scheduler.tick)
+        x_accelerated = y_accelerated = None
 
-        spaceship_frames = self._all_frames['spaceship']
+        animation = self._spaceship_animation
         spaceship = MapObject(
-            frame=spaceship_frames['rocket_frame_1'],
+            frame=animation.frames[0],
             start_x=start_x,
             start_y=start_y
         )
-        self._dynamic_objects['spaceship'] = spaceship
-
-        for i in itertools.cycle([1, 2]):
-            for _ in range(0, 2):
-                x, y = spaceship.current_coordinates()
-                frame = spaceship_frames[f'rocket_frame_{i}']
-
-                draw_frame(self._canvas, x, y, frame)
-
-                x_direction, y_direction, space_pressed = \
-                    read_controls(self._canvas)
-                x_speed, y_speed = update_speed(x_speed, y_speed, x_direction,
-                                                y_direction)
-                await sleep(1)
-
-                draw_frame(self._canvas, x, y, frame, negative=True)
+        self._spaceship = spaceship
+        # The sprite draws the spaceship and switches frames of its flame
+        sprite = self._animator.play(animation, start_x, start_y,
+                                     self._scheduler.tick)
+        self._spaceship_sprite = sprite
 
-                if y + y_speed <= 1:
-                    y = 1
-                elif y + y_speed + frame.height > max_y:
-                    y = max_y - frame.height
-                else:
-                    y += y_speed
-
-                if x + x_speed <= 1:
-                    x = 1
-                elif x + x_speed + frame.width >= max_x:
-                    x = max_x - frame.width
-                else:
-                    x += x_speed
-
-                if (space_pressed
-                        and self._current_year >= MapSettings.PLASMA_GUN_YEAR):
-                    x_fire = round(x + spaceship.frame.width // 2)
-                    self._coroutines.append(self.fire(x_fire, y))
-
-                spaceship.change_frame(frame)
-                spaceship.change_coordinates(x, y)
+        while True:
+            tick = self._scheduler.tick
+            x, y = spaceship.current_coordinates()
+            frame = sprite.frame(tick)
+
+            x_direction, y_direction, space_pressed = \
+                read_controls(self._input, self._key_handlers)
+            previous_base_tick, base_tick = base_tick, self._base_tick(tick)
+            if x_accelerated == base_tick:
+                x_direction = 0
+            if y_accelerated == base_tick:
+                y_direction = 0
+            x_speed, y_speed = update_speed(
+                x_speed, y_speed, x_direction, y_direction,
+                ShipSettings.X_SPEED_LIMIT, ShipSettings.Y_SPEED_LIMIT,
+                ShipSettings.FADING ** (base_tick - previous_base_tick))
+            if x_direction:
+                x_accelerated = base_tick
+            if y_direction:
+                y_accelerated = base_tick
+
+            # Keys move the spaceship in the tick they are read in, so they
+            # show up in the frame right after it
+            scale = self._time_scale
+            x, y = self._move_spaceship(x, y, x_speed / scale,
+                                        y_speed / scale, frame)
+
+            if (space_pressed
+                    and self._current_year >= MapSettings.PLASMA_GUN_YEAR):
+                x_fire = round(x + spaceship.frame.width // 2)
+                self._scheduler.spawn(self.fire(x_fire, y))
+
+            spaceship.change_frame(frame)
+            spaceship.change_coordinates(x, y)
+            self._animator.move(sprite, x, y)
+
+            if await self.check_game_over(spaceship):
+                # The wreck isn't drawn any more
+                self._animator.stop(sprite)
+                return
 
-                await self.check_game_over(spaceship, max_x, max_y)
+            self._spaceship_speed = update_speed(
+                x_speed / scale, y_speed / scale, 0, 0,
+                ShipSettings.X_SPEED_LIMIT, ShipSettings.Y_SPEED_LIMIT,
+                ShipSettings.FADING ** (self._base_tick(tick + 1)
+                                        - base_tick))
+            await sleep(1)
 
-    async def check_game_over(self,
-                              spaceship: MapObject,
-                              max_x: int,
-                              max_y: int) -> NoReturn:
+    async def check_game_over(self, spaceship: MapObject) -> bool:
         """
         Check if the spaceship is hit to a rubbish. If it's "Game Over"
-        is printed.
+        is shown in the middle of the screen till the end of the game.
         :param spaceship:
-        :param max_x: max x coordinate
-        :param max_y: max y coordinate
-        :return:
+        :return: True if the game is over
         """
 
-        for obj_id, obj in self._dynamic_objects.items():
-            if not obj_id.startswith('rubbish'):
+        for handle in self._entities.overlapping(spaceship.x, spaceship.y,
+                                                 spaceship.frame.width,
+                                                 spaceship.frame.height,
+                                                 RUBBISH):
+            x, y = self._entities.position(handle)
+            if (MapSettings.EXACT_COLLISIONS
+                    and not frames_collide(spaceship.frame, spaceship.x,
+                                           spaceship.y,
+                                           self._entities.frame(handle),
+                                           x, y)):
                 continue
-            if spaceship & obj:
-                while True:
-                    draw_frame(self._canvas, max_x // 4, max_y // 2,
-                               self._all_frames['other']['game_over'])
-                    await sleep(0)
-
-    async def blink(self, star: MapObject) -> NoReturn:
-        """
-        Draw a blinking symbol.
-        """
-        x, y = star.current_coordinates()
-        symbol = star.frame.content
-        while True:
-            self._canvas.addstr(y, x, symbol, curses.A_DIM)
-            await sleep(random.randint(1, 10))
 
-            self._canvas.addstr(y, x, symbol)
-            await sleep(random.randint(1, 10))
+            self.game_over_tick = self._scheduler.tick
+            geometry = self._geometry
+            self._game_over_sprite = self._overlays.play(
+                Animation.still(self._all_frames['other']['game_over']),
+                geometry.screen_max_x // 4, geometry.screen_max_y // 2,
+                self._scheduler.tick)
+            return True
 
-            self._canvas.addstr(y, x, symbol, curses.A_BOLD)
-            await sleep(random.randint(1, 10))
+        return False
 
-            self._canvas.addstr(y, x, symbol)
-            await sleep(random.randint(1, 10))
+    async def blink(self, starfield: Starfield) -> NoReturn:
+        """
+        Draw blinking stars. All stars are updated by a single coroutine,
+        which sleeps till the next star changes its phase.
+        """
 
-    async def fly_garbage(self,
-                          rubbish_object: MapObject,
-                          rubbish_id: str,
-                          speed: Optional[float] = 0.5) -> NoReturn:
+        while True:
+            tick = self._scheduler.tick
+            starfield.update(self._canvas, tick, self._camera.visible_area)
+            next_tick = starfield.next_update_tick
+            # The sky may be empty, like in a tiny terminal, till a resize
+            # adds stars, so it's checked every tick then
+            await sleep(1 if next_tick is None else max(next_tick - tick, 1))
+
+    def fly_garbage(self,
+                    frame: Frame,
+                    start_x: int,
+                    start_y: int,
+                    speed: Optional[float] = None) -> int:
         """
-        Animate garbage, flying from top to bottom.
-        A start_x position will stay same, as specified on start.
+        Animate garbage, flying from top to bottom with the speed (in cells
+        per tick of the base rate) or RUBBISH_SPEED. A start_x position will
+        stay same, as specified on start.
+        The garbage is moved and drawn together with all other rubbish
+        by move_entities, so there is no coroutine per rubbish.
+        :return: a handle of the garbage
         """
 
-        max_y, max_x = get_canvas_size(self._canvas)
+        if speed is None:
+            speed = MapSettings.RUBBISH_SPEED
+        return self._entities.spawn(RUBBISH, frame, start_x, start_y, 0,
+                                    speed / self._time_scale)
 
-        x, y = rubbish_object.current_coordinates()
-        while y < max_y:
-            if rubbish_id not in self._dynamic_objects:
-                return
+    async def move_entities(self) -> NoReturn:
+        """
+        Move and draw all rubbish and shots, and blow up rubbish hit by
+        shots. All of them are processed by a few array operations per tick.
+        """
 
-            rubbish_object.change_coordinates(x, y)
-            draw_frame(self._canvas, x, y, rubbish_object.frame)
+        while True:
+            hits = self._entities.step(self._geometry.max_x,
+                                       self._geometry.max_y,
+                                       MapSettings.EXACT_COLLISIONS)
+            self._spawn_lanes.update()
+            self._entities.render(self._canvas, self._camera.visible_area)
+            self.n_destroyed += len(hits)
+            if hits:
+                self._beep()
+            # Explosions start in the next tick, as the rubbish disappears
+            tick = self._scheduler.tick + 1
+            for hit in hits:
+                self._animator.play(self._explosion_animation, hit.x, hit.y,
+                                    tick)
             await sleep(0)
-            draw_frame(self._canvas, x, y, rubbish_object.frame, negative=True)
-            y += speed
-
-        self._dynamic_objects.pop(rubbish_id)
 
     async def fill_orbit_with_garbage(self) -> NoReturn:
         """
@@ -248,7 +829,7 @@ class SpaceGame:
         # Wait for a year when the first rubbish will appear on the map
         delay_tick = get_garbage_delay_tics(self._current_year)
         while delay_tick is None:
-            await sleep(5)
+            await sleep(self._ticks(5))
             delay_tick = get_garbage_delay_tics(self._current_year)
 
         rubbish_frames = [
@@ -257,59 +838,54 @@ class SpaceGame:
             if not name.startswith('rocket')
         ]
 
-        max_y, max_x = get_canvas_size(self._canvas)
-        rubbish_count = 0
-
-        # This variable shows how much rubbish can be on the map simultaneously
-        max_rubbish_count = max_x * max_y // min(frame.height * frame.width
-                                                 for frame in rubbish_frames)
+        geometry = self._geometry
+        n_spawned = 0
         while True:
-            await sleep(MapSettings.RUBBISH_COEFF)
+            # A sleep for no ticks lasts a tick
+            await sleep(self._ticks(max(MapSettings.RUBBISH_COEFF, 1)))
+
+            # A world wider than the screen gets a few rubbish per delay,
+            # so it's as dense as the screen would be
+            max_x = geometry.max_x
+            n_per_delay = max(
+                1, geometry.world_width // geometry.screen_width)
 
-            produce_next = False
             frame = rubbish_frames[
                 random.randint(0, len(rubbish_frames) - 1)]
-            start_x = random.randint(-frame.width + 2, max_x - 2)
-            start_y = -frame.height
-            rubbish_object = MapObject(frame, start_x, start_y)
-
-            # Check that a new rubbish sample does not overlap existing
-            # If it does, try to produce another sample.
-            for existing_object in self._dynamic_objects.values():
-                if rubbish_object & existing_object:
-                    produce_next = True
-                    break
-
-            if produce_next:
+            # A new rubbish sample is placed only where it doesn't overlap
+            # rubbish which is still entering the map. If there is no room
+            # for the sample, another one is tried.
+            start_x = self._spawn_lanes.choose(frame.width, -frame.width + 2,
+                                               max_x - 2)
+            if start_x is None:
                 continue
 
-            if rubbish_count > max_rubbish_count:
-                # Reset count because objects with old IDs disappeared
-                rubbish_count = 0
-            else:
-                rubbish_count += 1
-
-            rubbish_id = f'rubbish_{rubbish_count}'
-            self._dynamic_objects[rubbish_id] = rubbish_object
-            self._coroutines.append(self.fly_garbage(rubbish_object,
-                                                     rubbish_id))
-            await sleep(get_garbage_delay_tics(self._current_year))
-
-    async def explode(self, x, y) -> NoReturn:
-        explosion_frames = self._all_frames['explosion']
-        curses.beep()
-        for frame in explosion_frames.values():
-            draw_frame(self._canvas, x, y, frame)
-            await asyncio.sleep(0)
-            draw_frame(self._canvas, x, y, frame, negative=True)
-            await asyncio.sleep(0)
+            handle = self.fly_garbage(frame, start_x, -frame.height)
+            self._spawn_lanes.add(handle)
+            n_spawned += 1
+            if not n_spawned % n_per_delay:
+                await sleep(self._ticks(
+                    get_garbage_delay_tics(self._current_year)))
 
     async def draw_timer(self) -> NoReturn:
-        max_y, max_x = get_canvas_size(self._canvas)
-        canvas = self._canvas.derwin(3, max_x // 2, max_y - 2, max_x // 2 + 2)
-
+        geometry = self._geometry
+        canvas = None
+        version = None
         n_prev_phrase_symbols = 0
         while True:
+            if version != geometry.version:
+                # The window is created again once the terminal is resized
+                version = geometry.version
+                max_y, max_x = geometry.screen_max_y, geometry.screen_max_x
+                # The window must fit into the canvas, otherwise curses
+                # refuses to create it on terminals of odd width.
+                try:
+                    canvas = self._renderer.derwin(
+                        3, max_x - max_x // 2 - 2, max_y - 2, max_x // 2 + 2)
+                except curses.error:
+                    # The terminal is too small for the timer
+                    canvas = None
+
             msg = f'Year: {self._current_year}'
             phrase = MapSettings.PHRASES.get(self._current_year, "")
             if phrase:
@@ -319,13 +895,88 @@ class SpaceGame:
                 msg = f'{msg}{" " * n_prev_phrase_symbols}'
                 n_prev_phrase_symbols = 0
 
-            canvas.addstr(1, 1, msg)
-            canvas.border()
-            canvas.refresh()
+            if canvas is not None:
+                canvas.addstr(1, 1, msg[:canvas.getmaxyx()[1] - 2])
+                canvas.border()
+                canvas.refresh()
             await sleep(0)
 
     async def increase_year(self) -> NoReturn:
         self._current_year = MapSettings.START_YEAR
         while True:
-            await sleep(20)
+            await sleep(self._ticks(20))
             self._current_year += 1
+
+    async def draw_profile(self) -> NoReturn:
+        """
+        Draw the last report of the profiler in the bottom left corner, next
+        to the timer: ticks and frames per second reached and set,
+        the slowest coroutine kinds, time of drawing frames and of flushing
+        the screen per tick, and how often the loop falls behind.
+        The overlay is shown and hidden by the profiler key.
+        """
+
+        geometry = self._geometry
+        height = ProfilerSettings.OVERLAY_KINDS + 6
+        canvas = None
+        version = None
+        shown = False
+        while True:
+            if version != geometry.version:
+                # The overlay is created again once the terminal is resized,
+                # the screen is blank then
+                version = geometry.version
+                max_y, max_x = geometry.screen_max_y, geometry.screen_max_x
+                width = max_x // 2 + 1
+                canvas = None
+                if height <= max_y:
+                    canvas = self._renderer.derwin(height, width,
+                                                   max_y - height + 1, 0)
+                shown = False
+
+            if canvas is None:
+                await sleep(0)
+                continue
+
+            if not self._show_profile:
+                if shown:
+                    # The last cell of a window can't be written, but
+                    # the bottom row lies on the border, which is redrawn
+                    for row in range(height - 1):
+                        canvas.addstr(row, 0, ' ' * width)
+                    canvas.addstr(height - 1, 0, ' ' * (width - 1))
+                    self._renderer.border()
+                    shown = False
+                await sleep(0)
+                continue
+
+            report = self._profiler.last_report
+            lines = []
+            if report is not None:
+                lines.append(f'tick {report["tick_ms"]:.2f} ms '
+                             f'{report["ticks_per_sec"]:.0f}/'
+                             f'{report["simulation_rate"]:g} tps '
+                             f'{report["frames_per_sec"]:.0f}/'
+                             f'{report["render_rate"]:g} fps')
+                kinds = list(report['coroutines'].items())
+                for kind, stats in kinds[:ProfilerSettings.OVERLAY_KINDS]:
+                    lines.append(f'{kind} {stats["ms_per_tick"]:.2f} ms '
+                                 f'x{stats["resumes_per_tick"]:g}')
+                lines.append(' '.join(
+                    f'{section} {stats["ms_per_tick"]:.2f} ms'
+                    for section, stats in report['sections'].items()
+                ))
+                latency = report['input_latency']
+                if latency['keys']:
+                    lines.append(f'input {latency["mean_ms"]:.1f} ms '
+                                 f'max {latency["max_ms"]:.1f} ms')
+            if self._clock is not None:
+                lines.append(f'overruns {self._clock.n_overruns} '
+                             f'skipped {self._clock.n_skipped_frames}')
+
+            for row in range(1, height - 1):
+                text = lines[row - 1] if row - 1 < len(lines) else ''
+                canvas.addstr(row, 1, text[:width - 2].ljust(width - 2))
+            canvas.border()
+            shown = True
+            await sleep(0)
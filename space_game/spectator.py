@@ -0,0 +1,398 @@
+"""
+Stream the screen of a running game to spectators.
+
+A server, which runs in a thread of the game process, listens on a local TCP
+port or a Unix socket. The renderer passes it runs of cells sent to
+the terminal by every flush, and the server keeps its own copy of the screen
+from them. Every spectator gets a keyframe (the whole screen) once it
+connects and then diffs (cells changed by a flush). Messages are JSON lines:
+    {"frame": 1, "keyframe": true, "height": 24, "width": 80,
+     "runs": [[y, x, "text", attr], ...]}
+    {"frame": 2, "runs": [[y, x, "text", attr], ...]}
+
+A spectator which doesn't read fast enough isn't buffered without limit:
+once too many bytes wait to be sent to it, it gets no more diffs, and it's
+sent a fresh keyframe as soon as it catches up.
+
+Watch a game in a terminal:
+    python3 main.py --spectator-port 8765
+    python3 -m space_game.spectator --port 8765
+"""
+
+import argparse
+import asyncio
+from collections import deque
+import curses
+import json
+from pathlib import Path
+import socket
+import threading
+from typing import (
+    AsyncIterator, Deque, Dict, List, NoReturn, Optional, Tuple, Union
+)
+
+from space_game.renderer import Run, run_text
+from space_game.settings import SpectatorSettings
+
+
+# (y, x, text, attr) of cells changed in a row
+TextRun = Tuple[int, int, str, int]
+
+
+class Screen:
+    """A copy of a screen built from runs of changed cells."""
+
+    def __init__(self, height: Optional[int] = 0, width: Optional[int] = 0):
+        self.height = 0
+        self.width = 0
+        self._chars: List[List[str]] = []
+        self._attrs: List[List[int]] = []
+        self.resize(height, width)
+
+    def resize(self, height: int, width: int) -> NoReturn:
+        """Change the size, overlapping cells are kept."""
+
+        for rows, blank in ((self._chars, ' '), (self._attrs, 0)):
+            del rows[height:]
+            for row in rows:
+                del row[width:]
+                row.extend([blank] * (width - len(row)))
+            rows.extend([blank] * width
+                        for _ in range(height - len(rows)))
+        self.height, self.width = height, width
+
+    def clear(self) -> NoReturn:
+        self._chars = [[' '] * self.width for _ in range(self.height)]
+        self._attrs = [[0] * self.width for _ in range(self.height)]
+
+    def apply(self, runs: List[TextRun]) -> NoReturn:
+        """Write runs of cells, their parts out of the screen are dropped."""
+
+        for y, x, text, attr in runs:
+            if not 0 <= y < self.height:
+                continue
+            text = text[:max(self.width - x, 0)]
+            self._chars[y][x:x + len(text)] = text
+            self._attrs[y][x:x + len(text)] = [attr] * len(text)
+
+    def runs(self) -> List[TextRun]:
+        """
+        Return the whole screen as runs of cells with the same attribute,
+        blank runs are skipped.
+        """
+
+        runs = []
+        for y, (chars, attrs) in enumerate(zip(self._chars, self._attrs)):
+            start = 0
+            for x in range(1, self.width + 1):
+                if x < self.width and attrs[x] == attrs[start]:
+                    continue
+                text = ''.join(chars[start:x])
+                if attrs[start] or not text.isspace():
+                    runs.append((y, start, text, attrs[start]))
+                start = x
+        return runs
+
+    def lines(self) -> List[str]:
+        """Return the screen as a list of rows."""
+
+        return [''.join(chars) for chars in self._chars]
+
+
+def encode(message: Dict) -> bytes:
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+class SpectatorServer:
+    """
+    A server which streams the screen to spectators from a thread with its
+    own event loop.
+
+    The game thread only hands runs of every flush over to the server, and
+    the server thread encodes them once for all spectators and sends them.
+    If the server thread is behind, runs of several flushes go out as
+    a single diff.
+    """
+
+    def __init__(self,
+                 host: Optional[str] = SpectatorSettings.HOST,
+                 port: Optional[int] = SpectatorSettings.PORT,
+                 path: Optional[Path] = None,
+                 max_buffer: Optional[int]
+                 = SpectatorSettings.MAX_CLIENT_BUFFER):
+        """
+        :param host: a host to listen on
+        :param port: a TCP port, 0 picks a free one
+        :param path: a Unix socket to listen on instead of the TCP port
+        :param max_buffer: bytes waiting to be sent to a spectator, after
+            which it gets no more diffs till it catches up
+        """
+
+        if max_buffer <= 0:
+            raise ValueError(
+                f'Wrong max_buffer value {max_buffer}. Expects positive int.')
+
+        self._host = host
+        self._port = port
+        self._path = path
+        self._max_buffer = max_buffer
+
+        self._screen = Screen()
+        # Flushes of the game thread which the server hasn't sent yet
+        self._pending: Deque[Tuple[int, int, List[Run]]] = deque()
+        self._scheduled = False
+        # A writer of a spectator -> whether it waits for a keyframe
+        self._clients: Dict[asyncio.StreamWriter, bool] = {}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._stopping: Optional[asyncio.Event] = None
+        self._error: Optional[BaseException] = None
+        self._address: Union[Tuple[str, int], Path, None] = None
+
+        self.frame = 0
+        self.n_keyframes = 0
+        self.n_diffs = 0
+        # Diffs which weren't sent to slow spectators
+        self.n_dropped = 0
+
+    @property
+    def address(self) -> Union[Tuple[str, int], Path, None]:
+        """Return (host, port) or a path of the socket once it's started."""
+
+        return self._address
+
+    @property
+    def n_clients(self) -> int:
+        return len(self._clients)
+
+    def start(self) -> NoReturn:
+        """Start listening, it returns once spectators may connect."""
+
+        self._thread = threading.Thread(target=self._serve,
+                                        name='spectator-server', daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+
+    def stop(self) -> NoReturn:
+        """
+        Send the rest of flushes, so spectators end with the last screen,
+        and disconnect them.
+        """
+
+        if self._loop is None or self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join()
+        self._thread = None
+
+    def frame_flushed(self,
+                      height: int,
+                      width: int,
+                      runs: List[Run]) -> NoReturn:
+        """
+        Take runs of a flush from the game thread, it's a listener of
+        the renderer.
+        """
+
+        if self._loop is None:
+            return
+
+        self._pending.append((height, width, runs))
+        # The server clears the flag before it takes pending flushes, so
+        # a flush is either taken by a running broadcast or schedules one
+        if not self._scheduled:
+            self._scheduled = True
+            self._loop.call_soon_threadsafe(self._broadcast)
+
+    def _serve(self) -> NoReturn:
+        try:
+            asyncio.run(self._run())
+        except BaseException as error:
+            self._error = error
+            self._started.set()
+
+    async def _run(self) -> NoReturn:
+        self._stopping = asyncio.Event()
+        if self._path is not None:
+            server = await asyncio.start_unix_server(self._accept,
+                                                     str(self._path))
+            self._address = self._path
+        else:
+            server = await asyncio.start_server(self._accept, self._host,
+                                                self._port)
+            self._address = server.sockets[0].getsockname()[:2]
+        self._loop = asyncio.get_running_loop()
+        self._started.set()
+
+        try:
+            await self._stopping.wait()
+        finally:
+            self._loop = None
+            server.close()
+            self._broadcast()
+            for writer, waits in list(self._clients.items()):
+                if waits:
+                    self._send_keyframe(writer)
+                writer.close()
+            await server.wait_closed()
+            for writer in list(self._clients):
+                try:
+                    await writer.wait_closed()
+                except (ConnectionError, OSError):
+                    pass
+            if self._path is not None:
+                self._path.unlink(missing_ok=True)
+
+    async def _accept(self,
+                      reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> NoReturn:
+        # Otherwise a kernel buffer of megabytes hides a slow spectator
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF,
+                            self._max_buffer)
+        self._send_keyframe(writer)
+        self._clients[writer] = False
+        try:
+            # Spectators send nothing, reads only notice a disconnect
+            while await reader.read(1024):
+                pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    def _send_keyframe(self, writer: asyncio.StreamWriter) -> NoReturn:
+        screen = self._screen
+        writer.write(encode({
+            'frame': self.frame,
+            'keyframe': True,
+            'height': screen.height,
+            'width': screen.width,
+            'runs': screen.runs(),
+        }))
+        self.n_keyframes += 1
+
+    def _broadcast(self) -> NoReturn:
+        self._scheduled = False
+        screen = self._screen
+        resized = False
+        runs = []
+        while self._pending:
+            height, width, flushed = self._pending.popleft()
+            if (height, width) != (screen.height, screen.width):
+                screen.resize(height, width)
+                resized = True
+            text_runs = [(y, x, run_text(symbols), attr)
+                         for y, x, symbols, attr in flushed]
+            screen.apply(text_runs)
+            runs.extend(text_runs)
+            self.frame += 1
+
+        if resized:
+            # Spectators can't apply diffs of another size
+            for writer in self._clients:
+                self._clients[writer] = True
+        elif not runs:
+            return
+
+        diff = None
+        for writer, waits in self._clients.items():
+            if writer.transport.get_write_buffer_size() > self._max_buffer:
+                self._clients[writer] = True
+                self.n_dropped += 1
+                continue
+
+            if waits:
+                self._send_keyframe(writer)
+                self._clients[writer] = False
+                continue
+
+            if diff is None:
+                diff = encode({'frame': self.frame, 'runs': runs})
+            writer.write(diff)
+            self.n_diffs += 1
+
+
+async def follow(reader: asyncio.StreamReader,
+                 screen: Screen) -> AsyncIterator[Dict]:
+    """
+    Read messages of a server till it disconnects, apply them to the screen
+    and yield them.
+    """
+
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+
+        message = json.loads(line)
+        if message.get('keyframe'):
+            screen.resize(message['height'], message['width'])
+            screen.clear()
+        screen.apply(message['runs'])
+        yield message
+
+
+async def watch(window, host: str, port: int, path: Optional[Path]) \
+        -> NoReturn:
+    """Draw the streamed screen in the window till the "q" key."""
+
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(str(path))
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    window.nodelay(True)
+    screen = Screen()
+    messages = follow(reader, screen)
+    try:
+        while window.getch() != ord('q'):
+            try:
+                message = await asyncio.wait_for(messages.__anext__(), 0.1)
+            except asyncio.TimeoutError:
+                continue
+            except StopAsyncIteration:
+                break
+
+            runs = message['runs']
+            if message.get('keyframe'):
+                window.erase()
+                runs = screen.runs()
+            height, width = window.getmaxyx()
+            for y, x, text, attr in runs:
+                text = text[:width - x]
+                if y >= height or not text:
+                    continue
+                try:
+                    window.addstr(y, x, text, attr)
+                except curses.error:
+                    # The lower right corner of the window
+                    pass
+            window.refresh()
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default=SpectatorSettings.HOST)
+    parser.add_argument('--port', type=int, default=SpectatorSettings.PORT)
+    parser.add_argument('--socket', type=Path, metavar='PATH',
+                        help='a Unix socket of the game instead of the port')
+    args = parser.parse_args()
+
+    def run(window):
+        curses.curs_set(False)
+        asyncio.run(watch(window, args.host, args.port, args.socket))
+
+    curses.wrapper(run)
+
+
+if __name__ == '__main__':
+    main()
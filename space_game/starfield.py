@@ -0,0 +1,189 @@
+import curses
+import random
+from typing import List, NoReturn, Optional, Tuple
+
+import numpy as np
+
+
+# A star blinks through these phases: dim, normal, bold and normal again
+PHASE_ATTRIBUTES = np.array([curses.A_DIM, 0, curses.A_BOLD, 0],
+                            dtype=np.int64)
+
+# A star stays in a phase from 1 to 10 ticks of the base rate
+MIN_PHASE_TICKS = 1
+MAX_PHASE_TICKS = 10
+
+
+class Starfield:
+    """
+    All stars of the sky in a single component.
+
+    Positions, symbols, blink phases and ticks of the next phase change are
+    kept in NumPy arrays. Every update finds due stars in a batch and draws
+    only them, so a tick costs almost nothing for stars which don't change.
+    """
+
+    def __init__(self,
+                 coordinates: List[Tuple[int, int]],
+                 symbols: List[str],
+                 start_tick: int = 0,
+                 time_scale: float = 1):
+        """
+        :param coordinates: (x, y) of every star
+        :param symbols: a symbol of every star
+        :param start_tick: a tick when all stars are drawn for the first time
+        :param time_scale: a number of ticks per tick of the base rate,
+            stars blink as fast at any simulation rate
+        """
+
+        # The generator is seeded by the random module, so a seeded game
+        # gets the same sky every time.
+        self._rng = np.random.default_rng(random.getrandbits(64))
+
+        self._xs = np.array([x for x, _ in coordinates], dtype=np.int64)
+        self._ys = np.array([y for _, y in coordinates], dtype=np.int64)
+        self._symbols = np.array(symbols, dtype='<U1')
+        self._phases = np.zeros(len(coordinates), dtype=np.int8)
+        self._next_ticks = np.full(len(coordinates), start_tick,
+                                   dtype=np.int64)
+        self._time_scale = time_scale
+
+    def __len__(self) -> int:
+        return len(self._xs)
+
+    @property
+    def next_update_tick(self) -> Optional[int]:
+        """
+        Return a tick when the next star changes its phase or None if
+        there are no stars.
+        """
+
+        if not len(self):
+            return None
+        return int(self._next_ticks.min())
+
+    def update(self,
+               canvas,
+               tick: int,
+               area: Optional[Tuple[int, int, int, int]] = None) -> int:
+        """
+        Draw stars which change their phase in the tick and schedule their
+        next change. Stars out of the area change their phases too, but
+        aren't drawn.
+        :param area: (top, left, bottom, right) of the visible part of
+            the sky, bottom and right are excluded, all stars are visible
+            if it's None
+        :return: a number of redrawn stars
+        """
+
+        due = np.flatnonzero(self._next_ticks <= tick)
+        if not due.size:
+            return 0
+
+        phases = self._phases[due]
+        visible = due
+        if area is not None:
+            visible = due[self._are_visible(due, area)]
+        self._draw(canvas, visible, PHASE_ATTRIBUTES[self._phases[visible]])
+
+        self._phases[due] = (phases + 1) % len(PHASE_ATTRIBUTES)
+        phase_ticks = self._rng.integers(
+            MIN_PHASE_TICKS, MAX_PHASE_TICKS + 1, size=due.size)
+        if self._time_scale != 1:
+            phase_ticks = np.maximum(
+                np.rint(phase_ticks * self._time_scale), 1).astype(np.int64)
+        self._next_ticks[due] = tick + phase_ticks
+
+        return visible.size
+
+    def draw(self,
+             canvas,
+             area: Optional[Tuple[int, int, int, int]] = None) -> int:
+        """
+        Draw stars in their current phase, for example, when a part of
+        the sky comes into view.
+        :param area: the same as for update
+        :return: a number of drawn stars
+        """
+
+        stars = np.arange(len(self))
+        if area is not None:
+            stars = stars[self._are_visible(stars, area)]
+        # A phase is switched right after a star is drawn in it
+        attrs = PHASE_ATTRIBUTES[(self._phases[stars] - 1)
+                                 % len(PHASE_ATTRIBUTES)]
+        self._draw(canvas, stars, attrs)
+        return stars.size
+
+    def populate(self,
+                 area: Tuple[int, int, int, int],
+                 density: float,
+                 symbol_set: List[str],
+                 start_tick: int = 0) -> int:
+        """
+        Scatter new stars over an area, like a part of the sky which has
+        just appeared after a resize. Positions and symbols come from
+        the own generator of the starfield, so the random module isn't
+        affected.
+        :param area: (top, left, bottom, right), bottom and right are
+            excluded
+        :param density: a number of stars per cell
+        :param start_tick: a tick when new stars are drawn for the first time
+        :return: a number of new stars
+        """
+
+        top, left, bottom, right = area
+        n_stars = int(max(bottom - top, 0) * max(right - left, 0) * density)
+        if not n_stars:
+            return 0
+
+        coordinates = np.unique(np.stack([
+            self._rng.integers(left, right, size=n_stars),
+            self._rng.integers(top, bottom, size=n_stars),
+        ], axis=1), axis=0)
+        n_stars = len(coordinates)
+        self._xs = np.concatenate([self._xs, coordinates[:, 0]])
+        self._ys = np.concatenate([self._ys, coordinates[:, 1]])
+        self._symbols = np.concatenate([
+            self._symbols,
+            self._rng.choice(np.array(symbol_set, dtype='<U1'), size=n_stars)
+        ])
+        self._phases = np.concatenate([
+            self._phases, np.zeros(n_stars, dtype=np.int8)])
+        self._next_ticks = np.concatenate([
+            self._next_ticks, np.full(n_stars, start_tick, dtype=np.int64)])
+        return n_stars
+
+    def crop(self, max_x: int, max_y: int) -> int:
+        """
+        Remove stars which are out of the sky after it has shrunk.
+        :param max_x: the last column with stars
+        :param max_y: the last row with stars
+        :return: a number of removed stars
+        """
+
+        kept = (self._xs <= max_x) & (self._ys <= max_y)
+        n_removed = len(self) - int(kept.sum())
+        if n_removed:
+            self._xs, self._ys = self._xs[kept], self._ys[kept]
+            self._symbols = self._symbols[kept]
+            self._phases = self._phases[kept]
+            self._next_ticks = self._next_ticks[kept]
+        return n_removed
+
+    def _are_visible(self,
+                     stars: np.ndarray,
+                     area: Tuple[int, int, int, int]) -> np.ndarray:
+        top, left, bottom, right = area
+        xs, ys = self._xs[stars], self._ys[stars]
+        return (top <= ys) & (ys < bottom) & (left <= xs) & (xs < right)
+
+    def _draw(self,
+              canvas,
+              stars: np.ndarray,
+              attrs: np.ndarray) -> NoReturn:
+        for x, y, symbol, attr in zip(self._xs[stars].tolist(),
+                                      self._ys[stars].tolist(),
+                                      self._symbols[stars].tolist(),
+                                      attrs.tolist()):
+            canvas.addstr(y, x, symbol, attr)
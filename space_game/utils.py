@@ -1,12 +1,22 @@
-import asyncio
 from collections import defaultdict
+import math
 from pathlib import Path
-from typing import Dict, NoReturn, Optional, Tuple, Union
+from typing import Callable, Dict, List, NoReturn, Optional, Tuple, Union
 
-from space_game.settings import ControlSettings
+from space_game.scheduler import Sleep
+from space_game.settings import ControlSettings, MapSettings
+
+
+# A run of non-space symbols of a frame: (row, column, symbols, blank),
+# where blank is a string of spaces of the same length to erase the run.
+GlyphRun = Tuple[int, int, str, str]
 
 
 class Frame:
+    # Frames are created once and shared by all objects, but there are
+    # many of them in a big sprite library
+    __slots__ = ('content', 'name', 'height', 'width', 'runs', 'masks')
+
     def __init__(self,
                  content: str,
                  name: Optional[str] = ''
@@ -15,6 +25,10 @@ class Frame:
         self.name = name
         self.height, self.width = get_frame_size(self.content)
 
+        # Everything a frame needs for drawing and collision checks is
+        # computed once here, so there is no parsing of the content per tick.
+        self.runs, self.masks = get_frame_glyphs(self.content)
+
     def __str__(self) -> str:
         return f'{Frame.__name__}(name={self.name})'
 
@@ -26,6 +40,8 @@ class MapObject:
     This class represents a position of an object on the map
     """
 
+    __slots__ = ('frame', 'x', 'y')
+
     def __init__(self,
                  frame: Frame,
                  start_x: Union[float, int],
@@ -34,16 +50,12 @@ class MapObject:
         self.frame = frame
         self.x = start_x
         self.y = start_y
-        self.start_x = start_x
-        self.start_y = start_y
 
     def __str__(self) -> str:
         return f'{MapObject.__name__}(' \
                f'frame={self.frame}, ' \
                f'current_x={self.x}, ' \
-               f'current_y={self.y}, ' \
-               f'start_x={self.start_x}, ' \
-               f'start_y={self.start_y})'
+               f'current_y={self.y})'
 
     __repr__ = __str__
 
@@ -96,18 +108,16 @@ class MapObject:
         return self.intersect(other) or other.intersect(self)
 
 
-async def sleep(ticks: Union[float, int] = 0) -> NoReturn:
+def sleep(ticks: Union[float, int] = 0) -> Sleep:
     """
-    Sleep a task.
-    :param ticks: if it sleep randomly between 1 and 10 ticks.
+    Sleep a task. The task is parked by Scheduler and isn't resumed
+    until its wake tick.
+    :param ticks: a number of ticks to sleep, zero or less means till
+        the next tick
     :return:
     """
 
-    if not ticks:
-        await asyncio.sleep(0)
-    else:
-        for _ in range(0, round(ticks)):
-            await asyncio.sleep(0)
+    return Sleep(round(ticks))
 
 
 def read_objects(path: Path) -> Dict[str, Dict[str, Frame]]:
@@ -128,8 +138,14 @@ def read_objects(path: Path) -> Dict[str, Dict[str, Frame]]:
     return objects
 
 
-def read_controls(canvas) -> Tuple[int, int, bool]:
-    """Read keys pressed and returns tuple with controls state."""
+def read_controls(canvas,
+                  key_handlers: Optional[Dict[int, Callable[[], None]]] = None
+                  ) -> Tuple[int, int, bool]:
+    """
+    Read keys pressed and returns tuple with controls state.
+    :param key_handlers: functions to call when other keys are pressed,
+        by key codes
+    """
 
     rows_direction = columns_direction = 0
     space_pressed = False
@@ -156,6 +172,9 @@ def read_controls(canvas) -> Tuple[int, int, bool]:
         if pressed_key_code == ControlSettings.SPACE_KEY_CODE:
             space_pressed = True
 
+        if key_handlers and pressed_key_code in key_handlers:
+            key_handlers[pressed_key_code]()
+
     return columns_direction, rows_direction, space_pressed
 
 
@@ -187,33 +206,36 @@ def draw_frame(canvas,
     """
 
     max_y, max_x = get_canvas_size(canvas)
-
-    for row, line in enumerate(frame.content.splitlines(), round(y)):
+    x, y = round(x), round(y)
+
+    # A frame which is off the canvas as a whole is culled before looking
+    # at its runs, like rubbish which is still above the map
+    if (y + frame.height <= 1 or y >= max_y
+            or x + frame.width <= 1 or x >= max_x):
+        return
+
+    # Runs are blitted as whole strings, only runs crossing a border of
+    # the canvas are cut. Runs never reach the lower right corner of
+    # the window, because curses raises an exception there (don't ask why).
+    for row, column, symbols, blank in frame.runs:
+        row += y
         if row <= 0:
             continue
 
         if row >= max_y:
             break
 
-        for column, symbol in enumerate(line, round(x)):
-            if column <= 0:
-                continue
-
-            if column >= max_x:
-                break
-
-            if symbol == ' ':
-                continue
+        start = column + x
+        end = start + len(symbols)
+        if end <= 1 or start >= max_x:
+            continue
 
-            # Check that current position it is not in a lower right corner
-            # of the window
-            # Curses will raise exception in that case. Don`t ask why…
-            # https://docs.python.org/3/library/curses.html#curses.window.addch
-            if row == max_y and column == max_x:
-                continue
+        symbols = blank if negative else symbols
+        if start <= 0 or end > max_x:
+            symbols = symbols[max(0, 1 - start):max_x - start]
+            start = max(start, 1)
 
-            symbol = symbol if not negative else ' '
-            canvas.addch(row, column, symbol)
+        canvas.addstr(row, start, symbols)
 
 
 def get_frame_size(frame: str) -> Tuple[int, int]:
@@ -229,18 +251,177 @@ def get_frame_size(frame: str) -> Tuple[int, int]:
     return rows, columns
 
 
-def get_garbage_delay_tics(year: int) -> Union[None, int]:
-    if year < 1961:
+def get_frame_glyphs(frame: str) -> Tuple[List[GlyphRun], List[int]]:
+    """
+    Split a multiline text fragment into runs of non-space symbols and build
+    its occupancy masks.
+    :returns: a list of runs ordered by rows and a list of masks, one per
+        row, where the bit N is set if the column N is not a space
+    """
+
+    runs = []
+    masks = []
+    for row, line in enumerate(frame.splitlines()):
+        mask = 0
+        column = 0
+        while column < len(line):
+            if line[column] == ' ':
+                column += 1
+                continue
+
+            end = column
+            while end < len(line) and line[end] != ' ':
+                mask |= 1 << end
+                end += 1
+
+            runs.append((row, column, line[column:end], ' ' * (end - column)))
+            column = end
+
+        masks.append(mask)
+
+    return runs, masks
+
+
+def frames_collide(frame: Frame,
+                   x: Union[float, int],
+                   y: Union[float, int],
+                   other_frame: Frame,
+                   other_x: Union[float, int],
+                   other_y: Union[float, int]) -> bool:
+    """
+    Check that at least one non-space symbol of one frame covers
+    a non-space symbol of another one, when frames are drawn at the given
+    coordinates.
+    """
+
+    # Frames are drawn at rounded coordinates, so masks are compared
+    # the same way.
+    x, y = round(x), round(y)
+    other_x, other_y = round(other_x), round(other_y)
+
+    masks, other_masks = frame.masks, other_frame.masks
+    shift = other_x - x
+    for row in range(max(y, other_y),
+                     min(y + len(masks), other_y + len(other_masks))):
+        mask, other_mask = masks[row - y], other_masks[row - other_y]
+        if shift >= 0:
+            if mask & (other_mask << shift):
+                return True
+        elif (mask << -shift) & other_mask:
+            return True
+
+    return False
+
+
+def sweep_rectangles(x: Union[float, int],
+                     y: Union[float, int],
+                     width: int,
+                     height: int,
+                     dx: Union[float, int],
+                     dy: Union[float, int],
+                     other_x: Union[float, int],
+                     other_y: Union[float, int],
+                     other_width: int,
+                     other_height: int,
+                     other_dx: Optional[Union[float, int]] = 0,
+                     other_dy: Optional[Union[float, int]] = 0) \
+        -> Optional[Tuple[float, float]]:
+    """
+    Find when framing rectangles of two objects intersect, while they move
+    straight from (x, y) by (dx, dy) and from (other_x, other_y) by
+    (other_dx, other_dy). As in MapObject.intersect, edges are included.
+
+    Relative to the other object, the top left corner of this one moves
+    along a segment, and rectangles intersect while the segment is inside
+    the other rectangle grown by the size of this one. So it's a single
+    segment-vs-rectangle check however far objects move, and a fast object
+    doesn't pass through a small one between its positions.
+    :return: (enter, leave) shares of the move, both between 0 and 1, or
+        None if rectangles don't intersect
+    """
+
+    enter, leave = 0, 1
+    for start, move, low, high in ((x - other_x, dx - other_dx,
+                                    -width, other_width),
+                                   (y - other_y, dy - other_dy,
+                                    -height, other_height)):
+        if not move:
+            if not low <= start <= high:
+                return None
+            continue
+
+        low_time, high_time = (low - start) / move, (high - start) / move
+        if low_time > high_time:
+            low_time, high_time = high_time, low_time
+        enter, leave = max(enter, low_time), min(leave, high_time)
+        if enter > leave:
+            return None
+
+    return enter, leave
+
+
+def sweep_frames(frame: Frame,
+                 x: Union[float, int],
+                 y: Union[float, int],
+                 dx: Union[float, int],
+                 dy: Union[float, int],
+                 other_frame: Frame,
+                 other_x: Union[float, int],
+                 other_y: Union[float, int],
+                 other_dx: Optional[Union[float, int]] = 0,
+                 other_dy: Optional[Union[float, int]] = 0,
+                 enter: Optional[float] = 0,
+                 leave: Optional[float] = 1) -> Optional[float]:
+    """
+    Find the first moment when frames collide as in frames_collide, while
+    they move as in sweep_rectangles.
+    :param enter: the first share of the move to check
+    :param leave: the last share of the move to check
+    :return: a share of the move or None if frames don't collide
+    """
+
+    times = sweep_rectangles(x, y, frame.width, frame.height, dx, dy,
+                             other_x, other_y, other_frame.width,
+                             other_frame.height, other_dx, other_dy)
+    if times is None:
+        return None
+    enter, leave = max(enter, times[0]), min(leave, times[1])
+    if enter > leave:
         return None
-    elif year < 1969:
-        return 20
-    elif year < 1981:
-        return 14
-    elif year < 1995:
-        return 10
-    elif year < 2010:
-        return 8
-    elif year < 2020:
-        return 6
-    else:
-        return 2
+
+    # Frames are drawn at rounded coordinates, so the move is split into
+    # parts where none of them changes. Masks are compared at bounds of
+    # parts and once inside of every part.
+    bounds = {enter, leave}
+    for start, move in ((x, dx), (y, dy),
+                        (other_x, other_dx), (other_y, other_dy)):
+        if not move:
+            continue
+        first, last = sorted((start + move * enter, start + move * leave))
+        for edge in range(math.ceil(first - 0.5), math.floor(last - 0.5) + 1):
+            time = (edge + 0.5 - start) / move
+            if enter < time < leave:
+                bounds.add(time)
+
+    bounds = sorted(bounds)
+    # (a moment to check, a moment to return), frames collide right after
+    # the start of a part if they collide inside of it
+    times = [(enter, enter)]
+    for begin, end in zip(bounds, bounds[1:]):
+        times += [((begin + end) / 2, begin), (end, end)]
+    for time, contact in times:
+        if frames_collide(frame, x + dx * time, y + dy * time,
+                          other_frame, other_x + other_dx * time,
+                          other_y + other_dy * time):
+            return contact
+
+    return None
+
+
+def get_garbage_delay_tics(year: int) -> Union[None, int]:
+    delay = None
+    for start_year, tics in MapSettings.GARBAGE_DELAY_TICS:
+        if year < start_year:
+            break
+        delay = tics
+    return delay